@@ -0,0 +1,91 @@
+"""Load test for the headless command server.
+
+Starts the server on an assistant using the offline backends, then has
+``CLIENTS`` concurrent clients each send commands over one keep-alive
+connection for ``DURATION`` seconds, and reports requests per second and
+client-side latency percentiles. Run from the repository root:
+
+    python benchmarks/bench_headless.py
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import contextlib
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+DURATION = 5.0
+CLIENTS = (1, 10, 50)
+COMMANDS = [
+    "hello jarvis",
+    "what can you do",
+    "get information about black holes",
+    "play bohemian rhapsody",
+    "pause the music",
+    "open the pod bay doors",
+]
+
+
+async def client(port: int, deadline: float, latencies: list) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    i = 0
+    while time.perf_counter() < deadline:
+        body = json.dumps({"command": COMMANDS[i % len(COMMANDS)]}).encode()
+        i += 1
+        start = time.perf_counter()
+        writer.write(b"POST /command HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                     b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+        await writer.drain()
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        json.loads(await reader.readexactly(length))
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+
+async def load(port: int, clients: int) -> list:
+    latencies: list = []
+    deadline = time.perf_counter() + DURATION
+    await asyncio.gather(*(client(port, deadline, latencies) for _ in range(clients)))
+    return latencies
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="jarvis-headless-")
+    os.chdir(workdir)
+
+    from backends import Backends
+    from headless import HeadlessServer
+    from speech import VoiceAssistant
+    from telemetry import percentile
+
+    assistant = VoiceAssistant(backends=Backends.offline(), config={"warm_up": False, "wake_word": {"enabled": False}})
+    server = HeadlessServer(assistant, port=0)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(server.start())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    # Per-command log lines would dominate the measurement
+    logging.getLogger().setLevel(logging.WARNING)
+
+    print(f"{'clients':>8} {'requests':>9} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for clients in CLIENTS:
+        # Handlers also print answers to the console
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            latencies = sorted(asyncio.run(load(server.port, clients)))
+        print(f"{clients:>8} {len(latencies):>9} {len(latencies) / DURATION:>9.0f} "
+              f"{percentile(latencies, 0.5) * 1000:>8.2f} {percentile(latencies, 0.95) * 1000:>8.2f} "
+              f"{percentile(latencies, 0.99) * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Micro-benchmark for the compiled command router.
+
+Registers N synthetic commands next to the assistant's real ones and
+measures dispatch time per utterance, compared with the sequential
+substring checks the assistant used before. Run from the repository root:
+
+    python benchmarks/bench_intent_router.py
+"""
+import os
+import sys
+import time
+import random
+import string
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from intents import CommandRouter
+
+REAL_COMMANDS = [
+    ("exit", ["(exit|quit|stop|goodbye)"], 100),
+    ("pause_music", ["pause [the] [music]", "stop [the] music"], 10),
+    ("admin_mode", ["* switch to admin mode *"], 5),
+    ("greeting", ["(hello|hey|hi) jarvis"], 0),
+    ("launch", ["launch {app?}"], 0),
+    ("open_folder", ["open folder {folder?}"], 0),
+    ("search", ["search [for] {query?}"], 0),
+    ("get_info", ["(get|give) information [on|about] {query?}"], 0),
+    ("play_music", ["play [some] music", "play {query?}"], 0),
+]
+
+UTTERANCES = [
+    "hello jarvis launch visual studio code",
+    "search for cheap flights to lisbon",
+    "get information on black holes",
+    "play bohemian rhapsody by queen",
+    "stop the music",
+    "what is the weather like",
+]
+
+
+def random_word(rng: random.Random) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9)))
+
+
+def build_router(extra: int, rng: random.Random) -> CommandRouter:
+    router = CommandRouter(prefix="(?:hello|hey) jarvis")
+    for name, patterns, priority in REAL_COMMANDS:
+        router.register(name, patterns, lambda **slots: True, priority)
+    for i in range(extra):
+        router.register(f"synthetic_{i}", [f"{random_word(rng)} {random_word(rng)} {{arg?}}"], lambda **slots: True)
+    router.compile()
+    return router
+
+
+def build_if_chain(extra: int, rng: random.Random):
+    """The old approach: one substring test per command, evaluated in order."""
+    keywords = ["exit", "quit", "stop", "switch to admin mode", "hello jarvis", "launch", "open folder",
+                "search", "get information", "music", "play", "pause"]
+    keywords += [f"{random_word(rng)} {random_word(rng)}" for _ in range(extra)]
+    # Synthetic commands are checked before the fallthrough, like new branches added to the chain
+    keywords = keywords[:3] + keywords[12:] + keywords[3:12]
+
+    def dispatch(text):
+        for keyword in keywords:
+            if keyword in text:
+                return keyword
+        return None
+    return dispatch
+
+
+def time_per_call(func, repeat: int = 2000) -> float:
+    start = time.perf_counter()
+    for i in range(repeat):
+        func(UTTERANCES[i % len(UTTERANCES)])
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    print(f"{'commands':>10} {'router (us)':>12} {'if-chain (us)':>14}")
+    for extra in (0, 10, 100, 300, 1000):
+        rng = random.Random(extra)
+        router = build_router(extra, rng)
+        chain = build_if_chain(extra, random.Random(extra))
+        print(f"{len(REAL_COMMANDS) + extra:>10} {time_per_call(router.match):>12.2f} {time_per_call(chain):>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark for batched Spotify playback against a local fake Web API.
+
+Compares playing a multi-track request and a burst of transport commands
+one API call at a time (the assistant's old approach) with the
+PlaybackService, which searches concurrently over a pooled session and
+coalesces commands. Every request to the fake server waits ``LATENCY``
+seconds, like a round trip to the real API. Run from the repository root:
+
+    python benchmarks/bench_playback.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import spotipy
+
+from fake_backends import FakeSpotifyServer
+from playback import PlaybackService, pooled_session, split_play_request
+from spotify_state import SpotifyState
+
+LATENCY = 0.05
+REQUEST = "bohemian rhapsody then hotel california, stairway to heaven and hey jude"
+BURST = ["pause", "resume", "next", "next", "previous", "pause"]
+
+
+def make_client(server: FakeSpotifyServer, pooled: bool) -> spotipy.Spotify:
+    client = spotipy.Spotify(auth="fake-token", requests_session=pooled_session() if pooled else True)
+    client.prefix = server.prefix
+    return client
+
+
+def sequential_play(client: spotipy.Spotify, queries) -> None:
+    """The old approach: look up devices and search and start each track in turn."""
+    for query in queries:
+        device_id = client.devices()['devices'][0]['id']
+        track = client.search(q=query, type='track', limit=1)['tracks']['items'][0]
+        client.start_playback(device_id=device_id, uris=[track['uri']])
+
+
+def sequential_burst(client: spotipy.Spotify, commands) -> None:
+    calls = {
+        "pause": client.pause_playback,
+        "resume": client.start_playback,
+        "next": client.next_track,
+        "previous": client.previous_track,
+    }
+    for command in commands:
+        device_id = client.devices()['devices'][0]['id']
+        calls[command](device_id=device_id)
+
+
+def timed(server: FakeSpotifyServer, func) -> tuple:
+    server.reset_log()
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000, len(server.requests)
+
+
+def main():
+    server = FakeSpotifyServer(latency=LATENCY).start()
+    try:
+        queries = split_play_request(REQUEST)
+        plain = make_client(server, pooled=False)
+        pooled = make_client(server, pooled=True)
+        service = PlaybackService(pooled, SpotifyState(pooled), coalesce_window=0.05)
+        service.state.device_id()
+
+        def batched_burst():
+            futures = [getattr(service, command)() for command in BURST]
+            for future in futures:
+                future.result()
+
+        print(f"fake API latency {LATENCY * 1000:.0f} ms per request")
+        print(f"{'scenario':<36} {'ms':>8} {'requests':>9}")
+        rows = [
+            (f"play {len(queries)} tracks, sequential", lambda: sequential_play(plain, queries)),
+            (f"play {len(queries)} tracks, batched", lambda: service.play(queries).result()),
+            (f"{len(BURST)} transport commands, sequential", lambda: sequential_burst(plain, BURST)),
+            (f"{len(BURST)} transport commands, coalesced", batched_burst),
+            ("queue an album, batched", lambda: service.queue(["abbey road"], album=True).result()),
+        ]
+        for label, func in rows:
+            ms, requests = timed(server, func)
+            print(f"{label:<36} {ms:>8.1f} {requests:>9}")
+        service.close()
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
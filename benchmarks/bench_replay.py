@@ -0,0 +1,261 @@
+"""End-to-end benchmark replaying recorded utterances through the assistant.
+
+Each WAV file of a corpus is fed to ``VoiceAssistant`` through a
+``WavFileSource`` and goes through the real capture → recognize →
+``execute_command`` → speak path. Recognition, Gemini, Spotify and TTS are
+local stand-ins with configurable latency, so the numbers measure the
+assistant's own overhead and how well it overlaps the services' latency,
+and runs need no microphone, speakers or network.
+
+The report lists per-stage latency percentiles (from the telemetry
+spans), throughput, and memory measured with tracemalloc (which slows
+Python down somewhat; pass --no-memory for cleaner latencies). Save a
+run with --save and check a later one against it with --baseline; the
+script exits with status 1 if a stage's p95 or the throughput regressed
+by more than --tolerance.
+
+A corpus is a directory with a ``corpus.json`` listing
+``{"file": "utterance.wav", "text": "what was said"}`` entries; the text
+is what the stub recognizer returns for that file. Without --corpus a
+synthetic corpus is generated. Run from the repository root:
+
+    python benchmarks/bench_replay.py [--corpus DIR] [--passes 3]
+"""
+import os
+import sys
+import json
+import time
+import wave
+import random
+import argparse
+import tempfile
+import tracemalloc
+from array import array
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, SRC)
+
+COMMANDS = [
+    "hello jarvis",
+    "get information about black holes",
+    "tell me more",
+    "play bohemian rhapsody then hotel california",
+    "next song",
+    "pause the music",
+    "get information about black holes",
+    "what can you do",
+    "queue the album abbey road",
+    "resume the music",
+    "get information on the roman empire",
+    "open the pod bay doors",
+]
+
+# Stages reported in this order; anything else that was recorded follows
+STAGES = [
+    "replay.utterance",
+    "listen.capture",
+    "listen.recognize",
+    "command",
+    "command.match",
+    "command.handler",
+    "get_info",
+    "model.first_sentence",
+    "model.stream",
+    "speak.queue_wait",
+    "speak",
+]
+
+
+def synthesize_corpus(directory: str, commands, sample_rate: int = 16000, seed: int = 0) -> list:
+    """Write one noise burst per command, roughly as long as saying it."""
+    rng = random.Random(seed)
+    entries = []
+    for i, text in enumerate(commands):
+        duration = min(2.5, 0.4 + 0.06 * len(text))
+        frames = int(duration * sample_rate)
+        samples = array("h", (
+            int(rng.uniform(-1, 1) * 6000 * min(1.0, n / 800, (frames - n) / 800)) for n in range(frames)
+        ))
+        name = f"utterance_{i:02d}.wav"
+        with wave.open(os.path.join(directory, name), "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes(samples.tobytes())
+        entries.append({"file": name, "text": text})
+    with open(os.path.join(directory, "corpus.json"), "w") as f:
+        json.dump(entries, f, indent=2)
+    return entries
+
+
+def load_corpus(directory: str) -> list:
+    with open(os.path.join(directory, "corpus.json")) as f:
+        entries = json.load(f)
+    for entry in entries:
+        entry["file"] = os.path.abspath(os.path.join(directory, entry["file"]))
+    return entries
+
+
+def replay_config(entries: list, passes: int, args) -> dict:
+    """A config with local stand-ins for every service and no side effects outside the working directory."""
+    return {
+        "wake_word": {"enabled": False},
+        "tts_cache": {"enabled": False},
+        "pipeline": False,
+        "warm_up": False,
+        "spotify_coalesce_ms": 50,
+        "backends": {
+            "preset": "offline",
+            # Utterances are replayed in order, so the stub hands out transcripts in order too
+            "recognizer": [{
+                "type": "stub",
+                "transcripts": [entry["text"] for entry in entries] * passes,
+                "latency": args.recognizer_ms / 1000,
+            }],
+            "tts": {"type": "fake", "word_delay": args.tts_word_ms / 1000},
+            "llm": {
+                "type": "fake",
+                "default_reply": ("Here is what I know. " * 5).strip(),
+                "chunk_size": 24,
+                "first_chunk_delay": args.model_ms / 1000,
+                "chunk_delay": 0.02,
+            },
+            "music": {"type": "fake", "latency": args.spotify_ms / 1000},
+        },
+    }
+
+
+def build_assistant(entries: list, passes: int, args):
+    """A VoiceAssistant wired to the corpus and to local stand-ins for every service."""
+    from audio_input import WavFileSource
+    from speech import VoiceAssistant
+
+    source = WavFileSource([entry["file"] for entry in entries] * passes)
+    assistant = VoiceAssistant(audio_source=source, config=replay_config(entries, passes, args))
+    assistant.speech.ready.wait(5)
+    return assistant
+
+
+def replay(assistant, count: int, memory: bool) -> dict:
+    from telemetry import span
+
+    snapshots = []
+    start = time.perf_counter()
+    for _ in range(count):
+        with span("replay.utterance"):
+            audio = assistant.capture_audio()
+            if audio is None:
+                break
+            assistant.execute_command(assistant.recognize(audio))
+            assistant.speech.wait_idle(30)
+        if memory:
+            snapshots.append(tracemalloc.get_traced_memory()[0])
+    elapsed = time.perf_counter() - start
+    return {"elapsed": elapsed, "memory": snapshots}
+
+
+def report(results: dict) -> None:
+    print(f"\n{'stage':<24} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    stages = results["stages"]
+    for name in STAGES + sorted(set(stages) - set(STAGES)):
+        if name in stages:
+            stats = stages[name]
+            print(f"{name:<24} {stats['count']:>6} {stats['p50']:>9.1f} {stats['p95']:>9.1f} "
+                  f"{stats['p99']:>9.1f} {stats['max']:>9.1f}")
+    print(f"\n{results['utterances']} utterances in {results['elapsed']:.2f}s: "
+          f"{results['throughput']:.2f} utterances/s")
+    if "memory" in results:
+        memory = results["memory"]
+        print(f"memory: peak {memory['peak_mb']:.1f} MB, after startup {memory['startup_mb']:.1f} MB, "
+              f"after first pass {memory['first_pass_mb']:.1f} MB, at the end {memory['end_mb']:.1f} MB")
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Descriptions of every stage that got slower than the baseline allows."""
+    regressions = []
+    for name, stats in baseline["stages"].items():
+        current = results["stages"].get(name)
+        # Sub-millisecond stages are too noisy to compare by ratio
+        if current and stats["p95"] >= 1.0 and current["p95"] > stats["p95"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {stats['p95']:.1f} ms -> {current['p95']:.1f} ms")
+    if results["throughput"] < baseline["throughput"] * (1 - tolerance):
+        regressions.append(f"throughput: {baseline['throughput']:.2f}/s -> {results['throughput']:.2f}/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--corpus", help="directory with corpus.json and WAV files (default: synthetic)")
+    parser.add_argument("--passes", type=int, default=3, help="times to replay the corpus")
+    parser.add_argument("--recognizer-ms", type=float, default=150, help="stub recognizer latency")
+    parser.add_argument("--model-ms", type=float, default=300, help="fake Gemini time to first chunk")
+    parser.add_argument("--spotify-ms", type=float, default=50, help="fake Spotify API latency per request")
+    parser.add_argument("--tts-word-ms", type=float, default=5, help="fake TTS time per word")
+    parser.add_argument("--no-memory", action="store_true", help="don't trace memory allocations")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against results saved with --save")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline")
+    args = parser.parse_args()
+
+    corpus_dir = os.path.abspath(args.corpus) if args.corpus else None
+    save = os.path.abspath(args.save) if args.save else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    memory = not args.no_memory
+
+    with tempfile.TemporaryDirectory(prefix="jarvis-replay-") as workdir:
+        if corpus_dir:
+            entries = load_corpus(corpus_dir)
+        else:
+            generated = os.path.join(workdir, "corpus")
+            os.makedirs(generated)
+            entries = [dict(entry, file=os.path.join(generated, entry["file"]))
+                       for entry in synthesize_corpus(generated, COMMANDS)]
+        # The assistant keeps its caches and logs in the working directory
+        os.chdir(workdir)
+
+        if memory:
+            tracemalloc.start()
+        assistant = build_assistant(entries, args.passes, args)
+        startup_memory = tracemalloc.get_traced_memory()[0] if memory else 0
+        from telemetry import TRACER
+        TRACER.reset()
+
+        run = replay(assistant, len(entries) * args.passes, memory)
+        utterances = TRACER.summary().get("replay.utterance", {}).get("count", 0)
+        results = {
+            "utterances": utterances,
+            "elapsed": run["elapsed"],
+            "throughput": utterances / run["elapsed"] if run["elapsed"] else 0.0,
+            "stages": TRACER.summary(),
+        }
+        if memory:
+            snapshots = run["memory"] or [0]
+            results["memory"] = {
+                "peak_mb": tracemalloc.get_traced_memory()[1] / 2 ** 20,
+                "startup_mb": startup_memory / 2 ** 20,
+                "first_pass_mb": snapshots[min(len(entries), len(snapshots)) - 1] / 2 ** 20,
+                "end_mb": snapshots[-1] / 2 ** 20,
+            }
+            tracemalloc.stop()
+        assistant.speech.stop()
+        assistant.spotify.fake_server.stop()
+        os.chdir(os.path.dirname(SRC))
+
+    report(results)
+    if save:
+        with open(save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {save}")
+    if baseline_path:
+        with open(baseline_path) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions against the baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
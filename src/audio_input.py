@@ -0,0 +1,310 @@
+import math
+import wave
+import queue
+import logging
+import threading
+from array import array
+from collections import deque
+from typing import Iterable, List, Optional, Union
+
+import speech_recognition as sr
+
+try:
+    import audioop
+except ImportError:  # Removed from the standard library in Python 3.13
+    audioop = None
+
+logger = logging.getLogger(__name__)
+
+
+def rms(chunk: bytes, sample_width: int = 2) -> float:
+    """Root-mean-square energy of a chunk of signed 16-bit PCM."""
+    if audioop is not None:
+        return audioop.rms(chunk, sample_width)
+    samples = array("h", chunk)
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+class AudioSource:
+    """A stream of mono 16-bit PCM chunks.
+
+    ``read()`` returns the next chunk, or ``b""`` once the stream has ended.
+    Live sources produce audio in real time and may drop old chunks if the
+    consumer falls behind; file sources never drop audio.
+    """
+
+    sample_rate = 16000
+    sample_width = 2
+    chunk_size = 1024
+    live = False
+
+    def open(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def read(self) -> bytes:
+        raise NotImplementedError
+
+    @property
+    def chunk_duration(self) -> float:
+        return self.chunk_size / self.sample_rate
+
+
+class MicrophoneSource(AudioSource):
+    """The default microphone, opened once and kept open."""
+
+    live = True
+
+    def __init__(self, device_index: Optional[int] = None, sample_rate: Optional[int] = None,
+                 chunk_size: int = 1024):
+        self.microphone = sr.Microphone(device_index=device_index, sample_rate=sample_rate, chunk_size=chunk_size)
+        self.sample_rate = self.microphone.SAMPLE_RATE
+        self.sample_width = self.microphone.SAMPLE_WIDTH
+        self.chunk_size = self.microphone.CHUNK
+        self._stream = None
+
+    def open(self) -> None:
+        self._stream = self.microphone.__enter__()
+
+    def close(self) -> None:
+        if self._stream is not None:
+            self.microphone.__exit__(None, None, None)
+            self._stream = None
+
+    def read(self) -> bytes:
+        return self._stream.stream.read(self.chunk_size)
+
+
+class WavFileSource(AudioSource):
+    """Replay one or more WAV files as if they were spoken into the microphone.
+
+    Each file is followed by ``gap`` seconds of silence so consecutive files
+    are heard as separate utterances.
+    """
+
+    def __init__(self, paths: Union[str, Iterable[str]], chunk_size: int = 1024, gap: float = 1.0):
+        self.paths: List[str] = [paths] if isinstance(paths, str) else list(paths)
+        self.chunk_size = chunk_size
+        self.gap = gap
+        self._chunks = None
+        if self.paths:
+            with wave.open(self.paths[0], "rb") as wav:
+                self.sample_rate = wav.getframerate()
+
+    def open(self) -> None:
+        self._chunks = self._generate()
+
+    def _generate(self):
+        for path in self.paths:
+            with wave.open(path, "rb") as wav:
+                if wav.getsampwidth() != 2:
+                    raise ValueError(f"{path}: only 16-bit WAV files are supported")
+                self.sample_rate = wav.getframerate()
+                channels = wav.getnchannels()
+                while True:
+                    frames = wav.readframes(self.chunk_size)
+                    if not frames:
+                        break
+                    if channels > 1:
+                        samples = array("h", frames)[::channels]
+                        frames = samples.tobytes()
+                    yield frames
+            silence = bytes(self.chunk_size * self.sample_width)
+            for _ in range(int(self.gap / self.chunk_duration)):
+                yield silence
+
+    def read(self) -> bytes:
+        return next(self._chunks, b"")
+
+
+class NoiseEstimator:
+    """Running estimate of the background noise level.
+
+    Keeps the energies of the most recent chunks heard outside a phrase,
+    speech included, in a ring buffer. The level and spread are taken from
+    the quieter half of the window, so words spoken while nobody is
+    listening don't raise the estimate, but a sustained louder background
+    (a fan starting up) takes over the window within a few seconds.
+    """
+
+    def __init__(self, window: int = 100, sensitivity: float = 2.5, min_threshold: float = 100,
+                 initial_threshold: float = 300, quiet_fraction: float = 0.5):
+        self.window = window
+        self.sensitivity = sensitivity
+        self.min_threshold = min_threshold
+        self.initial_threshold = initial_threshold
+        self.quiet_fraction = quiet_fraction
+        self._energies: deque = deque(maxlen=window)
+        self._stats: Optional[tuple] = None
+
+    def update(self, energy: float) -> None:
+        self._energies.append(energy)
+        self._stats = None
+
+    def _quiet_stats(self) -> tuple:
+        if self._stats is None:
+            quiet = sorted(self._energies)[:max(1, int(len(self._energies) * self.quiet_fraction))]
+            mean = sum(quiet) / len(quiet)
+            variance = sum(value * value for value in quiet) / len(quiet) - mean ** 2
+            self._stats = (mean, math.sqrt(max(variance, 0.0)))
+        return self._stats
+
+    @property
+    def mean(self) -> float:
+        return self._quiet_stats()[0] if self._energies else 0.0
+
+    @property
+    def std(self) -> float:
+        if len(self._energies) < 2:
+            return 0.0
+        return self._quiet_stats()[1]
+
+    @property
+    def threshold(self) -> float:
+        """Energy above which a chunk is treated as speech."""
+        if len(self._energies) < 5:
+            return self.initial_threshold
+        return max(self.min_threshold, self.mean + self.sensitivity * max(self.std, 0.25 * self.mean))
+
+
+class StreamListener:
+    """Capture utterances from a continuously running audio stream.
+
+    A background thread reads the source without pause and feeds every
+    non-speech chunk into the noise estimator, so calibration happens all
+    the time instead of before every command and ``listen()`` can start
+    detecting speech immediately.
+    """
+
+    def __init__(self, source: AudioSource, pause_threshold: float = 0.8, pre_roll: float = 0.3,
+                 noise: Optional[NoiseEstimator] = None, max_buffered: float = 10.0):
+        self.source = source
+        self.pause_threshold = pause_threshold
+        self.pre_roll = pre_roll
+        self.noise = noise or NoiseEstimator()
+        self._chunks: "queue.Queue" = queue.Queue(maxsize=max(1, int(max_buffered / source.chunk_duration)))
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._ended = threading.Event()
+        self._in_phrase = False
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.source.open()
+        self._thread = threading.Thread(target=self._read_loop, daemon=True, name="audio-capture")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        self.source.close()
+
+    @property
+    def ended(self) -> bool:
+        """True once a finite source has been fully consumed."""
+        return self._ended.is_set() and self._chunks.empty()
+
+    def _read_loop(self) -> None:
+        try:
+            while not self._stopped.is_set():
+                chunk = self.source.read()
+                if not chunk:
+                    break
+                energy = rms(chunk, self.source.sample_width)
+                if not self._in_phrase:
+                    self.noise.update(energy)
+                if self.source.live:
+                    # Drop the oldest audio rather than block the device
+                    while True:
+                        try:
+                            self._chunks.put_nowait((chunk, energy))
+                            break
+                        except queue.Full:
+                            try:
+                                self._chunks.get_nowait()
+                            except queue.Empty:
+                                pass
+                else:
+                    self._chunks.put((chunk, energy))
+        except Exception as e:
+            logger.error(f"Audio capture error: {e}")
+        finally:
+            self._ended.set()
+
+    def _next_chunk(self, timeout: float):
+        while True:
+            try:
+                return self._chunks.get(timeout=min(timeout, 0.1))
+            except queue.Empty:
+                if self._ended.is_set() and self._chunks.empty():
+                    return None
+                timeout -= 0.1
+                if timeout <= 0:
+                    raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+
+    def discard_pending(self) -> None:
+        """Drop audio captured before now, e.g. the assistant's own voice."""
+        while True:
+            try:
+                self._chunks.get_nowait()
+            except queue.Empty:
+                return
+
+    def listen(self, timeout: Optional[float] = 8, phrase_time_limit: Optional[float] = 7,
+               discard_pending: bool = False) -> Optional[sr.AudioData]:
+        """Return the next utterance, or None if the source ended first.
+
+        With ``discard_pending``, live audio buffered before the call is
+        dropped first. Raises ``sr.WaitTimeoutError`` if no speech starts
+        within ``timeout`` seconds.
+        """
+        self.start()
+        if discard_pending and self.source.live:
+            self.discard_pending()
+        chunk_duration = self.source.chunk_duration
+        pre_roll = deque(maxlen=max(1, int(self.pre_roll / chunk_duration)))
+        waited = 0.0
+
+        # Wait for the first chunk loud enough to be speech
+        while True:
+            item = self._next_chunk(timeout if timeout is not None else 3600)
+            if item is None:
+                return None
+            chunk, energy = item
+            if energy > self.noise.threshold:
+                break
+            pre_roll.append(chunk)
+            waited += chunk_duration
+            if timeout is not None and waited > timeout and self.source.live:
+                raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+
+        self._in_phrase = True
+        try:
+            frames = list(pre_roll) + [chunk]
+            duration = chunk_duration
+            silence = 0.0
+            while phrase_time_limit is None or duration < phrase_time_limit:
+                item = self._next_chunk(self.pause_threshold + 1)
+                if item is None:
+                    break
+                chunk, energy = item
+                frames.append(chunk)
+                duration += chunk_duration
+                if energy > self.noise.threshold:
+                    silence = 0.0
+                else:
+                    silence += chunk_duration
+                    if silence >= self.pause_threshold:
+                        break
+        except sr.WaitTimeoutError:
+            pass
+        finally:
+            self._in_phrase = False
+
+        return sr.AudioData(b"".join(frames), self.source.sample_rate, self.source.sample_width)
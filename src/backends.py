@@ -0,0 +1,261 @@
+"""Providers for the external services the assistant depends on.
+
+Every service (speech recognition, text-to-speech, the language model,
+music, file search and the clock) is built by a provider chosen in the
+``backends`` section of ``assistant_config.json``, so the assistant can
+run against local stand-ins without audio hardware or network access:
+
+    "backends": "offline"
+
+or, to pick providers one by one (missing entries use the real services):
+
+    "backends": {
+        "tts": {"type": "fake", "word_delay": 0.05},
+        "llm": {"type": "gemini", "model": "gemini-1.5-flash"},
+        "music": "none"
+    }
+
+A dict may also name a ``preset`` to start from.
+"""
+import time
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Union
+
+from file_index import FileIndex
+from recognizers import RecognizerBackend, backends_from_config
+from startup import Deferred, lazy_import
+
+logger = logging.getLogger(__name__)
+
+genai = lazy_import("google.generativeai")
+spotipy = lazy_import("spotipy")
+pyttsx3 = lazy_import("pyttsx3")
+
+GEMINI_API_KEY = "api_key"
+gemini_client = Deferred("gemini client", lambda: genai.configure(api_key=GEMINI_API_KEY))
+
+# Spotify API credentials
+CLIENT_ID = "client-id"  # Replace with your Spotify app's Client ID
+CLIENT_SECRET = "client-secret"  # Replace with your Spotify app's Client Secret
+REDIRECT_URI = "http://localhost:8888/callback/"  # Redirect URI you set in your Spotify app
+
+# Gemini configuration
+GENERATION_CONFIG = {
+    "temperature": 0,
+    "top_p": 0.95,
+    "top_k": 64,
+    "max_output_tokens": 8192,
+}
+
+SAFETY_SETTINGS = [
+    {
+        "category": "HARM_CATEGORY_HARASSMENT",
+        "threshold": "BLOCK_NONE",
+    },
+    {
+        "category": "HARM_CATEGORY_HATE_SPEECH",
+        "threshold": "BLOCK_MEDIUM_AND_ABOVE",
+    },
+    {
+        "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+        "threshold": "BLOCK_MEDIUM_AND_ABOVE",
+    },
+    {
+        "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
+        "threshold": "BLOCK_MEDIUM_AND_ABOVE",
+    },
+]
+
+
+class SystemClock:
+    """The real time; see ``fake_backends.FakeClock`` for a controllable one."""
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+
+def pyttsx3_engine(voice: int = 1, rate: int = 150, volume: float = 1.0):
+    """The platform's speech engine (SAPI5, NSSpeechSynthesizer or eSpeak)."""
+    engine = pyttsx3.init()
+    voices = engine.getProperty('voices')
+    if voices and voice < len(voices):
+        engine.setProperty('voice', voices[voice].id)  # Female voice by default
+    engine.setProperty('rate', rate)
+    engine.setProperty('volume', volume)
+    return engine
+
+
+def fake_tts_engine(word_delay: float = 0.0):
+    from fake_backends import FakeTTSEngine
+    return FakeTTSEngine(word_delay=word_delay)
+
+
+def gemini_model(model: str = "gemini-1.5-pro", api_key: Optional[str] = None,
+                 system_instruction: str = "Give detailed information about the mentioned topic in 5 sentences"):
+    if api_key:
+        genai.configure(api_key=api_key)
+    else:
+        gemini_client.get()
+    return genai.GenerativeModel(
+        model_name=model,
+        safety_settings=SAFETY_SETTINGS,
+        generation_config=GENERATION_CONFIG,
+        system_instruction=system_instruction
+    )
+
+
+def fake_chat_model(**options):
+    from fake_backends import FakeChatModel
+    return FakeChatModel(**options)
+
+
+def spotify_client(client_id: str = CLIENT_ID, client_secret: str = CLIENT_SECRET,
+                   redirect_uri: str = REDIRECT_URI):
+    from playback import pooled_session
+    return spotipy.Spotify(
+        auth_manager=spotipy.oauth2.SpotifyOAuth(
+            client_id=client_id,
+            client_secret=client_secret,
+            redirect_uri=redirect_uri,
+            scope="user-modify-playback-state user-read-playback-state"
+        ),
+        # Keep-alive connections shared by the playback service's concurrent searches
+        requests_session=pooled_session()
+    )
+
+
+def fake_spotify_client(latency: float = 0.0, device_delay: float = 0.0, album_size: int = 10):
+    """A real ``spotipy`` client talking to a ``FakeSpotifyServer`` started for it."""
+    from fake_backends import FakeSpotifyServer
+    from playback import pooled_session
+
+    server = FakeSpotifyServer(latency=latency, device_delay=device_delay, album_size=album_size).start()
+    client = spotipy.Spotify(auth="offline", requests_session=pooled_session())
+    client.prefix = server.prefix
+    client.fake_server = server
+    return client
+
+
+def indexed_file_search(roots: list, db_path: Optional[str] = None) -> FileIndex:
+    """The persistent file index, crawled in the background by the assistant."""
+    return FileIndex(roots, db_path=db_path) if db_path else FileIndex(roots)
+
+
+def no_file_search(roots: list, db_path: Optional[str] = None) -> FileIndex:
+    """An empty index that is ready at once, so nothing is ever crawled."""
+    index = FileIndex([], db_path=":memory:")
+    index.ready.set()
+    return index
+
+
+def fake_clock(start: Optional[float] = None):
+    from fake_backends import FakeClock
+    return FakeClock() if start is None else FakeClock(start)
+
+
+PROVIDERS: Dict[str, Dict[str, Callable]] = {
+    "tts": {"pyttsx3": pyttsx3_engine, "fake": fake_tts_engine},
+    "llm": {"gemini": gemini_model, "fake": fake_chat_model},
+    "music": {"spotify": spotify_client, "fake": fake_spotify_client, "none": lambda: None},
+    "file_search": {"index": indexed_file_search, "none": no_file_search},
+    "clock": {"system": SystemClock, "fake": fake_clock},
+}
+
+PRESETS: Dict[str, dict] = {
+    "default": {
+        "recognizer": None,
+        "tts": "pyttsx3",
+        "llm": "gemini",
+        "music": "spotify",
+        "file_search": "index",
+        "clock": "system",
+    },
+    "offline": {
+        "recognizer": [{"type": "stub", "transcripts": []}],
+        "tts": "fake",
+        "llm": "fake",
+        "music": "fake",
+        "file_search": "none",
+        "clock": "system",
+    },
+}
+
+
+def _provider(kind: str, entry: Union[str, dict, None], preset: str = "default") -> Callable:
+    """Bind a config entry (a provider name or a dict with a ``type``) to its provider.
+
+    A dict without a ``type`` configures the provider of the active ``preset``.
+    """
+    options = {"type": entry} if isinstance(entry, str) else dict(entry or {})
+    name = options.pop("type", PRESETS[preset][kind])
+    provider = PROVIDERS[kind].get(name)
+    if provider is None:
+        raise ValueError(f"Unknown {kind} backend '{name}', expected one of {sorted(PROVIDERS[kind])}")
+    # Options from the config win over defaults passed by the assistant
+    return lambda *args, **defaults: provider(*args, **dict(defaults, **options))
+
+
+class Backends:
+    """Factories for the services a ``VoiceAssistant`` uses.
+
+    The assistant calls each factory when it first needs the service, on
+    whichever thread needs it: ``tts`` on the speech worker (SAPI engines
+    must stay on the thread that created them), ``llm`` and ``music`` on
+    first use, ``recognizers`` and ``file_search(roots, db_path=...)`` while
+    it is being constructed. ``clock`` is used as is.
+    """
+
+    def __init__(self, recognizers: Callable[[], List[RecognizerBackend]], tts: Callable, llm: Callable,
+                 music: Callable, file_search: Callable[[list], FileIndex], clock=None):
+        self.recognizers = recognizers
+        self.tts = tts
+        self.llm = llm
+        self.music = music
+        self.file_search = file_search
+        self.clock = clock or SystemClock()
+
+    @classmethod
+    def from_config(cls, config: Optional[dict] = None) -> "Backends":
+        """Build the providers named in an assistant config's ``backends`` section."""
+        config = config or {}
+        section = config.get('backends') or "default"
+        if isinstance(section, str):
+            section = {"preset": section}
+        preset_name = section.get("preset", "default")
+        if preset_name not in PRESETS:
+            raise ValueError(f"Unknown backends preset '{preset_name}', expected one of {sorted(PRESETS)}")
+        unknown = set(section) - set(PRESETS[preset_name]) - {"preset"}
+        if unknown:
+            raise ValueError(f"Unknown backends {sorted(unknown)}, expected any of {sorted(PRESETS[preset_name])}")
+        settings = dict(PRESETS[preset_name], **{k: v for k, v in section.items() if k != "preset"})
+
+        # The top-level "recognizers" list predates this section and still works
+        recognizer_entries = settings["recognizer"] if settings["recognizer"] is not None \
+            else config.get('recognizers')
+        logger.info("Using backends: " + ", ".join(
+            f"{kind}={entry if isinstance(entry, str) else (entry or {}).get('type', 'default')}"
+            for kind, entry in settings.items() if kind != "recognizer"
+        ))
+        return cls(
+            recognizers=lambda: backends_from_config(recognizer_entries),
+            tts=_provider("tts", settings["tts"], preset_name),
+            llm=_provider("llm", settings["llm"], preset_name),
+            music=_provider("music", settings["music"], preset_name),
+            file_search=_provider("file_search", settings["file_search"], preset_name),
+            clock=_provider("clock", settings["clock"], preset_name)()
+        )
+
+    @classmethod
+    def offline(cls, **overrides) -> "Backends":
+        """Local stand-ins for everything, e.g. for benchmarks and headless use."""
+        return cls.from_config({"backends": dict(overrides, preset="offline")})
@@ -0,0 +1,190 @@
+import re
+import logging
+import threading
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PREFIX = "Summary of our earlier conversation: "
+SUMMARY_ACK = "Understood, I will keep that in mind."
+
+FOLLOW_UP_PREFIXES = ("tell me more", "go on", "continue", "what about", "and ", "why")
+
+_SENTENCE_RE = re.compile(r"(.+?[.!?])(\s|$)", re.S)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English)."""
+    return len(text) // 4 + 1
+
+
+def _message_text(message) -> str:
+    """Return the text of a history entry, either a dict or an SDK ``Content``."""
+    parts = message["parts"] if isinstance(message, dict) else message.parts
+    return " ".join(part if isinstance(part, str) else getattr(part, "text", "") for part in parts)
+
+
+def _message_role(message) -> str:
+    return message["role"] if isinstance(message, dict) else message.role
+
+
+def _broken_history_errors() -> tuple:
+    """The SDK errors raised by ``ChatSession.history`` after a stream went wrong."""
+    try:
+        from google.generativeai.types import BrokenResponseError, IncompleteIterationError
+    except ImportError:
+        return ()
+    return BrokenResponseError, IncompleteIterationError
+
+
+def _first_sentence(text: str) -> str:
+    match = _SENTENCE_RE.match(text.strip())
+    return match.group(1) if match else text.strip()
+
+
+class _LockedStream:
+    """A streamed response that releases ``lock`` once it is read to the end or closed.
+
+    The lock is released from whichever thread does that, so it must be a
+    plain ``Lock``.
+    """
+
+    def __init__(self, response, lock: threading.Lock):
+        self.response = response
+        self._lock = lock
+        self._open = True
+
+    def __iter__(self):
+        try:
+            yield from self.response
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._open:
+            self._open = False
+            self._lock.release()
+
+    def __del__(self):
+        self.close()
+
+
+class ConversationManager:
+    """A long-lived Gemini chat session with a bounded context window.
+
+    One chat session is reused across queries so follow-up questions keep
+    their context. Before each request the history is measured against
+    ``max_tokens``; the oldest exchanges are then dropped and folded into a
+    short extractive summary that is kept at the start of the history, so
+    the request payload stays bounded however long the conversation runs.
+
+    Requests are sent one at a time: a streamed reply holds the session
+    until it has been read to the end (or closed), so concurrent queries
+    never send into a session that is still receiving. A reply that broke
+    off, or was blocked, is dropped from the history rather than leaving
+    the session unusable.
+    """
+
+    def __init__(self, model, max_tokens: int = 4000, summary_tokens: int = 500):
+        self.model = model
+        self.max_tokens = max_tokens
+        self.summary_tokens = summary_tokens
+        self.summary: List[str] = []
+        self._lock = threading.Lock()
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = self.model.start_chat(history=self._summary_history())
+        return self._session
+
+    def reset(self) -> None:
+        """Forget the conversation."""
+        with self._lock:
+            self.summary = []
+            self._session = None
+
+    @staticmethod
+    def is_follow_up(query: str) -> bool:
+        """Return True if ``query`` only makes sense in the context of the conversation."""
+        return query.lower().strip().startswith(FOLLOW_UP_PREFIXES)
+
+    def record_exchange(self, query: str, reply: str) -> None:
+        """Add an exchange answered elsewhere (e.g. from a cache) to the history."""
+        with self._lock:
+            history = self._history() + [
+                {"role": "user", "parts": [query]},
+                {"role": "model", "parts": [reply]},
+            ]
+            self._session = self.model.start_chat(history=history)
+
+    def send(self, query: str, stream: bool = False):
+        """Send ``query`` in the ongoing conversation and return the SDK response.
+
+        With ``stream`` the chunks are returned as an iterator that must be
+        read to the end or closed, since the session stays locked until then.
+        """
+        self._lock.acquire()
+        try:
+            self._trim(estimate_tokens(query))
+            response = self.session.send_message(query, stream=stream)
+        except BaseException:
+            self._lock.release()
+            raise
+        if not stream:
+            self._lock.release()
+            return response
+        return _LockedStream(response, self._lock)
+
+    def _history(self) -> list:
+        """The session's history, without a last reply that broke off."""
+        try:
+            return list(self.session.history)
+        except _broken_history_errors() as e:
+            logger.warning(f"Dropping the last exchange from the conversation: {e}")
+            try:
+                self._session.rewind()
+            except _broken_history_errors():
+                # A stream abandoned midway can't even be rewound
+                logger.warning("Could not rewind the conversation, starting over from the summary")
+                self._session = self.model.start_chat(history=self._summary_history())
+            return list(self._session.history)
+
+    def _summary_history(self) -> List[dict]:
+        if not self.summary:
+            return []
+        return [
+            {"role": "user", "parts": [SUMMARY_PREFIX + " ".join(self.summary)]},
+            {"role": "model", "parts": [SUMMARY_ACK]},
+        ]
+
+    def _trim(self, incoming_tokens: int) -> None:
+        """Fold the oldest exchanges into the summary until the history fits."""
+        if self._session is None:
+            return
+
+        history = self._history()
+        # Skip the synthetic summary exchange, it is rebuilt below
+        if self.summary and len(history) >= 2 and _message_text(history[0]).startswith(SUMMARY_PREFIX):
+            history = history[2:]
+
+        def total() -> int:
+            messages = self._summary_history() + history
+            return incoming_tokens + sum(estimate_tokens(_message_text(m)) for m in messages)
+
+        if total() <= self.max_tokens:
+            return
+
+        while history and total() > self.max_tokens:
+            user = history.pop(0)
+            reply = history.pop(0) if history and _message_role(history[0]) == "model" else None
+            note = f"I was asked about {_message_text(user).strip()}."
+            if reply is not None:
+                note += " " + _first_sentence(_message_text(reply))
+            self.summary.append(note)
+            while len(self.summary) > 1 and estimate_tokens(" ".join(self.summary)) > self.summary_tokens:
+                self.summary.pop(0)
+
+        logger.info(f"Conversation trimmed to {len(history)} messages plus summary")
+        self._session = self.model.start_chat(history=self._summary_history() + history)
@@ -0,0 +1,185 @@
+import os
+import queue
+import logging
+import threading
+from fnmatch import fnmatch
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXCLUDES = (
+    "node_modules",
+    ".git",
+    "__pycache__",
+    "$Recycle.Bin",
+    "System Volume Information",
+    "Windows/WinSxS",
+)
+
+_DONE = object()
+
+
+class CrawlRoot:
+    """A directory to crawl, with its own depth limit and exclude globs.
+
+    Exclude patterns without a path separator are matched against entry
+    names (``node_modules``); patterns with one are matched against the end
+    of the full path (``Windows/WinSxS``). Matching is case-insensitive.
+    """
+
+    def __init__(self, path, max_depth: Optional[int] = None, exclude: Iterable[str] = DEFAULT_EXCLUDES):
+        self.path = os.path.normpath(str(path))
+        self.max_depth = max_depth
+        self.name_patterns = []
+        self.path_patterns = []
+        for pattern in exclude:
+            pattern = pattern.replace("\\", "/").lower()
+            if "/" in pattern:
+                self.path_patterns.append("*/" + pattern.strip("/"))
+            else:
+                self.name_patterns.append(pattern)
+
+    def excludes(self, name: str, path: str) -> bool:
+        name = name.lower()
+        if any(fnmatch(name, pattern) for pattern in self.name_patterns):
+            return True
+        if self.path_patterns:
+            path = path.replace("\\", "/").lower()
+            return any(fnmatch(path, pattern) for pattern in self.path_patterns)
+        return False
+
+    @classmethod
+    def from_config(cls, value, exclude: Iterable[str] = DEFAULT_EXCLUDES,
+                    max_depth: Optional[int] = None) -> "CrawlRoot":
+        """Build a root from a config value: a path string or a dict with ``path``."""
+        if isinstance(value, dict):
+            return cls(
+                value["path"],
+                max_depth=value.get("max_depth", max_depth),
+                exclude=list(exclude) + list(value.get("exclude", []))
+            )
+        return cls(value, max_depth=max_depth, exclude=exclude)
+
+    def __repr__(self):
+        return f"CrawlRoot({self.path!r}, max_depth={self.max_depth!r})"
+
+
+class CrawlResult:
+    """A file or directory found by the crawler."""
+
+    __slots__ = ("path", "name", "parent", "root", "is_dir", "depth", "mtime")
+
+    def __init__(self, path, name, parent, root, is_dir, depth, mtime=None):
+        self.path = path
+        self.name = name
+        self.parent = parent
+        self.root = root
+        self.is_dir = is_dir
+        self.depth = depth
+        self.mtime = mtime
+
+    def __repr__(self):
+        return f"CrawlResult({self.path!r})"
+
+
+class ParallelCrawler:
+    """Crawl several directory trees concurrently with a bounded thread pool.
+
+    Every directory listing is a separate task, so all roots make progress
+    at the same time and a slow drive does not hold up the others. Results
+    are streamed to the caller as soon as each directory has been listed.
+    """
+
+    def __init__(self, roots: Iterable, max_workers: int = 8):
+        self.roots: List[CrawlRoot] = [
+            root if isinstance(root, CrawlRoot) else CrawlRoot(root) for root in roots
+        ]
+        self.max_workers = max_workers
+
+    def crawl(self, stop: Optional[threading.Event] = None) -> Iterator[CrawlResult]:
+        """Yield every entry below the configured roots as it is found.
+
+        Setting ``stop`` (or closing the generator) abandons the crawl; the
+        directories that are already queued are skipped.
+        """
+        stop = stop or threading.Event()
+        results: "queue.Queue" = queue.Queue()
+        pending = [0]
+        lock = threading.Lock()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="crawler")
+
+        def submit(root: CrawlRoot, directory: str, depth: int) -> None:
+            if stop.is_set():
+                return
+            with lock:
+                pending[0] += 1
+            try:
+                executor.submit(list_dir, root, directory, depth)
+            except RuntimeError:
+                # The crawl was abandoned and the pool is shutting down
+                with lock:
+                    pending[0] -= 1
+
+        def list_dir(root: CrawlRoot, directory: str, depth: int) -> None:
+            try:
+                if stop.is_set():
+                    return
+                batch = []
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if root.excludes(entry.name, entry.path):
+                            continue
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                            mtime = entry.stat(follow_symlinks=False).st_mtime if is_dir else None
+                        except OSError:
+                            continue
+                        batch.append(CrawlResult(entry.path, entry.name, directory, root.path, is_dir, depth, mtime))
+                        if is_dir and (root.max_depth is None or depth < root.max_depth):
+                            submit(root, entry.path, depth + 1)
+                if batch:
+                    results.put(batch)
+            except PermissionError:
+                logger.warning(f"Permission denied accessing {directory}")
+            except OSError as e:
+                logger.debug(f"Error listing {directory}: {e}")
+            except Exception as e:
+                logger.error(f"Error crawling {directory}: {e}")
+            finally:
+                with lock:
+                    pending[0] -= 1
+                    finished = pending[0] == 0
+                if finished:
+                    results.put(_DONE)
+
+        started = False
+        for root in self.roots:
+            if os.path.isdir(root.path):
+                submit(root, root.path, 1)
+                started = True
+            else:
+                logger.warning(f"Drive {root.path} is not accessible")
+
+        try:
+            while started:
+                batch = results.get()
+                if batch is _DONE:
+                    break
+                for result in batch:
+                    yield result
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def find_first(self, predicate: Callable[[CrawlResult], bool]) -> Optional[CrawlResult]:
+        """Return the first entry matching ``predicate`` without waiting for the other roots."""
+        stop = threading.Event()
+        crawl = self.crawl(stop)
+        try:
+            for result in crawl:
+                if predicate(result):
+                    return result
+        finally:
+            crawl.close()
+        return None
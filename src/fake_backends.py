@@ -0,0 +1,304 @@
+"""Local stand-ins for the assistant's external services.
+
+These mimic the small slice of each third-party API that the assistant
+uses, so features can be exercised offline and with controlled latency.
+"""
+import time
+from typing import Iterable, List, Optional
+
+
+class FakeChunk:
+    """A streamed response chunk, mirroring ``GenerateContentResponse`` chunks."""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeResponse:
+    """A model response that can be read whole or iterated chunk by chunk."""
+
+    def __init__(self, text: str, chunk_size: int = 40, first_chunk_delay: float = 0.0,
+                 chunk_delay: float = 0.0):
+        self.text = text
+        self.chunk_size = chunk_size
+        self.first_chunk_delay = first_chunk_delay
+        self.chunk_delay = chunk_delay
+
+    def __iter__(self):
+        time.sleep(self.first_chunk_delay)
+        for start in range(0, len(self.text), self.chunk_size):
+            if start:
+                time.sleep(self.chunk_delay)
+            yield FakeChunk(self.text[start:start + self.chunk_size])
+
+
+class FakeChatSession:
+    """Mirror of ``genai.ChatSession`` backed by ``FakeChatModel``."""
+
+    def __init__(self, model: "FakeChatModel", history: Optional[List[dict]] = None):
+        self.model = model
+        self.history = list(history or [])
+
+    def send_message(self, content: str, stream: bool = False):
+        self.model.requests.append({"history": list(self.history), "content": content})
+        text = self.model.reply(content)
+        self.history.append({"role": "user", "parts": [content]})
+        self.history.append({"role": "model", "parts": [text]})
+        response = FakeResponse(
+            text,
+            chunk_size=self.model.chunk_size,
+            first_chunk_delay=self.model.first_chunk_delay,
+            chunk_delay=self.model.chunk_delay
+        )
+        if not stream:
+            # A blocking call pays for the whole generation up front
+            chunks = max(1, -(-len(text) // self.model.chunk_size))
+            time.sleep(self.model.first_chunk_delay + self.model.chunk_delay * (chunks - 1))
+            response.first_chunk_delay = response.chunk_delay = 0
+        return response
+
+
+class FakeChatModel:
+    """Mirror of ``genai.GenerativeModel`` returning canned replies.
+
+    ``replies`` maps a lowercase substring of the prompt to the reply text;
+    prompts that match nothing get ``default_reply``. Streaming responses
+    are split into ``chunk_size`` character chunks with ``chunk_delay``
+    seconds between them, after ``first_chunk_delay`` seconds of "thinking".
+    """
+
+    def __init__(self, replies: Optional[dict] = None, default_reply: str = "This is a fake answer.",
+                 chunk_size: int = 40, first_chunk_delay: float = 0.0, chunk_delay: float = 0.0):
+        self.replies = replies or {}
+        self.default_reply = default_reply
+        self.chunk_size = chunk_size
+        self.first_chunk_delay = first_chunk_delay
+        self.chunk_delay = chunk_delay
+        self.requests: List[dict] = []
+
+    def reply(self, content: str) -> str:
+        lowered = content.lower()
+        for key, text in self.replies.items():
+            if key in lowered:
+                return text
+        return self.default_reply
+
+    def start_chat(self, history: Optional[Iterable[dict]] = None) -> FakeChatSession:
+        return FakeChatSession(self, list(history or []))
+
+
+class FakeTTSEngine:
+    """Mirror of a ``pyttsx3.Engine`` that "speaks" by sleeping.
+
+    Each word takes ``word_delay`` seconds and fires the ``started-word``
+    callbacks like the real drivers, so ``stop()`` from a callback cuts the
+    utterance short. ``save_to_file`` writes a silent WAV. Everything that
+    was actually spoken is recorded in ``spoken``.
+    """
+
+    def __init__(self, word_delay: float = 0.0, sample_rate: int = 16000):
+        self.word_delay = word_delay
+        self.sample_rate = sample_rate
+        self.properties = {"voice": "fake", "rate": 150, "volume": 1.0, "voices": []}
+        self.callbacks: dict = {}
+        self.spoken: List[str] = []
+        self._queued: List[tuple] = []
+        self._stopping = False
+
+    def getProperty(self, name: str):
+        return self.properties.get(name)
+
+    def setProperty(self, name: str, value) -> None:
+        self.properties[name] = value
+
+    def connect(self, topic: str, callback) -> None:
+        self.callbacks.setdefault(topic, []).append(callback)
+
+    def say(self, text: str, name: Optional[str] = None) -> None:
+        self._queued.append(("say", text))
+
+    def save_to_file(self, text: str, filename: str, name: Optional[str] = None) -> None:
+        self._queued.append(("file", text, filename))
+
+    def stop(self) -> None:
+        self._stopping = True
+
+    def runAndWait(self) -> None:
+        import wave
+
+        queued, self._queued = self._queued, []
+        self._stopping = False
+        for item in queued:
+            if item[0] == "file":
+                with wave.open(item[2], "wb") as wav:
+                    wav.setnchannels(1)
+                    wav.setsampwidth(2)
+                    wav.setframerate(self.sample_rate)
+                    wav.writeframes(b"\0\0" * int(self.sample_rate * self.word_delay * len(item[1].split()) or 1))
+                continue
+            words = []
+            location = 0
+            for word in item[1].split():
+                for callback in self.callbacks.get("started-word", []):
+                    callback(None, location, len(word))
+                if self._stopping:
+                    break
+                time.sleep(self.word_delay)
+                words.append(word)
+                location += len(word) + 1
+            self.spoken.append(" ".join(words))
+            if self._stopping:
+                break
+
+
+class FakeSpotifyServer:
+    """A local HTTP server speaking the slice of the Spotify Web API we use.
+
+    Point a ``spotipy.Spotify`` client at it with ``client.prefix =
+    server.prefix``. Every search returns one track (or album) named after
+    the query; albums have ``album_size`` tracks. Each request waits
+    ``latency`` seconds and is logged in ``requests`` as ``(method, path)``.
+    Devices appear ``device_delay`` seconds after the server starts.
+    """
+
+    def __init__(self, latency: float = 0.0, device_delay: float = 0.0, album_size: int = 10):
+        import threading
+        from http.server import ThreadingHTTPServer
+
+        self.latency = latency
+        self.album_size = album_size
+        self.devices_at = time.monotonic() + device_delay
+        self.requests: List[tuple] = []
+        self.player = {"is_playing": False, "uris": [], "context_uri": None, "index": 0, "queue": []}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name="fake-spotify")
+
+    @property
+    def prefix(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/"
+
+    def start(self) -> "FakeSpotifyServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_log(self) -> None:
+        with self._lock:
+            self.requests.clear()
+
+    @staticmethod
+    def _id(name: str) -> str:
+        import hashlib
+        return hashlib.sha1(name.encode("utf-8")).hexdigest()[:22]
+
+    def _track(self, name: str) -> dict:
+        track_id = self._id(name)
+        return {"id": track_id, "name": name, "uri": f"spotify:track:{track_id}"}
+
+    def _album(self, name: str) -> dict:
+        album_id = self._id("album:" + name)
+        return {"id": album_id, "name": name, "uri": f"spotify:album:{album_id}"}
+
+    def handle(self, method: str, path: str, params: dict, body: dict):
+        """Return ``(status, payload)`` for one API request."""
+        path = path.rstrip("/")
+        with self._lock:
+            self.requests.append((method, path))
+            player = self.player
+            if path == "/v1/me/player/devices":
+                if time.monotonic() < self.devices_at:
+                    return 200, {"devices": []}
+                return 200, {"devices": [{"id": "fake-device", "name": "Fake Speaker", "is_active": True}]}
+            if path == "/v1/search":
+                query = params.get("q", "")
+                if params.get("type") == "album":
+                    return 200, {"albums": {"items": [self._album(query)] if query else []}}
+                return 200, {"tracks": {"items": [self._track(query)] if query else []}}
+            if path.startswith("/v1/albums/") and path.endswith("/tracks"):
+                album_id = path.split("/")[3]
+                tracks = [self._track(f"{album_id} track {i + 1}") for i in range(self.album_size)]
+                return 200, {"items": tracks}
+            if path == "/v1/me/player/play":
+                if "uris" in body or "context_uri" in body:
+                    player.update(uris=body.get("uris", []), context_uri=body.get("context_uri"), index=0)
+                player["is_playing"] = True
+                return 204, None
+            if path == "/v1/me/player/pause":
+                player["is_playing"] = False
+                return 204, None
+            if path == "/v1/me/player/next":
+                player["index"] += 1
+                return 204, None
+            if path == "/v1/me/player/previous":
+                player["index"] = max(0, player["index"] - 1)
+                return 204, None
+            if path == "/v1/me/player/queue":
+                player["queue"].append(params.get("uri"))
+                return 204, None
+        return 404, {"error": {"status": 404, "message": "Not found"}}
+
+    def _handler(self):
+        import json
+        from urllib.parse import parse_qsl, urlsplit
+        from http.server import BaseHTTPRequestHandler
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _respond(self):
+                url = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                body = json.loads(raw) if raw else {}
+                time.sleep(server.latency)
+                status, payload = server.handle(self.command, url.path, dict(parse_qsl(url.query)), body)
+                data = json.dumps(payload).encode("utf-8") if payload is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_PUT = do_POST = do_DELETE = _respond
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+class FakeClock:
+    """A clock that only moves when told to, with the ``SystemClock`` interface.
+
+    ``sleep`` advances the clock instead of waiting, so code that sleeps
+    runs instantly and sees the time it expected to pass.
+    """
+
+    def __init__(self, start: float = 1_700_000_000.0):
+        self._now = start
+        self._monotonic = 0.0
+
+    def time(self) -> float:
+        return self._now
+
+    def monotonic(self) -> float:
+        return self._monotonic
+
+    def now(self):
+        from datetime import datetime
+        return datetime.fromtimestamp(self._now)
+
+    def advance(self, seconds: float) -> None:
+        self._now += seconds
+        self._monotonic += seconds
+
+    def sleep(self, seconds: float) -> None:
+        self.advance(max(0.0, seconds))
@@ -0,0 +1,321 @@
+import os
+import sqlite3
+import logging
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from crawler import CrawlRoot, ParallelCrawler
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = "file_index.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    path TEXT PRIMARY KEY,
+    parent TEXT NOT NULL,
+    root TEXT NOT NULL,
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    is_dir INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_name ON entries(name_lower);
+CREATE INDEX IF NOT EXISTS idx_entries_parent ON entries(parent);
+"""
+
+
+def trigrams(text: str) -> set:
+    """Return the set of character trigrams of a lowercase string."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class IndexEntry:
+    """A single indexed file or folder."""
+
+    __slots__ = ("path", "name", "root", "is_dir")
+
+    def __init__(self, path: str, name: str, root: str, is_dir: bool):
+        self.path = path
+        self.name = name
+        self.root = root
+        self.is_dir = is_dir
+
+    def __repr__(self):
+        return f"IndexEntry({self.path!r})"
+
+
+class _Snapshot:
+    """Immutable in-memory view of the index used to answer queries."""
+
+    def __init__(self, rows: Iterable[Tuple[str, str, str, int]]):
+        self.paths: List[str] = []
+        self.names: List[str] = []
+        self.roots: List[str] = []
+        self.is_dir = bytearray()
+        self.grams: Dict[str, array] = {}
+        for path, name_lower, root, is_dir in rows:
+            idx = len(self.paths)
+            self.paths.append(path)
+            self.names.append(name_lower)
+            self.roots.append(root)
+            self.is_dir.append(1 if is_dir else 0)
+            for gram in trigrams(name_lower):
+                postings = self.grams.get(gram)
+                if postings is None:
+                    postings = self.grams[gram] = array("i")
+                postings.append(idx)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def candidates(self, needle: str) -> Iterable[int]:
+        """Yield indices whose name may contain ``needle`` (trigram filter)."""
+        grams = trigrams(needle)
+        if not grams:
+            return range(len(self.paths))
+        postings = []
+        for gram in grams:
+            ids = self.grams.get(gram)
+            if ids is None:
+                return ()
+            postings.append(ids)
+        postings.sort(key=len)
+        result = set(postings[0])
+        for ids in postings[1:]:
+            result.intersection_update(ids)
+            if not result:
+                break
+        return sorted(result)
+
+
+class FileIndex:
+    """Persistent name -> path index over a set of root directories.
+
+    The index is stored in SQLite so it survives restarts, and is refreshed
+    incrementally: only directories whose mtime changed since the last scan
+    are listed again. Queries are answered from an in-memory trigram snapshot
+    so they do not touch the disk.
+    """
+
+    def __init__(self, roots: Iterable, db_path: str = DEFAULT_INDEX_PATH, max_workers: int = 8):
+        self.crawl_roots = [root if isinstance(root, CrawlRoot) else CrawlRoot(root) for root in roots]
+        self.roots = [root.path for root in self.crawl_roots]
+        self.db_path = db_path
+        self.max_workers = max_workers
+        self.ready = threading.Event()
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._snapshot = _Snapshot(())
+        self._build_thread: Optional[threading.Thread] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript(SCHEMA)
+        return conn
+
+    def load(self) -> None:
+        """Load the persisted index into memory without touching the file system."""
+        try:
+            with self._connect() as conn:
+                self._load_snapshot(conn)
+        except sqlite3.Error as e:
+            logger.error(f"Error loading file index: {e}")
+
+    def _load_snapshot(self, conn: sqlite3.Connection) -> None:
+        placeholders = ",".join("?" * len(self.roots))
+        rows = conn.execute(
+            f"SELECT path, name_lower, root, is_dir FROM entries WHERE root IN ({placeholders})",
+            self.roots
+        ) if self.roots else ()
+        snapshot = _Snapshot(rows)
+        with self._lock:
+            self._snapshot = snapshot
+        if len(snapshot):
+            self.ready.set()
+
+    def build_async(self) -> threading.Thread:
+        """Load the persisted index and refresh it in a background thread."""
+        if self._build_thread and self._build_thread.is_alive():
+            return self._build_thread
+        self._build_thread = threading.Thread(target=self._build, daemon=True, name="file-index")
+        self._build_thread.start()
+        return self._build_thread
+
+    def _build(self) -> None:
+        self.load()
+        self.refresh()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self.ready.wait(timeout)
+
+    def refresh(self) -> None:
+        """Bring the on-disk index up to date with the file system."""
+        with self._build_lock:
+            try:
+                with self._connect() as conn:
+                    unscanned = []
+                    for root in self.crawl_roots:
+                        if not self._refresh_root(conn, root):
+                            unscanned.append(root)
+                    # Roots seen for the first time are crawled together so
+                    # that every drive is scanned concurrently
+                    self._scan_trees(conn, unscanned)
+                    conn.commit()
+                    self._load_snapshot(conn)
+                logger.info(f"File index refreshed: {len(self._snapshot)} entries")
+            except sqlite3.Error as e:
+                logger.error(f"Error refreshing file index: {e}")
+            finally:
+                self.ready.set()
+
+    def _refresh_root(self, conn: sqlite3.Connection, root: CrawlRoot) -> bool:
+        """Rescan the changed directories of an indexed root.
+
+        Returns False if the root has never been indexed and needs a full crawl.
+        """
+        if not os.path.isdir(root.path):
+            logger.warning(f"Index root {root.path} is not accessible")
+            return True
+
+        known = dict(conn.execute("SELECT path, mtime FROM dirs WHERE root = ?", (root.path,)))
+        if not known:
+            return False
+
+        for directory, mtime in known.items():
+            try:
+                current = os.stat(directory).st_mtime
+            except OSError:
+                self._forget_tree(conn, directory)
+                continue
+            if current != mtime:
+                self._rescan_dir(conn, root, directory, current)
+        return True
+
+    def _rescan_dir(self, conn: sqlite3.Connection, root: CrawlRoot, directory: str, mtime: float) -> None:
+        """Re-list one changed directory, crawling any subdirectories that are new."""
+        previous = {
+            path: is_dir for path, is_dir in
+            conn.execute("SELECT path, is_dir FROM entries WHERE parent = ?", (directory,))
+        }
+        current = {}
+        for entry in self._list_dir(root, directory):
+            current[entry.path] = entry
+
+        for path, is_dir in previous.items():
+            if path not in current:
+                if is_dir:
+                    self._forget_tree(conn, path)
+                conn.execute("DELETE FROM entries WHERE path = ?", (path,))
+
+        depth = os.path.relpath(directory, root.path).count(os.sep) + (directory != root.path)
+        new_dirs = []
+        for path, entry in current.items():
+            if path in previous:
+                continue
+            self._insert(conn, root.path, directory, entry)
+            if entry.is_dir and (root.max_depth is None or depth + 1 < root.max_depth):
+                remaining = None if root.max_depth is None else root.max_depth - depth - 1
+                new_dirs.append(self._subroot(root, path, remaining))
+        self._scan_trees(conn, new_dirs, index_root=root.path)
+
+        conn.execute("UPDATE dirs SET mtime = ? WHERE path = ?", (mtime, directory))
+
+    @staticmethod
+    def _subroot(root: CrawlRoot, path: str, max_depth: Optional[int]) -> CrawlRoot:
+        subroot = CrawlRoot(path, max_depth=max_depth, exclude=())
+        subroot.name_patterns = root.name_patterns
+        subroot.path_patterns = root.path_patterns
+        return subroot
+
+    def _scan_trees(self, conn: sqlite3.Connection, roots: List[CrawlRoot],
+                    index_root: Optional[str] = None) -> None:
+        """Index every entry below ``roots`` using a parallel crawl."""
+        roots = [root for root in roots if os.path.isdir(root.path)]
+        if not roots:
+            return
+        for root in roots:
+            conn.execute(
+                "INSERT OR REPLACE INTO dirs (path, root, mtime) VALUES (?, ?, ?)",
+                (root.path, index_root or root.path, os.stat(root.path).st_mtime)
+            )
+        crawler = ParallelCrawler(roots, max_workers=self.max_workers)
+        for result in crawler.crawl():
+            owner = index_root or result.root
+            self._insert(conn, owner, result.parent, IndexEntry(result.path, result.name, owner, result.is_dir))
+            if result.is_dir:
+                conn.execute(
+                    "INSERT OR REPLACE INTO dirs (path, root, mtime) VALUES (?, ?, ?)",
+                    (result.path, owner, result.mtime)
+                )
+
+    def _list_dir(self, root: CrawlRoot, directory: str) -> List[IndexEntry]:
+        entries = []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if root.excludes(entry.name, entry.path):
+                        continue
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    entries.append(IndexEntry(entry.path, entry.name, root.path, is_dir))
+        except PermissionError:
+            logger.warning(f"Permission denied accessing {directory}")
+        except OSError as e:
+            logger.debug(f"Error listing {directory}: {e}")
+        return entries
+
+    def _insert(self, conn: sqlite3.Connection, root: str, parent: str, entry: IndexEntry) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (path, parent, root, name, name_lower, is_dir) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (entry.path, parent, root, entry.name, entry.name.lower(), int(entry.is_dir))
+        )
+
+    def _forget_tree(self, conn: sqlite3.Connection, top: str) -> None:
+        prefix = top.rstrip(os.sep) + os.sep
+        conn.execute("DELETE FROM dirs WHERE path = ? OR substr(path, 1, ?) = ?", (top, len(prefix), prefix))
+        conn.execute("DELETE FROM entries WHERE substr(path, 1, ?) = ?", (len(prefix), prefix))
+
+    def __len__(self):
+        return len(self._snapshot)
+
+    def snapshot(self) -> _Snapshot:
+        """Return the current in-memory view of the index."""
+        with self._lock:
+            return self._snapshot
+
+    def search(self, needle: str, roots: Optional[Iterable] = None, is_dir: Optional[bool] = None,
+               suffixes: Tuple[str, ...] = (), limit: Optional[int] = None) -> List[IndexEntry]:
+        """Return entries whose name contains ``needle``, in index order."""
+        needle = needle.lower()
+        wanted_roots = {os.path.normpath(str(getattr(root, 'path', root))) for root in roots} if roots is not None else None
+        snapshot = self.snapshot()
+
+        results = []
+        for idx in snapshot.candidates(needle):
+            name = snapshot.names[idx]
+            if needle not in name:
+                continue
+            if is_dir is not None and bool(snapshot.is_dir[idx]) != is_dir:
+                continue
+            if suffixes and not name.endswith(suffixes):
+                continue
+            if wanted_roots is not None and snapshot.roots[idx] not in wanted_roots:
+                continue
+            path = snapshot.paths[idx]
+            results.append(IndexEntry(path, os.path.basename(path), snapshot.roots[idx], bool(snapshot.is_dir[idx])))
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    def find_first(self, needle: str, **kwargs) -> Optional[str]:
+        results = self.search(needle, limit=1, **kwargs)
+        return results[0].path if results else None
@@ -0,0 +1,250 @@
+import os
+import re
+import json
+import math
+import time
+import heapq
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from file_index import FileIndex, trigrams
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_PATH = "launch_history.json"
+
+# Posting lists longer than this are only used when nothing rarer matched,
+# they cost more to merge than they help to rank
+MAX_SEED_POSTINGS = 50000
+
+# At most this many candidates are ranked for scoring, whatever the index size
+MAX_CANDIDATES = 5000
+
+# How many ids are merged or names scanned between two deadline checks
+CHECK_EVERY = 4096
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class Match:
+    """A ranked candidate returned by the matcher."""
+
+    __slots__ = ("path", "score")
+
+    def __init__(self, path: str, score: float):
+        self.path = path
+        self.score = score
+
+    def __repr__(self):
+        return f"Match({self.path!r}, {self.score:.3f})"
+
+
+class LaunchHistory:
+    """Persistent launch counts and timestamps used to boost recent targets."""
+
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH, half_life_days: float = 14,
+                 clock: Callable[[], float] = time.time):
+        self.path = path
+        self.clock = clock
+        self.half_life = half_life_days * 86400
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = self._load()
+
+    def _load(self) -> Dict[str, dict]:
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, "r") as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading launch history: {e}")
+        return {}
+
+    def record(self, path: str) -> None:
+        with self._lock:
+            entry = self._entries.setdefault(path, {"count": 0, "last": 0})
+            entry["count"] += 1
+            entry["last"] = self.clock()
+            try:
+                with open(self.path, "w") as f:
+                    json.dump(self._entries, f)
+            except Exception as e:
+                logger.error(f"Error saving launch history: {e}")
+
+    def boost(self, path: str, now: float) -> float:
+        """Return a 0..1 score that grows with launch count and decays with age."""
+        entry = self._entries.get(path)
+        if not entry:
+            return 0.0
+        decay = 0.5 ** ((now - entry["last"]) / self.half_life)
+        return min(1.0, math.log1p(entry["count"]) / 3) * decay
+
+
+class FuzzyMatcher:
+    """Rank index entries against a spoken name.
+
+    Candidates are pulled from the index's trigram postings, so only names
+    sharing at least one trigram with the query are scored. Scoring combines
+    trigram similarity and token matches on the file stem with weights for
+    Start Menu shortcuts, path depth and launch recency. Root, type and
+    suffix filters are applied while candidates are gathered, so they never
+    crowd out the entries that pass. Scoring stops when the latency budget
+    is spent and the best candidates seen so far are returned.
+    """
+
+    def __init__(self, index: FileIndex, history: Optional[LaunchHistory] = None,
+                 budget_ms: float = 20, min_score: float = 0.5):
+        self.index = index
+        self.history = history or LaunchHistory()
+        self.budget = budget_ms / 1000
+        self.min_score = min_score
+        self._lock = threading.Lock()
+        self._eligible_snapshot = None
+        self._eligible_cache: Dict[tuple, Tuple[frozenset, List[int]]] = {}
+
+    def _eligible(self, snapshot, roots: Optional[frozenset], is_dir: Optional[bool],
+                  suffixes: Tuple[str, ...]) -> Optional[Tuple[frozenset, List[int]]]:
+        """Ids passing the filters, as a set and in index order; None when nothing is filtered.
+
+        Computed once per snapshot and filter combination, since the
+        assistant only ever asks for a few (applications, folders).
+        """
+        if roots is None and is_dir is None and not suffixes:
+            return None
+        key = (roots, is_dir, suffixes)
+        with self._lock:
+            if self._eligible_snapshot is not snapshot:
+                self._eligible_snapshot, self._eligible_cache = snapshot, {}
+            cached = self._eligible_cache.get(key)
+        if cached is None:
+            ordered = [
+                idx for idx in range(len(snapshot))
+                if (is_dir is None or bool(snapshot.is_dir[idx]) == is_dir)
+                and (not suffixes or snapshot.names[idx].endswith(suffixes))
+                and (roots is None or snapshot.roots[idx] in roots)
+            ]
+            cached = (frozenset(ordered), ordered)
+            with self._lock:
+                if self._eligible_snapshot is snapshot:
+                    self._eligible_cache[key] = cached
+        return cached
+
+    def _candidates(self, snapshot, query: str, deadline: float,
+                    eligible: Optional[Tuple[frozenset, List[int]]] = None) -> Iterable[int]:
+        """Up to ``MAX_CANDIDATES`` index ids worth scoring, most promising first.
+
+        Only ``eligible`` ids are gathered, so entries ruled out by the
+        caller's filters never take the place of ones that could match.
+        Gathering stops at ``deadline`` with whatever was found so far, so
+        very common trigrams or short queries on a large index can't eat
+        the whole budget before scoring starts.
+        """
+        grams = trigrams(query)
+        if not grams:
+            found = []
+            names = snapshot.names
+            ids = range(len(names)) if eligible is None else eligible[1]
+            for start in range(0, len(ids), CHECK_EVERY):
+                found.extend(idx for idx in ids[start:start + CHECK_EVERY] if query in names[idx])
+                if len(found) >= MAX_CANDIDATES or time.perf_counter() > deadline:
+                    break
+            return found[:MAX_CANDIDATES]
+
+        postings = sorted(
+            (snapshot.grams[gram] for gram in grams if gram in snapshot.grams),
+            key=len
+        )
+        if not postings:
+            return ()
+
+        hits: Dict[int, int] = {}
+        for ids in postings:
+            if hits and len(ids) > MAX_SEED_POSTINGS:
+                break
+            if eligible is not None:
+                ids = list(eligible[0].intersection(ids))
+            for start in range(0, len(ids), CHECK_EVERY):
+                for idx in ids[start:start + CHECK_EVERY]:
+                    hits[idx] = hits.get(idx, 0) + 1
+                if time.perf_counter() > deadline:
+                    break
+            else:
+                continue
+            logger.debug(f"Fuzzy match stopped gathering candidates after {len(hits)} hits")
+            break
+        # Names sharing the most trigrams are scored first so that running
+        # out of budget only drops the weakest candidates
+        return heapq.nlargest(MAX_CANDIDATES, hits, key=hits.get)
+
+    def top(self, query: str, k: int = 5, roots: Optional[Iterable] = None,
+            is_dir: Optional[bool] = None, suffixes: Tuple[str, ...] = ()) -> List[Match]:
+        """Return up to ``k`` best matches for ``query``, best first."""
+        query = query.lower().strip()
+        if not query:
+            return []
+
+        snapshot = self.index.snapshot()
+        wanted_roots = frozenset(os.path.normpath(str(getattr(root, "path", root))) for root in roots) \
+            if roots is not None else None
+        query_grams = trigrams(query)
+        query_tokens = _TOKEN_RE.findall(query)
+        now = self.history.clock()
+        start = time.perf_counter()
+        deadline = start + self.budget
+        eligible = self._eligible(snapshot, wanted_roots, is_dir, tuple(suffixes))
+        # Keep at least half of the budget for scoring
+        candidates = self._candidates(snapshot, query, start + self.budget / 2, eligible)
+
+        scored = []
+        for count, idx in enumerate(candidates):
+            if count % 64 == 0 and count and time.perf_counter() > deadline:
+                logger.debug(f"Fuzzy match budget exhausted after {count} candidates")
+                break
+            root = snapshot.roots[idx]
+            path = snapshot.paths[idx]
+            score = self._score(query, query_grams, query_tokens, snapshot.names[idx], path, root)
+            if score < self.min_score:
+                continue
+            score += 0.3 * self.history.boost(path, now)
+            scored.append((score, path))
+
+        return [Match(path, score) for score, path in heapq.nlargest(k, scored)]
+
+    def best(self, query: str, **kwargs) -> Optional[str]:
+        matches = self.top(query, k=1, **kwargs)
+        return matches[0].path if matches else None
+
+    def record_launch(self, path: str) -> None:
+        self.history.record(path)
+
+    @staticmethod
+    def _score(query: str, query_grams: set, query_tokens: List[str], name: str, path: str, root: str) -> float:
+        stem, ext = os.path.splitext(name)
+        if stem == query:
+            score = 1.0
+        elif stem.startswith(query):
+            score = 0.8
+        elif query in stem:
+            score = 0.65
+        else:
+            score = 0.0
+
+        stem_grams = trigrams(stem)
+        if query_grams and stem_grams:
+            shared = len(query_grams & stem_grams)
+            score += 0.5 * 2 * shared / (len(query_grams) + len(stem_grams))
+
+        stem_tokens = set(_TOKEN_RE.findall(stem))
+        if query_tokens and all(token in stem_tokens for token in query_tokens):
+            score += 0.25
+
+        # Prefer short names that are mostly the query over long ones that contain it
+        score -= 0.1 * min(1.0, (len(stem) - len(query)) / 20) if len(stem) > len(query) else 0
+
+        if ext == ".lnk":
+            score += 0.15
+            if "start menu" in path.lower():
+                score += 0.1
+        depth = path.count(os.sep) - root.rstrip(os.sep).count(os.sep) - 1
+        score -= min(0.2, 0.02 * max(depth, 0))
+        return score
@@ -1,12 +1,202 @@
 import tkinter as tk
 from tkinter import ttk
 import ttkbootstrap as ttk
-import json
 from datetime import datetime
-import os
+import queue
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from message_store import MessageJournal
+from history_index import HistoryIndex
+from telemetry import TRACER
+
+
+class MessageRow:
+    """A reusable message bubble: one frame with a timestamp and a text label."""
+
+    def __init__(self, canvas):
+        self.frame = ttk.Frame(canvas)
+        self.time_label = ttk.Label(self.frame, font=("Segoe UI", 8), foreground="gray")
+        self.time_label.pack(padx=5)
+        self.text_label = ttk.Label(self.frame, style="Message.TLabel")
+        self.text_label.pack(padx=10, pady=5)
+        self.item = canvas.create_window(0, 0, window=self.frame, anchor="nw", state="hidden")
+        self.index = None
+
+    def show(self, index, message):
+        is_user = message["is_user"]
+        try:
+            timestamp = datetime.fromisoformat(message["timestamp"]).strftime("%H:%M")
+        except (KeyError, ValueError):
+            timestamp = ""
+        self.index = index
+        self.frame.configure(style="UserMessage.TFrame" if is_user else "AssistantMessage.TFrame")
+        self.time_label.configure(text=timestamp)
+        self.time_label.pack_configure(anchor="e" if is_user else "w")
+        self.text_label.configure(text=message["text"], justify="right" if is_user else "left")
+
+
+class VirtualMessageList:
+    """Chat transcript that only creates widgets for the messages in view.
+
+    Every message has a height (estimated until its row has been measured)
+    and the canvas scroll region spans all of them, but only enough
+    ``MessageRow`` widgets to fill the window exist; they are re-bound to
+    other messages as the view scrolls. Older history is paged in from the
+    journal when the view reaches the top, so startup only reads the last
+    page however long the history is.
+    """
+
+    ROW_GAP = 20
+    LINE_HEIGHT = 22
+    CHARS_PER_LINE = 75
+    OVERSCAN = 2
+
+    def __init__(self, parent, journal, page_size=50):
+        self.journal = journal
+        self.page_size = page_size
+        self.messages = []
+        self.heights = []
+        self.offsets = [0]
+        self.rows = []
+        self.cursor = None
+        self.has_older = True
+        self._render_pending = False
+
+        self.canvas = tk.Canvas(parent, highlightthickness=0)
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self._on_scroll)
+        self.canvas.bind("<Configure>", self._on_configure)
+        self.canvas.bind("<MouseWheel>", self._on_mousewheel)
+
+    def pack(self):
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+    def load_latest(self):
+        messages, self.cursor = self.journal.read_page(count=self.page_size)
+        self.has_older = self.cursor > 0
+        self.messages = messages
+        self.heights = [self._estimate_height(message) for message in messages]
+        self._relayout()
+        self.canvas.yview_moveto(1.0)
+        self._schedule_render()
+
+    def append(self, message):
+        self.extend([message])
+
+    def extend(self, messages):
+        following = self.canvas.yview()[1] >= 0.999
+        for message in messages:
+            self.messages.append(message)
+            self.heights.append(self._estimate_height(message))
+            self.offsets.append(self.offsets[-1] + self.heights[-1])
+        self._update_scrollregion()
+        if following:
+            self.canvas.yview_moveto(1.0)
+        self._schedule_render()
+
+    def _load_older(self):
+        messages, self.cursor = self.journal.read_page(self.cursor, self.page_size)
+        self.has_older = self.cursor > 0
+        if not messages:
+            return
+        top = self.canvas.canvasy(0)
+        heights = [self._estimate_height(message) for message in messages]
+        self.messages[:0] = messages
+        self.heights[:0] = heights
+        for row in self.rows:
+            if row.index is not None:
+                row.index += len(messages)
+        self._relayout()
+        # Keep the messages that were in view where they were
+        self.canvas.yview_moveto((top + sum(heights)) / max(1, self.offsets[-1]))
+
+    def _estimate_height(self, message):
+        text = message["text"]
+        lines = sum(len(line) // self.CHARS_PER_LINE + 1 for line in text.split("\n"))
+        return 70 + lines * self.LINE_HEIGHT
+
+    def _relayout(self):
+        self.offsets = list(accumulate(self.heights, initial=0))
+        self._update_scrollregion()
+
+    def _update_scrollregion(self):
+        height = max(self.offsets[-1], self.canvas.winfo_height())
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), height))
+
+    def _on_configure(self, event):
+        self._update_scrollregion()
+        self._schedule_render()
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self._schedule_render()
+
+    def _on_mousewheel(self, event):
+        self.canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
+        return "break"
+
+    def _schedule_render(self):
+        if not self._render_pending:
+            self._render_pending = True
+            self.canvas.after_idle(self._render)
+
+    def _render(self):
+        self._render_pending = False
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+        first = max(0, bisect_right(self.offsets, top) - 1 - self.OVERSCAN)
+        last = min(len(self.messages), bisect_left(self.offsets, bottom) + self.OVERSCAN)
+
+        visible = {row.index: row for row in self.rows if row.index is not None and first <= row.index < last}
+        free = [row for row in self.rows if row not in visible.values()]
+        remeasured = False
+        for index in range(first, last):
+            row = visible.get(index)
+            if row is None:
+                row = free.pop() if free else self._new_row()
+                row.show(index, self.messages[index])
+                visible[index] = row
+                row.frame.update_idletasks()
+                height = row.frame.winfo_reqheight() + self.ROW_GAP
+                if height != self.heights[index]:
+                    self.heights[index] = height
+                    remeasured = True
+        for row in free:
+            row.index = None
+            self.canvas.itemconfigure(row.item, state="hidden")
+
+        following = self.canvas.yview()[1] >= 0.999
+        if remeasured:
+            self._relayout()
+            if following:
+                self.canvas.yview_moveto(1.0)
+        width = self.canvas.winfo_width()
+        for index, row in visible.items():
+            is_user = self.messages[index]["is_user"]
+            x = width - 20 if is_user else 20
+            self.canvas.coords(row.item, x, self.offsets[index] + self.ROW_GAP // 2)
+            self.canvas.itemconfigure(row.item, anchor="ne" if is_user else "nw", state="normal")
+
+        if first == 0 and self.has_older and top <= 0:
+            self.canvas.after_idle(self._load_older)
+
+    def _new_row(self):
+        row = MessageRow(self.canvas)
+        for widget in (row.frame, row.time_label, row.text_label):
+            widget.bind("<MouseWheel>", self._on_mousewheel)
+        self.rows.append(row)
+        return row
 
 class VoiceAssistantGUI:
-    def __init__(self):
+    # Widgets may only be touched from the Tk thread, so other threads post
+    # updates to a bounded queue that is drained about once per frame
+    UPDATE_INTERVAL_MS = 16
+    UPDATE_BATCH = 500
+    UPDATE_QUEUE_SIZE = 2000
+    UPDATE_PUT_TIMEOUT = 1.0
+
+    def __init__(self, journal=None, history=None):
         # Initialize main window
         self.root = ttk.Window(themename="litera")
         self.root.title("Voice Assistant")
@@ -18,9 +208,17 @@ class VoiceAssistantGUI:
         self.is_admin = tk.BooleanVar(value=False)
         self.is_dark_mode = tk.BooleanVar(value=False)
         self.is_listening = tk.BooleanVar(value=False)
-
-        # Message history
-        self.messages = []
+        self._diagnostics_job = None
+
+        # Message history, usually the assistant's so recall works without the window
+        self._owns_history = journal is None
+        if journal is None:
+            journal, history = MessageJournal(), HistoryIndex()
+            journal.listeners.append(history.add_many)
+            history.sync_async(journal)
+        self.journal = journal
+        self.history = history
+        self.updates = queue.Queue(maxsize=self.UPDATE_QUEUE_SIZE)
 
         # Create UI
         self.setup_styles()
@@ -29,6 +227,7 @@ class VoiceAssistantGUI:
 
         # Load message history if it exists
         self.load_messages()
+        self.root.after(self.UPDATE_INTERVAL_MS, self._drain_updates)
 
     def toggle_theme(self):
         """Toggle between light and dark theme"""
@@ -95,12 +294,16 @@ class VoiceAssistantGUI:
         # Hide all views first
         self.chat_frame.pack_forget()
         self.docs_frame.pack_forget()
+        self.diagnostics_frame.pack_forget()
 
         # Show the requested view
         if view_name == "chat":
             self.chat_frame.pack(fill=tk.BOTH, expand=True)
         elif view_name == "docs":
             self.docs_frame.pack(fill=tk.BOTH, expand=True)
+        elif view_name == "diagnostics":
+            self.diagnostics_frame.pack(fill=tk.BOTH, expand=True)
+            self.refresh_diagnostics()
 
     def setup_bindings(self):
         """Setup keyboard shortcuts and event bindings"""
@@ -111,59 +314,29 @@ class VoiceAssistantGUI:
         self.root.bind('<Escape>', lambda e: self.root.iconify())
 
     def load_messages(self):
-        """Load message history from file"""
+        """Load the most recent page of message history"""
         try:
-            if os.path.exists("message_history.json"):
-                with open("message_history.json", "r") as f:
-                    self.messages = json.load(f)
-                    for msg in self.messages:
-                        self.display_message(msg["text"], msg["is_user"])
+            self.message_list.load_latest()
         except Exception as e:
             print(f"Error loading messages: {e}")
 
+    @property
+    def messages(self):
+        """Messages currently loaded in the chat view, oldest first"""
+        return self.message_list.messages
+
     def save_messages(self):
-        """Save message history to file"""
-        try:
-            with open("message_history.json", "w") as f:
-                json.dump(self.messages, f)
-        except Exception as e:
-            print(f"Error saving messages: {e}")
+        """Write pending messages to the history journal"""
+        self.journal.flush()
 
     def add_message(self, text, is_user=True):
-        """Add a new message to history"""
-        self.messages.append({"text": text, "is_user": is_user, "timestamp": datetime.now().isoformat()})
-        self.display_message(text, is_user)
-        self.save_messages()
-
-    def display_message(self, text, is_user):
-            msg_frame = ttk.Frame(
-                self.messages_frame,
-                style="UserMessage.TFrame" if is_user else "AssistantMessage.TFrame"
-            )
-            msg_frame.pack(
-                fill="x",
-                pady=10,
-                padx=20,
-                anchor="e" if is_user else "w"
-            )
-
-            # Add timestamp
-            time_label = ttk.Label(
-                msg_frame,
-                text=datetime.now().strftime("%H:%M"),
-                font=("Segoe UI", 8),
-                foreground="gray"
-            )
-            time_label.pack(anchor="e" if is_user else "w", padx=5)
-
-            # Add message text with enhanced styling
-            msg_label = ttk.Label(
-                msg_frame,
-                text=text,
-                style="Message.TLabel",
-                justify="right" if is_user else "left"
-            )
-            msg_label.pack(padx=10, pady=5)
+        """Add a new message to history; safe to call from any thread"""
+        message = {"text": text, "is_user": is_user, "timestamp": datetime.now().isoformat()}
+        self.journal.append(message)
+        self.display_message(message)
+
+    def display_message(self, message):
+        self._post_update("message", message)
 
     def create_layout(self):
         """Create the main application layout"""
@@ -180,6 +353,7 @@ class VoiceAssistantGUI:
         # Create views
         self.create_chat_view()
         self.create_docs_view()
+        self.create_diagnostics_view()
 
         # Show initial view
         self.show_view("chat")
@@ -213,6 +387,13 @@ class VoiceAssistantGUI:
             style="Sidebar.TButton"
         ).pack(pady=5)
 
+        ttk.Button(
+            sidebar,
+            text="📊 Stats",
+            command=lambda: self.show_view("diagnostics"),
+            style="Sidebar.TButton"
+        ).pack(pady=5)
+
         # Admin toggle
         self.admin_btn = ttk.Button(
             sidebar,
@@ -222,8 +403,58 @@ class VoiceAssistantGUI:
         )
         self.admin_btn.pack(side=tk.BOTTOM, pady=20)
 
+    def search_history(self, query):
+        """Show the stored messages best matching query"""
+        hits = self.history.search(query, limit=50)
+        self.search_results.delete(0, tk.END)
+        if not query.strip():
+            self.clear_search()
+            return
+        if not hits:
+            self.search_results.insert(tk.END, "No matching messages")
+        for hit in hits:
+            try:
+                when = datetime.fromisoformat(hit.timestamp).strftime("%Y-%m-%d %H:%M")
+            except ValueError:
+                when = hit.timestamp
+            speaker = "You" if hit.is_user else "Assistant"
+            self.search_results.insert(tk.END, f"{when}  {speaker}: {hit.snippet}")
+        self.search_frame.pack(fill=tk.X, before=self.msg_container)
+
+    def clear_search(self):
+        self.search_var.set("")
+        self.search_frame.pack_forget()
+
     def set_listening_state(self, state):
-        """Set the listening state and update the UI."""
+        """Set the listening state; safe to call from any thread."""
+        self._post_update("listening", state)
+
+    def _post_update(self, kind, value):
+        try:
+            self.updates.put((kind, value), timeout=self.UPDATE_PUT_TIMEOUT)
+        except queue.Full:
+            print(f"GUI update queue is full, dropping {kind} update")
+
+    def _drain_updates(self):
+        """Apply queued updates on the Tk thread, one redraw per batch."""
+        messages = []
+        listening = None
+        try:
+            for _ in range(self.UPDATE_BATCH):
+                kind, value = self.updates.get_nowait()
+                if kind == "message":
+                    messages.append(value)
+                elif kind == "listening":
+                    listening = value
+        except queue.Empty:
+            pass
+        if messages:
+            self.message_list.extend(messages)
+        if listening is not None:
+            self._apply_listening_state(listening)
+        self.root.after(self.UPDATE_INTERVAL_MS, self._drain_updates)
+
+    def _apply_listening_state(self, state):
         self.is_listening.set(state)
         if state:
             self.listening_dot.configure(foreground="green")
@@ -253,28 +484,26 @@ class VoiceAssistantGUI:
             foreground="blue"
         )
 
+        # History search
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(header, textvariable=self.search_var, width=30)
+        search_entry.pack(side=tk.RIGHT, padx=(10, 0))
+        search_entry.bind("<Return>", lambda e: self.search_history(self.search_var.get()))
+        search_entry.bind("<Escape>", lambda e: self.clear_search())
+        ttk.Label(header, text="🔍", font=("Segoe UI", 11)).pack(side=tk.RIGHT)
+
+        self.search_frame = ttk.Frame(self.chat_frame, padding="20 0 20 10")
+        self.search_results = tk.Listbox(self.search_frame, height=8, font=("Segoe UI", 10), activestyle="none")
+        self.search_results.pack(fill=tk.X)
+
         # Messages container with scrollbar
         msg_container = ttk.Frame(self.chat_frame)
         msg_container.pack(fill=tk.BOTH, expand=True)
+        self.msg_container = msg_container
 
-        self.msg_canvas = tk.Canvas(msg_container)
-        scrollbar = ttk.Scrollbar(
-            msg_container,
-            orient="vertical",
-            command=self.msg_canvas.yview
-        )
-
-        self.messages_frame = ttk.Frame(self.msg_canvas)
-        self.messages_frame.bind(
-            "<Configure>",
-            lambda e: self.msg_canvas.configure(scrollregion=self.msg_canvas.bbox("all"))
-        )
-
-        self.msg_canvas.create_window((0, 0), window=self.messages_frame, anchor="nw")
-        self.msg_canvas.configure(yscrollcommand=scrollbar.set)
-
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.msg_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.message_list = VirtualMessageList(msg_container, self.journal)
+        self.msg_canvas = self.message_list.canvas
+        self.message_list.pack()
 
         # Listening indicator
         self.listening_frame = ttk.Frame(self.chat_frame, padding="10")
@@ -360,6 +589,76 @@ class VoiceAssistantGUI:
         for title, content in sections:
             self.create_enhanced_section(title, content)
 
+    def create_diagnostics_view(self):
+        """Create the latency diagnostics view"""
+        self.diagnostics_frame = ttk.Frame(self.content_container, padding="20")
+
+        header = ttk.Frame(self.diagnostics_frame)
+        header.pack(fill=tk.X, pady=(0, 10))
+        ttk.Label(header, text="Latency", font=("Segoe UI", 14, "bold")).pack(side=tk.LEFT)
+        ttk.Label(
+            header,
+            text=f"Recent samples per span, exported to {TRACER.path}",
+            font=("Segoe UI", 9),
+            foreground="gray"
+        ).pack(side=tk.RIGHT)
+
+        columns = ("count", "p50", "p95", "p99", "max")
+        self.stats_table = ttk.Treeview(self.diagnostics_frame, columns=columns, height=14)
+        self.stats_table.heading("#0", text="Span")
+        self.stats_table.column("#0", width=220)
+        for column in columns:
+            self.stats_table.heading(column, text=column if column == "count" else f"{column} (ms)")
+            self.stats_table.column(column, width=90, anchor="e")
+        self.stats_table.pack(fill=tk.X)
+        self.stats_table.bind("<<TreeviewSelect>>", lambda e: self.draw_histogram())
+
+        self.histogram_canvas = tk.Canvas(self.diagnostics_frame, height=220, highlightthickness=0)
+        self.histogram_canvas.pack(fill=tk.BOTH, expand=True, pady=(15, 0))
+
+    def refresh_diagnostics(self):
+        """Update the latency table while the diagnostics view is shown"""
+        # Showing the view again restarts the refresh rather than adding a second one
+        if self._diagnostics_job is not None:
+            self.root.after_cancel(self._diagnostics_job)
+            self._diagnostics_job = None
+        if self.current_view.get() != "diagnostics":
+            return
+        selected = self.stats_table.selection()
+        for name, stats in TRACER.summary().items():
+            values = (stats["count"], *(f"{stats[key]:.1f}" for key in ("p50", "p95", "p99", "max")))
+            if self.stats_table.exists(name):
+                self.stats_table.item(name, values=values)
+            else:
+                self.stats_table.insert("", tk.END, iid=name, text=name, values=values)
+        if selected:
+            self.draw_histogram()
+        self._diagnostics_job = self.root.after(1000, self.refresh_diagnostics)
+
+    def draw_histogram(self):
+        """Draw the latency distribution of the selected span"""
+        canvas = self.histogram_canvas
+        canvas.delete("all")
+        selected = self.stats_table.selection()
+        if not selected:
+            return
+        buckets = TRACER.histogram(selected[0])
+        if not buckets:
+            return
+        width = max(canvas.winfo_width(), 200)
+        height = max(canvas.winfo_height(), 120)
+        bar_width = width / len(buckets)
+        tallest = max(count for _, count in buckets) or 1
+        for i, (upper, count) in enumerate(buckets):
+            bar_height = (height - 40) * count / tallest
+            x0 = i * bar_width + 4
+            canvas.create_rectangle(x0, height - 20 - bar_height, x0 + bar_width - 8, height - 20,
+                                    fill="#2196F3", outline="")
+            canvas.create_text(x0 + bar_width / 2 - 4, height - 10, text=f"≤{upper:.0f}", font=("Segoe UI", 8))
+            if count:
+                canvas.create_text(x0 + bar_width / 2 - 4, height - 28 - bar_height, text=str(count),
+                                   font=("Segoe UI", 8))
+
     def create_enhanced_section(self, title, content):
         """Create an enhanced documentation section"""
         section_frame = ttk.Frame(self.docs_content, padding="20")
@@ -399,7 +698,12 @@ class VoiceAssistantGUI:
 
     def run(self):
         """Start the GUI"""
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            if self._owns_history:
+                self.journal.close()
+                self.history.close()
 
 
 if __name__ == "__main__":
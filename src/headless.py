@@ -0,0 +1,225 @@
+import json
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from telemetry import TRACER, record
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY = 64 * 1024
+MAX_HEADER_LINES = 100
+# Seconds a keep-alive connection may sit idle, and a started request may take to arrive
+IDLE_TIMEOUT = 60.0
+REQUEST_TIMEOUT = 10.0
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    408: "Request Timeout",
+    413: "Payload Too Large",
+    431: "Request Header Fields Too Large",
+    503: "Service Unavailable",
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class HeadlessServer:
+    """Serve the assistant's commands over a local HTTP API, without audio.
+
+    ``POST /command`` with ``{"command": "play some music"}`` runs the
+    command through ``VoiceAssistant.run_command`` and answers with the
+    matched intent, its slots and what the assistant would have said,
+    instead of saying it. ``GET /health`` and ``GET /stats`` (the latency
+    summary) are there for monitoring.
+
+    Connections are kept alive, so one client can send many requests over
+    a single socket. Handlers block, so they run on a pool of ``workers``
+    threads while the event loop keeps accepting requests; once
+    ``max_pending`` commands are waiting the server answers 503 instead of
+    queueing without bound. Commands share one assistant, and with it the
+    conversation, caches and Spotify playback. Idle connections are closed
+    after ``idle_timeout`` seconds, and a request that takes longer than
+    ``request_timeout`` to arrive is answered 408.
+    """
+
+    def __init__(self, assistant, host: str = "127.0.0.1", port: int = 8765, workers: int = 16,
+                 max_pending: int = 1000, idle_timeout: float = IDLE_TIMEOUT,
+                 request_timeout: float = REQUEST_TIMEOUT):
+        self.assistant = assistant
+        self.idle_timeout = idle_timeout
+        self.request_timeout = request_timeout
+        self.host = host
+        self.port = port
+        self.max_pending = max_pending
+        self.pending = 0
+        self.handled = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="headless")
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._serve_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Headless server listening on http://{self.host}:{self.port}")
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=False)
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, path, body, keep_alive = request
+                    status, payload = await self._route(method, path, body)
+                except HttpError as e:
+                    status, payload, keep_alive = e.status, {"error": str(e)}, False
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logger.error(f"Headless connection error: {e}")
+        finally:
+            writer.close()
+
+    async def _read(self, read, timeout: float, too_long: HttpError) -> bytes:
+        # A timer that cancels this task, rather than asyncio.wait_for, which
+        # wraps every read in a task of its own and halves the request rate
+        task = asyncio.current_task()
+        expired = []
+
+        def expire():
+            expired.append(True)
+            task.cancel()
+
+        timer = asyncio.get_running_loop().call_later(timeout, expire)
+        try:
+            return await read
+        except asyncio.CancelledError:
+            if expired:
+                raise HttpError(408, "timed out waiting for the request")
+            raise
+        except (ValueError, asyncio.LimitOverrunError):
+            # A line longer than the reader's buffer limit
+            raise too_long
+        finally:
+            timer.cancel()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, bytes, bool]]:
+        try:
+            line = await self._read(reader.readline(), self.idle_timeout,
+                                    HttpError(400, "request line too long"))
+        except HttpError as e:
+            if e.status == 408:
+                # Nothing was asked, so just close the idle connection
+                return None
+            raise
+        if not line:
+            return None
+        try:
+            method, path, version = line.decode("latin-1").split()
+        except ValueError:
+            raise HttpError(400, "malformed request line")
+
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await self._read(reader.readline(), self.request_timeout,
+                                    HttpError(431, "header line too long"))
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise HttpError(431, "too many headers")
+
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            raise HttpError(400, "invalid Content-Length")
+        if length < 0:
+            raise HttpError(400, "invalid Content-Length")
+        if length > MAX_BODY:
+            raise HttpError(413, f"body larger than {MAX_BODY} bytes")
+        body = await self._read(reader.readexactly(length), self.request_timeout,
+                                HttpError(413, "body too large")) if length else b""
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        return method, path.split("?", 1)[0], body, keep_alive
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, dict]:
+        if path == "/command":
+            if method != "POST":
+                raise HttpError(405, "use POST")
+            return await self._command(body)
+        if path == "/health":
+            return 200, {"status": "ok", "pending": self.pending, "handled": self.handled}
+        if path == "/stats":
+            return 200, TRACER.summary()
+        raise HttpError(404, f"no such endpoint: {path}")
+
+    async def _command(self, body: bytes) -> Tuple[int, dict]:
+        try:
+            command = json.loads(body or b"{}").get("command", "")
+        except (ValueError, AttributeError):
+            raise HttpError(400, 'expected a JSON object like {"command": "..."}')
+        if not isinstance(command, str) or not command.strip():
+            raise HttpError(400, "missing command")
+        if self.pending >= self.max_pending:
+            return 503, {"error": "too many pending commands"}
+
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            # Normalized like recognized speech, which handlers expect
+            result = await loop.run_in_executor(
+                self._executor, self.assistant.run_command, command.lower().strip(), True
+            )
+        finally:
+            self.pending -= 1
+        self.handled += 1
+        record("headless.request", time.perf_counter() - start, intent=result.intent)
+        return 200, result.to_dict()
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, status: int, payload: dict, keep_alive: bool) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+
+
+def serve(assistant, host: str = "127.0.0.1", port: int = 8765, workers: int = 16) -> None:
+    """Run the headless server until interrupted."""
+    server = HeadlessServer(assistant, host=host, port=port, workers=workers)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        logger.info("Headless server stopped")
@@ -0,0 +1,166 @@
+import re
+import sqlite3
+import logging
+import threading
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_INDEX_PATH = "message_history.db"
+
+# Bumped whenever the schema changes; older indexes are rebuilt from the journal
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,  -- the message's journal sequence number
+    timestamp TEXT NOT NULL,
+    is_user INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    text, content='messages', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts(messages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+DROP_SCHEMA = """
+DROP TRIGGER IF EXISTS messages_ai;
+DROP TRIGGER IF EXISTS messages_ad;
+DROP TABLE IF EXISTS messages_fts;
+DROP TABLE IF EXISTS messages;
+"""
+
+
+class HistoryHit:
+    """A stored message matching a history search."""
+
+    __slots__ = ("text", "is_user", "timestamp", "snippet")
+
+    def __init__(self, text: str, is_user: bool, timestamp: str, snippet: str):
+        self.text = text
+        self.is_user = is_user
+        self.timestamp = timestamp
+        self.snippet = snippet
+
+    def __repr__(self):
+        return f"HistoryHit({self.timestamp!r}, {self.snippet!r})"
+
+
+def to_fts_query(query: str) -> Optional[str]:
+    """Turn free text into an FTS5 query matching all words, the last as a prefix."""
+    words = re.findall(r"\w+", query.lower())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+class HistoryIndex:
+    """Full-text index over the chat history, stored in SQLite FTS5.
+
+    Messages are keyed by their journal ``seq``, so adding a message twice
+    is a no-op; this lets the index be fed both by the journal's flush
+    listener and by ``sync``, which catches up on messages written while
+    the index was not running by reading the journal backwards until it
+    reaches the newest message already indexed. Messages marked ``"searchable": False``
+    (such as the assistant quoting an earlier answer back) are not indexed.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_HISTORY_INDEX_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            # Keyed on timestamp and sender before, which dropped messages sharing a timestamp
+            self._conn.executescript(DROP_SCHEMA)
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.executescript(SCHEMA)
+
+    def add_many(self, messages: Iterable[dict]) -> None:
+        rows = [
+            (message["seq"], message.get("timestamp", ""), int(bool(message.get("is_user"))),
+             message.get("text", ""))
+            for message in messages if message.get("searchable", True) and "seq" in message
+        ]
+        if not rows:
+            return
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO messages (id, timestamp, is_user, text) VALUES (?, ?, ?, ?)", rows
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Error indexing messages: {e}")
+
+    def add(self, message: dict) -> None:
+        self.add_many([message])
+
+    def last_seq(self) -> int:
+        """The journal ``seq`` of the newest indexed message, or -1."""
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(id) FROM messages").fetchone()
+        return -1 if row[0] is None else row[0]
+
+    def sync(self, journal, page_size: int = 1000) -> int:
+        """Index journal messages newer than the newest one already indexed."""
+        last = self.last_seq()
+        pages: List[List[dict]] = []
+        cursor = None
+        while True:
+            messages, cursor = journal.read_page(cursor, page_size)
+            newer = [message for message in messages if message.get("seq", -1) > last]
+            pages.append(newer)
+            if len(newer) < len(messages) or not cursor:
+                break
+        # Pages were read newest first
+        missing = [message for page in reversed(pages) for message in page if message.get("searchable", True)]
+        if missing:
+            # Insert in page-sized transactions so searches are not blocked meanwhile
+            for start in range(0, len(missing), page_size):
+                self.add_many(missing[start:start + page_size])
+            logger.info(f"Indexed {len(missing)} messages from the history journal")
+        return len(missing)
+
+    def sync_async(self, journal) -> threading.Thread:
+        thread = threading.Thread(target=self.sync, args=(journal,), daemon=True, name="history-index")
+        thread.start()
+        return thread
+
+    def search(self, query: str, limit: int = 20, is_user: Optional[bool] = None) -> List[HistoryHit]:
+        """Best-matching messages for ``query``, optionally only from one side."""
+        fts_query = to_fts_query(query)
+        if fts_query is None:
+            return []
+        sql = (
+            "SELECT m.text, m.is_user, m.timestamp, snippet(messages_fts, 0, '', '', '...', 16) "
+            "FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid "
+            "WHERE messages_fts MATCH ?"
+        )
+        params: list = [fts_query]
+        if is_user is not None:
+            sql += " AND m.is_user = ?"
+            params.append(int(is_user))
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+        try:
+            with self._lock:
+                rows = self._conn.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Error searching history: {e}")
+            return []
+        return [HistoryHit(text, bool(user), timestamp, snippet) for text, user, timestamp, snippet in rows]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
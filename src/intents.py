@@ -0,0 +1,209 @@
+import re
+import logging
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Group names generated for each compiled pattern, e.g. "p12" wrapping "p12__query"
+_GROUP_PREFIX = "p"
+
+
+class Intent:
+    """A named command with its trigger patterns and handler."""
+
+    def __init__(self, name: str, patterns: List[str], handler: Callable, priority: int = 0):
+        self.name = name
+        self.patterns = patterns
+        self.handler = handler
+        self.priority = priority
+
+    def __repr__(self):
+        return f"Intent({self.name!r}, priority={self.priority})"
+
+
+class IntentMatch:
+    """The intent an utterance resolved to, with its extracted slots."""
+
+    __slots__ = ("intent", "slots", "text")
+
+    def __init__(self, intent: Intent, slots: Dict[str, str], text: str):
+        self.intent = intent
+        self.slots = slots
+        self.text = text
+
+    def __repr__(self):
+        return f"IntentMatch({self.intent.name!r}, {self.slots!r})"
+
+
+def _compile_template(template: str, group: str) -> str:
+    """Translate a command template into a regular expression.
+
+    Template syntax, word by word:
+      ``word``       a literal word (matched as a whole word)
+      ``(a|b)``      one of several words
+      ``[a|b]``      an optional word
+      ``{slot}``     captures one or more words into ``slot``
+      ``{slot?}``    like ``{slot}`` but may be absent
+      ``*``          any (possibly empty) run of words, not captured
+    """
+    pieces = []
+    for token in template.split():
+        if token == "*":
+            pieces.append((".*?", True))
+        elif token.startswith("{") and token.endswith("}"):
+            name = token[1:-1]
+            optional = name.endswith("?")
+            name = name.rstrip("?")
+            pieces.append((f"(?P<{group}__{name}>.+?)", optional))
+        elif token.startswith("[") and token.endswith("]"):
+            words = "|".join(re.escape(word) for word in token[1:-1].split("|"))
+            pieces.append((f"(?:{words})", True))
+        elif token.startswith("(") and token.endswith(")"):
+            words = "|".join(re.escape(word) for word in token[1:-1].split("|"))
+            pieces.append((f"(?:{words})", False))
+        else:
+            pieces.append((re.escape(token), False))
+
+    regex = ""
+    seen_required = False
+    for piece, optional in pieces:
+        if not seen_required:
+            # Optional words before the first required one carry their own separator
+            if optional:
+                regex += f"(?:{piece}\\s+)?"
+            else:
+                regex += piece
+                seen_required = True
+        else:
+            regex += f"(?:\\s+{piece})?" if optional else f"\\s+{piece}"
+    return regex
+
+
+class CommandRouter:
+    """Declarative command registry compiled into one matcher per leading word.
+
+    Patterns are bucketed by their first literal word, and each bucket is
+    compiled into a single regular expression alternation ordered by
+    priority. Matching an utterance looks up the bucket for its first word
+    and runs one regex over it, so the cost depends on how many commands
+    share that word rather than on the total number of commands. Patterns
+    that do not start with a fixed word go into a shared bucket that is
+    merged into every lookup.
+
+    The compiled matchers are swapped in as a whole, so ``match`` can run
+    from several threads while the first call (or a call after
+    ``register``) compiles them.
+    """
+
+    def __init__(self, prefix: Optional[str] = None):
+        # ``prefix`` is an optional phrase (e.g. the wake word) allowed before any command
+        self.prefix = prefix
+        self.intents: List[Intent] = []
+        # (buckets, shared, groups, slots), or None until compiled
+        self._compiled: Optional[tuple] = None
+        self._lock = threading.Lock()
+        self._prefix_re = re.compile(f"(?:{prefix})[\\s,]+(\\S+)") if prefix else None
+
+    def register(self, name: str, patterns, handler: Callable, priority: int = 0) -> Intent:
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        intent = Intent(name, list(patterns), handler, priority)
+        with self._lock:
+            self.intents.append(intent)
+            self._compiled = None
+        return intent
+
+    def command(self, name: str, *patterns: str, priority: int = 0):
+        """Decorator form of ``register``."""
+        def decorator(handler):
+            self.register(name, patterns, handler, priority)
+            return handler
+        return decorator
+
+    @staticmethod
+    def _first_words(template: str) -> Optional[List[str]]:
+        token = template.split()[0]
+        if token.startswith("(") and token.endswith(")"):
+            return token[1:-1].split("|")
+        if token == "*" or token[0] in "[{":
+            return None
+        return [token]
+
+    def compile(self) -> tuple:
+        with self._lock:
+            if self._compiled is None:
+                self._compiled = self._build()
+            return self._compiled
+
+    def _build(self) -> tuple:
+        ordered = sorted(
+            ((intent, pattern, order) for order, intent in enumerate(self.intents) for pattern in intent.patterns),
+            key=lambda item: (-item[0].priority, item[2])
+        )
+        compiled = []
+        groups: Dict[str, Intent] = {}
+        slots: Dict[str, List[tuple]] = {}
+        for index, (intent, pattern, _) in enumerate(ordered):
+            group = f"{_GROUP_PREFIX}{index}"
+            regex = _compile_template(pattern, group)
+            groups[group] = intent
+            slots[group] = [
+                (name, name[len(group) + 2:]) for name in re.compile(regex).groupindex
+            ]
+            compiled.append((group, f"(?P<{group}>{regex})", self._first_words(pattern)))
+
+        shared = [entry for entry in compiled if entry[2] is None]
+        keyed = defaultdict(list)
+        for entry in compiled:
+            for word in entry[2] or ():
+                keyed[word].append(entry)
+
+        prefix = f"(?:{self.prefix}[\\s,]+)?" if self.prefix else ""
+
+        def build(entries):
+            # Keep the global priority order when merging with the shared bucket
+            entries = sorted(entries, key=lambda entry: int(entry[0][len(_GROUP_PREFIX):]))
+            return re.compile(f"{prefix}(?:{'|'.join(entry[1] for entry in entries)})\\s*$")
+
+        buckets = {word: build(entries + shared) for word, entries in keyed.items()}
+        return buckets, build(shared) if shared else None, groups, slots
+
+    def match(self, text: str) -> Optional[IntentMatch]:
+        buckets, shared, groups, group_slots = self._compiled or self.compile()
+        text = " ".join(text.lower().split())
+        if not text:
+            return None
+
+        candidates = [text.split(" ", 1)[0]]
+        if self._prefix_re:
+            # The bucket is chosen by the first word after an optional prefix
+            stripped = self._prefix_re.match(text)
+            if stripped:
+                candidates.insert(0, stripped.group(1))
+
+        for word in candidates:
+            regex = buckets.get(word, shared)
+            if regex is None:
+                continue
+            match = regex.match(text)
+            if match:
+                # The intent's wrapper group closes last, so it is ``lastgroup``
+                group = match.lastgroup
+                slots = {}
+                for name, slot in group_slots[group]:
+                    value = match.group(name)
+                    if value is not None:
+                        slots[slot] = value.strip()
+                return IntentMatch(groups[group], slots, text)
+        return None
+
+    def dispatch(self, text: str, fallback: Optional[Callable] = None):
+        """Run the handler of the intent ``text`` matches and return its result."""
+        match = self.match(text)
+        if match is None:
+            logger.info(f"No intent matched '{text}'")
+            return fallback(text) if fallback else None
+        logger.info(f"Dispatching '{text}' to {match.intent.name} {match.slots}")
+        return match.intent.handler(**match.slots)
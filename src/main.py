@@ -1,23 +1,77 @@
 # main.py
 
+from startup import STARTUP
+import argparse
 import threading
-from gui import VoiceAssistantGUI
-from speech import VoiceAssistant
+from backends import Backends
+from speech import VoiceAssistant, load_config
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Jarvis voice assistant")
+    parser.add_argument("--config", default="assistant_config.json", help="configuration file")
+    parser.add_argument("--backends", help="backends preset to use instead of the configured one, e.g. 'offline'")
+    parser.add_argument("--headless", action="store_true",
+                        help="serve text commands over HTTP instead of listening and showing the window")
+    parser.add_argument("--port", type=int, help="headless server port (default 8765)")
+    return parser.parse_args()
+
+def create_assistant(args) -> VoiceAssistant:
+    """Build the assistant from the config file, applying command line overrides."""
+    config = load_config(args.config)
+    # Not written into the config, which is saved back when the passphrase changes
+    backends = Backends.from_config(dict(config, backends=args.backends)) if args.backends else None
+    return VoiceAssistant(backends=backends, config=config, config_file=args.config)
+
+def run_headless(args):
+    from headless import serve
+
+    assistant = create_assistant(args)
+    settings = assistant.config.get('headless', {})
+    assistant.warm_up()
+    try:
+        serve(
+            assistant,
+            host=settings.get('host', "127.0.0.1"),
+            port=args.port or settings.get('port', 8765),
+            workers=settings.get('workers', 16)
+        )
+    finally:
+        assistant.close()
 
 def main():
-    # Create GUI instance
-    gui = VoiceAssistantGUI()
-    
+    args = parse_args()
+    if args.headless:
+        run_headless(args)
+        return
+
+    from gui import VoiceAssistantGUI
+    STARTUP.mark("imports done")
+
     # Create voice assistant instance
-    assistant = VoiceAssistant()
+    assistant = create_assistant(args)
+    STARTUP.mark("assistant created")
+
+    # Create GUI instance, showing the assistant's chat history
+    gui = VoiceAssistantGUI(journal=assistant.journal, history=assistant.history)
     assistant.set_gui(gui)
-    
+    STARTUP.mark("gui created")
+
+    def on_window_shown():
+        STARTUP.mark("window shown")
+        # Build the remaining integrations while the user starts talking
+        assistant.warm_up()
+
+    gui.root.after_idle(on_window_shown)
+
     # Run voice assistant in a separate thread
     assistant_thread = threading.Thread(target=assistant.run, daemon=True)
     assistant_thread.start()
-    
+
     # Run GUI (this will block until window is closed)
-    gui.run()
+    try:
+        gui.run()
+    finally:
+        assistant.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
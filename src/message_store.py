@@ -0,0 +1,232 @@
+import os
+import json
+import logging
+import threading
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOURNAL_PATH = "message_history.jsonl"
+LEGACY_HISTORY_PATH = "message_history.json"
+
+
+class MessageJournal:
+    """Append-only JSON Lines store for the chat history.
+
+    ``append`` only queues the message; a background thread writes queued
+    messages in one batch at most every ``flush_interval`` seconds, so adding
+    a message costs O(1) and a crash loses at most the last interval. Each
+    message is given a ``seq`` number, increasing in journal order, as it
+    is appended. Once the file has grown ``compact_every`` lines past
+    ``max_messages`` it is rewritten with only the newest ``max_messages``
+    (and without any line left half-written by a crash).
+    """
+
+    def __init__(self, path: str = DEFAULT_JOURNAL_PATH, flush_interval: float = 1.0,
+                 max_messages: Optional[int] = 50000, compact_every: int = 5000,
+                 legacy_path: Optional[str] = LEGACY_HISTORY_PATH):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_messages = max_messages
+        self.compact_every = compact_every
+        self.listeners: List[Callable[[List[dict]], None]] = []
+        self._pending: List[dict] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = threading.Event()
+        # Bytes dropped from the front by compaction, so page cursors survive it
+        self._dropped_bytes = 0
+        if legacy_path:
+            self._migrate(legacy_path)
+        self._repair_tail()
+        self._line_count = self._count_lines()
+        self._next_seq = self._load_next_seq()
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True, name="message-journal")
+        self._thread.start()
+
+    def _migrate(self, legacy_path: str) -> None:
+        """Convert the old single-JSON-array history file once."""
+        if os.path.exists(self.path) or not os.path.exists(legacy_path):
+            return
+        try:
+            with open(legacy_path, "r") as f:
+                messages = json.load(f)
+            self._rewrite(messages)
+            logger.info(f"Migrated {len(messages)} messages from {legacy_path} to {self.path}")
+        except Exception as e:
+            logger.error(f"Error migrating message history: {e}")
+
+    def _repair_tail(self) -> None:
+        """Drop a last line left half-written by a crash."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            pos = size
+            while pos > 0:
+                step = min(4096, pos)
+                pos -= step
+                f.seek(pos)
+                newline = f.read(step).rfind(b"\n")
+                if newline != -1:
+                    f.truncate(pos + newline + 1)
+                    return
+            f.truncate(0)
+
+    def _load_next_seq(self) -> int:
+        last, _ = self.read_page(count=1)
+        if not last:
+            return 0
+        if "seq" not in last[0]:
+            # Written before messages were numbered; number them once
+            messages = self.load()
+            for seq, message in enumerate(messages):
+                message["seq"] = seq
+            self._rewrite(messages)
+            logger.info(f"Numbered {len(messages)} messages in {self.path}")
+            return len(messages)
+        return last[0]["seq"] + 1
+
+    def _count_lines(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, "rb") as f:
+            return sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b""))
+
+    def append(self, message: dict) -> None:
+        """Queue ``message`` for writing, setting its ``seq``."""
+        with self._lock:
+            message["seq"] = self._next_seq
+            self._next_seq += 1
+            self._pending.append(message)
+        self._wakeup.set()
+
+    def load(self) -> List[dict]:
+        """Read every stored message, skipping lines that cannot be parsed."""
+        self.flush()
+        messages = []
+        if not os.path.exists(self.path):
+            return messages
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    messages.append(json.loads(line))
+                except ValueError:
+                    continue
+        return messages
+
+    def read_page(self, before: Optional[int] = None, count: int = 100) -> Tuple[List[dict], int]:
+        """Read up to ``count`` flushed messages preceding the cursor ``before``.
+
+        Reads the file backwards from the cursor (or from the end), so the cost
+        depends on the page size rather than the history length. Returns the
+        messages oldest first and the cursor to pass for the page before them;
+        a cursor of 0 means there is nothing older.
+        """
+        with self._write_lock:
+            if not os.path.exists(self.path):
+                return [], 0
+            with open(self.path, "rb") as f:
+                size = f.seek(0, os.SEEK_END)
+                end = size if before is None else min(size, before - self._dropped_bytes)
+                if end <= 0:
+                    return [], 0
+                pos = end
+                data = b""
+                while True:
+                    step = min(65536, pos)
+                    pos -= step
+                    f.seek(pos)
+                    data = f.read(step) + data
+                    # The first piece may be cut mid-line unless it starts the file
+                    complete = data.count(b"\n") - (1 if pos > 0 else 0)
+                    if pos == 0 or complete >= count:
+                        break
+            dropped = self._dropped_bytes
+
+        lines = data.split(b"\n")
+        lines.pop()  # after the final newline
+        if pos > 0:
+            lines.pop(0)
+        lines = lines[-count:]
+        start = end - sum(len(line) + 1 for line in lines)
+        messages = []
+        for line in lines:
+            try:
+                messages.append(json.loads(line))
+            except ValueError:
+                continue
+        return messages, (start + dropped if start > 0 else 0)
+
+    def flush(self) -> None:
+        """Write queued messages to disk now."""
+        # Taken under the write lock so concurrent flushes append batches in order
+        with self._write_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(message) + "\n" for message in batch))
+                self._line_count += len(batch)
+            except Exception as e:
+                logger.error(f"Error saving messages: {e}")
+                with self._lock:
+                    self._pending[:0] = batch
+                return
+            if self.max_messages is not None and self._line_count > self.max_messages + self.compact_every:
+                try:
+                    self.compact()
+                except Exception as e:
+                    # The batch is already on disk; compaction is retried on a later flush
+                    logger.error(f"Error compacting message journal: {e}")
+        for listener in self.listeners:
+            try:
+                listener(batch)
+            except Exception as e:
+                logger.error(f"Error in message journal listener: {e}")
+
+    def compact(self) -> None:
+        """Rewrite the journal keeping only the newest ``max_messages`` messages."""
+        messages = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    messages.append(json.loads(line))
+                except ValueError:
+                    continue
+        if self.max_messages is not None:
+            messages = messages[-self.max_messages:]
+        self._rewrite(messages)
+        logger.info(f"Compacted message journal to {len(messages)} messages")
+
+    def _rewrite(self, messages: List[dict]) -> None:
+        old_size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for message in messages:
+                f.write(json.dumps(message) + "\n")
+        os.replace(tmp_path, self.path)
+        self._dropped_bytes += max(0, old_size - os.path.getsize(self.path))
+        self._line_count = len(messages)
+
+    def _flush_loop(self) -> None:
+        while not self._closed.is_set():
+            self._wakeup.wait()
+            self._wakeup.clear()
+            # Debounce: let a burst of messages accumulate into one write
+            self._closed.wait(self.flush_interval)
+            self.flush()
+
+    def close(self) -> None:
+        self._closed.set()
+        self._wakeup.set()
+        self._thread.join(timeout=2)
+        self.flush()
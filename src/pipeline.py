@@ -0,0 +1,146 @@
+import queue
+import logging
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_POLL_INTERVAL = 0.2
+
+# Passed down the stages once a finite audio source has ended
+_END = object()
+
+
+class CommandPipeline:
+    """Run capture, recognition, dispatch and speech as concurrent stages.
+
+    Capture, recognition and dispatch are threads connected by queues, and
+    speech is the assistant's ``SpeechWorker``, so the microphone can
+    capture the next utterance while the previous one is being recognized,
+    handled or spoken. Handlers that call
+    ``assistant.listen()`` (e.g. confirmations) receive the next recognized
+    utterance from the pipeline instead of opening the microphone
+    themselves.
+
+    With ``barge_in`` enabled, speech detected while the assistant is
+    talking cancels the utterance in progress and everything queued after
+    it. Without it, capture pauses while the assistant is speaking so that
+    its own voice is not picked up as a command.
+
+    When a finite audio source runs out, the utterances already captured
+    are still recognized and handled, and then the pipeline stops.
+    """
+
+    def __init__(self, assistant, barge_in: bool = False, max_pending: int = 4):
+        self.assistant = assistant
+        self.speech = assistant.speech
+        self.barge_in = barge_in
+        self.audio_queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self.command_queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self.stopped = threading.Event()
+        self._started = False
+        self._threads = []
+
+    @property
+    def running(self) -> bool:
+        return self._started and not self.stopped.is_set()
+
+    @property
+    def speaking_idle(self) -> threading.Event:
+        return self.speech.idle
+
+    def start(self) -> None:
+        self._started = True
+        for name, target in (
+            ("capture", self._capture_loop),
+            ("recognize", self._recognize_loop),
+            ("dispatch", self._dispatch_loop),
+        ):
+            thread = threading.Thread(target=target, daemon=True, name=f"pipeline-{name}")
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+    def wait(self, drain_timeout: float = 10) -> None:
+        """Block until the pipeline stops, then let the last words be spoken."""
+        self.stopped.wait()
+        self.speech.wait_idle(drain_timeout)
+
+    def say(self, text: str) -> None:
+        """Queue text for the speech stage."""
+        self.speech.say(text)
+
+    def cancel_speech(self) -> None:
+        """Stop the current utterance and drop everything queued behind it."""
+        logger.info("Barge-in: cancelling speech")
+        self.speech.cancel()
+
+    def next_command(self, timeout: Optional[float] = None) -> str:
+        """Return the next recognized utterance, or an empty string on timeout."""
+        try:
+            command = self.command_queue.get(timeout=timeout)
+        except queue.Empty:
+            return ""
+        if command is _END:
+            # Leave it for the dispatch stage to stop on
+            self.command_queue.put(command)
+            return ""
+        return command
+
+    def _put(self, target: "queue.Queue", item) -> bool:
+        while not self.stopped.is_set():
+            try:
+                target.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source: "queue.Queue"):
+        try:
+            return source.get(timeout=_POLL_INTERVAL)
+        except queue.Empty:
+            return None
+
+    def _capture_loop(self) -> None:
+        while not self.stopped.is_set():
+            if not self.barge_in and not self.speaking_idle.wait(_POLL_INTERVAL):
+                continue
+            audio = self.assistant.capture_audio()
+            if audio is None:
+                if self.assistant.audio_ended:
+                    logger.info("Audio source has ended, finishing the commands already captured")
+                    self._put(self.audio_queue, _END)
+                    return
+                continue
+            if self.barge_in and not self.speaking_idle.is_set():
+                self.cancel_speech()
+            self._put(self.audio_queue, audio)
+
+    def _recognize_loop(self) -> None:
+        while not self.stopped.is_set():
+            audio = self._get(self.audio_queue)
+            if audio is None:
+                continue
+            if audio is _END:
+                self._put(self.command_queue, _END)
+                return
+            command = self.assistant.recognize(audio)
+            if command:
+                self._put(self.command_queue, command)
+
+    def _dispatch_loop(self) -> None:
+        while not self.stopped.is_set():
+            command = self._get(self.command_queue)
+            if command is None:
+                continue
+            if command is _END:
+                self.stop()
+                return
+            try:
+                if not self.assistant.execute_command(command):
+                    self.stop()
+            except Exception as e:
+                logger.error(f"Error dispatching command: {e}")
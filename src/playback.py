@@ -0,0 +1,255 @@
+import re
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+_LIST_SEPARATORS = re.compile(r"\s*,\s*|\s+(?:and then|then|followed by)\s+")
+
+
+def split_play_request(query: str) -> List[str]:
+    """Split "x then y and z" into ["x", "y", "z"].
+
+    " and " only separates items once the request is already a list, so
+    titles such as "simon and garfunkel" stay whole.
+    """
+    parts = [part for part in _LIST_SEPARATORS.split(query.strip()) if part]
+    if len(parts) > 1:
+        parts = [item for part in parts for item in re.split(r"\s+and\s+", part) if item]
+    return parts
+
+
+def pooled_session(pool_size: int = 8, retries: int = 3):
+    """A ``requests`` session with a connection pool sized for concurrent calls.
+
+    Failed connections are retried for any request, since nothing was sent.
+    Error responses are only retried for idempotent methods: a POST such as
+    skipping a track or adding one to the queue may already have taken
+    effect when the error came back.
+    """
+    import requests
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=False,
+        allowed_methods=frozenset(['GET', 'PUT', 'DELETE']),
+        status=retries,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503)
+    )
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class PlaybackCommand:
+    """One requested playback action, resolved when its batch has run."""
+
+    __slots__ = ("action", "queries", "album", "future")
+
+    def __init__(self, action: str, queries: Optional[List[str]] = None, album: bool = False):
+        self.action = action
+        self.queries = queries or []
+        self.album = album
+        self.future: Future = Future()
+
+    def __repr__(self):
+        return f"PlaybackCommand({self.action!r}, {self.queries!r})"
+
+
+class PlaybackService:
+    """Spotify playback with concurrent searches and coalesced commands.
+
+    Commands that queue up while a batch is running form the next batch.
+    When others are already waiting behind a command, the service gives
+    the burst another ``coalesce_window`` seconds to join; a lone command
+    runs at once. A batch is reduced to the fewest API calls with the same
+    outcome: a new ``play`` discards transport commands issued before it,
+    next/previous cancel out, only the last pause/resume counts, and
+    superseded ``play`` requests are never searched for. Searches for all
+    the tracks of a request run concurrently over one pooled session, and
+    the tracks are started with a single ``start_playback`` call.
+
+    Every method returns a ``Future``; ``play`` resolves to the names of the
+    tracks that were started, commands merged away resolve to None. Each
+    step of a batch succeeds or fails on its own: a failed search fails the
+    ``play`` or ``queue`` it belongs to, a failed skip or pause the commands
+    merged into it, and the rest of the batch still runs.
+    """
+
+    def __init__(self, client, state, max_workers: int = 4, coalesce_window: float = 0.25):
+        self.client = client
+        self.state = state
+        self.coalesce_window = coalesce_window
+        self.batches = 0
+        self._commands: "queue.Queue" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="spotify")
+        self._thread = threading.Thread(target=self._dispatch_loop, daemon=True, name="playback")
+        self._thread.start()
+
+    def play(self, queries: Optional[List[str]] = None) -> Future:
+        """Play the best match for each query in order, or resume if there are none."""
+        if not queries:
+            return self._submit(PlaybackCommand("resume"))
+        return self._submit(PlaybackCommand("play", queries))
+
+    def play_album(self, query: str) -> Future:
+        return self._submit(PlaybackCommand("play", [query], album=True))
+
+    def queue(self, queries: List[str], album: bool = False) -> Future:
+        """Add tracks (or every track of an album) after the current one."""
+        return self._submit(PlaybackCommand("queue", queries, album))
+
+    def pause(self) -> Future:
+        return self._submit(PlaybackCommand("pause"))
+
+    def resume(self) -> Future:
+        return self._submit(PlaybackCommand("resume"))
+
+    def next(self) -> Future:
+        return self._submit(PlaybackCommand("next"))
+
+    def previous(self) -> Future:
+        return self._submit(PlaybackCommand("previous"))
+
+    def _submit(self, command: PlaybackCommand) -> Future:
+        self._commands.put(command)
+        return command.future
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            batch = [self._commands.get()]
+            if batch[0] is None:
+                return
+            if not self._commands.empty():
+                # Commands are arriving in a burst; let the rest of it join this batch
+                time.sleep(self.coalesce_window)
+            while True:
+                try:
+                    command = self._commands.get_nowait()
+                except queue.Empty:
+                    break
+                if command is None:
+                    self._commands.put(None)
+                    break
+                batch.append(command)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[PlaybackCommand]) -> None:
+        self.batches += 1
+        start = None
+        skips = 0
+        skip_commands: List[PlaybackCommand] = []
+        transport_commands: List[PlaybackCommand] = []
+        queued: List[PlaybackCommand] = []
+        for command in batch:
+            if command.action == "play":
+                start, skips, skip_commands, transport_commands = command, 0, [], []
+            elif command.action in ("next", "previous"):
+                skips += 1 if command.action == "next" else -1
+                skip_commands.append(command)
+            elif command.action in ("pause", "resume"):
+                transport_commands.append(command)
+            elif command.action == "queue":
+                queued.append(command)
+        transport = transport_commands[-1].action if transport_commands else None
+        if transport == "resume" and start is not None:
+            # Starting playback already resumes it
+            transport, transport_commands = None, []
+        logger.info(f"Running {len(batch)} playback commands as: play={start}, skips={skips}, "
+                    f"transport={transport}, queued={len(queued)}")
+
+        try:
+            device_id = self.state.device_id()
+        except Exception as e:
+            for command in batch:
+                command.future.set_exception(e)
+            return
+
+        def skip():
+            step = self.client.next_track if skips > 0 else self.client.previous_track
+            for _ in range(abs(skips)):
+                self.state.run(lambda device: step(device_id=device), device_id)
+
+        def pause():
+            self.state.run(lambda device: self.client.pause_playback(device_id=device), device_id)
+
+        def resume():
+            self.state.run(lambda device: self.client.start_playback(device_id=device), device_id)
+
+        if start is not None:
+            self._run_step([start], lambda: self._start(start, device_id))
+        if skip_commands:
+            self._run_step(skip_commands, skip)
+        if transport_commands:
+            self._run_step(transport_commands, pause if transport == "pause" else resume)
+        for command in queued:
+            self._run_step([command], lambda: self._queue(command, device_id))
+        for command in batch:
+            if not command.future.done():
+                command.future.set_result(None)
+
+    @staticmethod
+    def _run_step(commands: List[PlaybackCommand], step) -> None:
+        """Run one step of a batch and resolve the commands it carries out with its outcome."""
+        try:
+            result = step()
+        except Exception as e:
+            logger.error(f"Playback step for {commands} failed: {e}")
+            for command in commands:
+                command.future.set_exception(e)
+            return
+        # Only the command that asked for it gets the result of a play or queue
+        commands[-1].future.set_result(result)
+        for command in commands[:-1]:
+            command.future.set_result(None)
+
+    def _search(self, queries: List[str], album: bool) -> List[Optional[dict]]:
+        kind = 'album' if album else 'track'
+
+        def search(query):
+            items = self.client.search(q=query, type=kind, limit=1)[f'{kind}s']['items']
+            return items[0] if items else None
+        return list(self._executor.map(search, queries))
+
+    def _album_tracks(self, album: dict) -> List[dict]:
+        return self.client.album_tracks(album['id'])['items']
+
+    def _start(self, command: PlaybackCommand, device_id: Optional[str]) -> List[str]:
+        found = [item for item in self._search(command.queries, command.album) if item]
+        if not found:
+            raise LookupError(f"No {'albums' if command.album else 'tracks'} found for {command.queries}")
+        if command.album:
+            album = found[0]
+            self.state.run(lambda device: self.client.start_playback(device_id=device, context_uri=album['uri']),
+                           device_id)
+        else:
+            uris = [track['uri'] for track in found]
+            self.state.run(lambda device: self.client.start_playback(device_id=device, uris=uris), device_id)
+        return [item['name'] for item in found]
+
+    def _queue(self, command: PlaybackCommand, device_id: Optional[str]) -> List[str]:
+        found = [item for item in self._search(command.queries, command.album) if item]
+        if command.album:
+            tracks = [track for album in found for track in self._album_tracks(album)]
+        else:
+            tracks = found
+        if not tracks:
+            raise LookupError(f"Nothing found to queue for {command.queries}")
+        # The Web API queues one URI per call; they are sent in order over the pooled connection
+        for track in tracks:
+            self.state.run(lambda device: self.client.add_to_queue(track['uri'], device_id=device), device_id)
+        return [track['name'] for track in tracks]
+
+    def close(self) -> None:
+        self._commands.put(None)
+        self._thread.join(timeout=2)
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,136 @@
+import os
+import time
+import logging
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Set
+
+from telemetry import span
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_name(name: str) -> str:
+    """Normalize a program name; "Spotify.exe", "spotify" and "SPOTIFY" all refer to the same program."""
+    name = os.path.basename(name).lower()
+    return name[:-4] if name.endswith(".exe") else name
+
+
+class ProcessWatcher:
+    """Keeps track of which programs are running, refreshed in the background.
+
+    Every ``interval`` seconds the watcher lists the current pids (a cheap
+    call on every platform) and diffs them against the previous list: only
+    pids that appeared since the last refresh have their name looked up,
+    and pids that went away are dropped. ``is_running`` then answers from
+    a name → pids map without touching the process table.
+
+    ``listeners`` are called on the watcher thread as
+    ``listener(started, exited)``, two dicts of pid → normalized name, so
+    integrations can react when their program starts or stops.
+    """
+
+    def __init__(self, interval: float = 2.0):
+        self.interval = interval
+        self.listeners: List[Callable[[Dict[int, str], Dict[int, str]], None]] = []
+        self.refreshes = 0
+        self.ready = threading.Event()
+        self._names: Dict[int, str] = {}
+        self._pids: Dict[str, Set[int]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "ProcessWatcher":
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="process-watcher")
+                self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def is_running(self, name: str, timeout: float = 5.0) -> bool:
+        """Whether a process called ``name`` is running, as of the last refresh.
+
+        Starts the watcher if needed; only the very first query waits (up to
+        ``timeout`` seconds) for the initial scan.
+        """
+        if not self.ready.is_set():
+            self.start()
+            self.ready.wait(timeout)
+        with self._lock:
+            return bool(self._pids.get(normalize_name(name)))
+
+    def pids(self, name: str) -> Set[int]:
+        with self._lock:
+            return set(self._pids.get(normalize_name(name), ()))
+
+    def wait_for(self, name: str, running: bool = True, timeout: float = 15.0) -> bool:
+        """Block until ``name`` is (or, with ``running=False``, is no longer) running."""
+        key = normalize_name(name)
+        self.start()
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while bool(self._pids.get(key)) != running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._changed.wait(remaining)
+        return True
+
+    def refresh(self) -> None:
+        """Diff the pid list against the previous one and update the name map."""
+        import psutil
+
+        with span("processes.refresh") as refresh_span:
+            current = set(psutil.pids())
+            with self._lock:
+                known = set(self._names)
+            started: Dict[int, str] = {}
+            for pid in current - known:
+                try:
+                    started[pid] = normalize_name(psutil.Process(pid).name())
+                except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                    continue
+                except psutil.AccessDenied:
+                    # Still counts as known, so it isn't looked up again on every refresh
+                    started[pid] = ""
+            with self._changed:
+                exited = {pid: self._names.pop(pid) for pid in known - current}
+                for pid, name in exited.items():
+                    pids = self._pids.get(name)
+                    if pids is not None:
+                        pids.discard(pid)
+                        if not pids:
+                            del self._pids[name]
+                for pid, name in started.items():
+                    self._names[pid] = name
+                    if name:
+                        self._pids[name].add(pid)
+                self.refreshes += 1
+                if started or exited:
+                    self._changed.notify_all()
+            refresh_span.set(started=len(started), exited=len(exited))
+            # Refreshes run every few seconds forever; only export the ones that saw a change
+            refresh_span.export = bool(started or exited)
+
+        if self.refreshes > 1 and (started or exited):
+            for listener in list(self.listeners):
+                try:
+                    listener(started, exited)
+                except Exception as e:
+                    logger.error(f"Error in process listener: {e}")
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing the process list: {e}")
+            self.ready.set()
+            self._stopped.wait(self.interval)
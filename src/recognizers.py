@@ -0,0 +1,259 @@
+import json
+import time
+import logging
+import importlib.util
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+import speech_recognition as sr
+
+logger = logging.getLogger(__name__)
+
+
+class RecognitionResult:
+    """A transcript produced by one backend."""
+
+    __slots__ = ("text", "confidence", "backend", "latency")
+
+    def __init__(self, text: str, confidence: float, backend: str, latency: float = 0.0):
+        self.text = text
+        self.confidence = confidence
+        self.backend = backend
+        self.latency = latency
+
+    def __repr__(self):
+        return f"RecognitionResult({self.text!r}, {self.confidence:.2f}, {self.backend!r}, {self.latency:.2f}s)"
+
+
+class RecognizerBackend:
+    """A speech-to-text engine that can be raced against others.
+
+    ``recognize`` returns a result, None if nothing intelligible was said,
+    and raises on service errors. ``default_confidence`` is used for engines
+    that do not report one.
+    """
+
+    name = "backend"
+    default_confidence = 0.5
+
+    def __init__(self, timeout: float = 5.0):
+        self.timeout = timeout
+        self.recognizer = sr.Recognizer()
+
+    def available(self) -> bool:
+        return True
+
+    def recognize(self, audio: sr.AudioData) -> Optional[RecognitionResult]:
+        raise NotImplementedError
+
+    def _result(self, text: str, confidence: Optional[float] = None) -> Optional[RecognitionResult]:
+        text = (text or "").strip()
+        if not text:
+            return None
+        return RecognitionResult(text, self.default_confidence if confidence is None else confidence, self.name)
+
+
+class GoogleBackend(RecognizerBackend):
+    """Google Web Speech API (network)."""
+
+    name = "google"
+    default_confidence = 0.8
+
+    def __init__(self, language: str = "en-US", timeout: float = 4.0):
+        super().__init__(timeout)
+        self.language = language
+        self.recognizer.operation_timeout = timeout
+
+    def recognize(self, audio):
+        try:
+            response = self.recognizer.recognize_google(audio, language=self.language, show_all=True)
+        except sr.UnknownValueError:
+            return None
+        if not response or not response.get("alternative"):
+            return None
+        best = response["alternative"][0]
+        return self._result(best.get("transcript", ""), best.get("confidence"))
+
+
+class SphinxBackend(RecognizerBackend):
+    """CMU Sphinx (offline, requires pocketsphinx)."""
+
+    name = "sphinx"
+    default_confidence = 0.5
+
+    def available(self):
+        return importlib.util.find_spec("pocketsphinx") is not None
+
+    def recognize(self, audio):
+        try:
+            return self._result(self.recognizer.recognize_sphinx(audio))
+        except sr.UnknownValueError:
+            return None
+
+
+class VoskBackend(RecognizerBackend):
+    """Vosk (offline, requires the vosk package and a model in ./model)."""
+
+    name = "vosk"
+    default_confidence = 0.7
+
+    def available(self):
+        return importlib.util.find_spec("vosk") is not None
+
+    def recognize(self, audio):
+        try:
+            response = self.recognizer.recognize_vosk(audio)
+        except sr.UnknownValueError:
+            return None
+        return self._result(json.loads(response).get("text", ""))
+
+
+class WhisperBackend(RecognizerBackend):
+    """OpenAI Whisper running locally (requires openai-whisper)."""
+
+    name = "whisper"
+    default_confidence = 0.75
+
+    def __init__(self, model: str = "base", language: str = "english", timeout: float = 8.0):
+        super().__init__(timeout)
+        self.model = model
+        self.language = language
+
+    def available(self):
+        return importlib.util.find_spec("whisper") is not None
+
+    def recognize(self, audio):
+        try:
+            return self._result(self.recognizer.recognize_whisper(audio, model=self.model, language=self.language))
+        except sr.UnknownValueError:
+            return None
+
+
+class StubBackend(RecognizerBackend):
+    """Deterministic backend for tests and benchmarks.
+
+    ``transcripts`` is either a callable taking the ``AudioData``, a dict
+    keyed by the audio's raw bytes, or a list of texts returned in turn for
+    successive utterances (e.g. from the config); unknown audio and an
+    exhausted list are unintelligible.
+    """
+
+    name = "stub"
+
+    def __init__(self, transcripts: Union[Callable, Dict[bytes, str], List[str]], latency: float = 0.0,
+                 confidence: float = 1.0, name: str = "stub", timeout: float = 5.0):
+        super().__init__(timeout)
+        if isinstance(transcripts, (list, tuple)):
+            remaining = iter(transcripts)
+            transcripts = lambda audio: next(remaining, "")
+        self.transcripts = transcripts
+        self.latency = latency
+        self.default_confidence = confidence
+        self.name = name
+
+    def recognize(self, audio):
+        time.sleep(self.latency)
+        if callable(self.transcripts):
+            text = self.transcripts(audio)
+        else:
+            text = self.transcripts.get(audio.get_raw_data(), "")
+        return self._result(text)
+
+
+BACKENDS = {
+    "google": GoogleBackend,
+    "sphinx": SphinxBackend,
+    "vosk": VoskBackend,
+    "whisper": WhisperBackend,
+    "stub": StubBackend,
+}
+
+
+def backends_from_config(entries: Optional[Iterable[dict]]) -> List[RecognizerBackend]:
+    """Build the configured backends, skipping engines that are not installed."""
+    entries = entries or [{"type": "google"}, {"type": "sphinx"}]
+    backends = []
+    for entry in entries:
+        options = dict(entry)
+        kind = options.pop("type")
+        backend_class = BACKENDS.get(kind)
+        if backend_class is None:
+            logger.error(f"Unknown recognizer backend '{kind}'")
+            continue
+        backend = backend_class(**options)
+        if backend.available():
+            backends.append(backend)
+        else:
+            logger.info(f"Recognizer backend '{kind}' is not installed, skipping it")
+    return backends
+
+
+class RecognizerRace:
+    """Run several recognizer backends concurrently on the same audio.
+
+    The first result whose confidence reaches ``min_confidence`` wins and is
+    returned without waiting for slower backends. Each backend is given up on
+    after its own ``timeout``; if no result is confident enough, the most
+    confident one received in time is returned.
+
+    Each backend runs on its own single thread, so a backend that hangs past
+    its timeout ties up one thread at most: it is left out of later races
+    until that call returns, instead of piling up calls behind it.
+    """
+
+    def __init__(self, backends: Iterable[RecognizerBackend], min_confidence: float = 0.7):
+        self.backends = list(backends)
+        self.min_confidence = min_confidence
+        self._executors = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"recognizer-{backend.name}")
+            for backend in self.backends
+        ]
+        # Each backend's latest call, which may still be running after its timeout
+        self._last_calls: List[Optional[Future]] = [None] * len(self.backends)
+
+    def recognize(self, audio: sr.AudioData) -> Optional[RecognitionResult]:
+        if not self.backends:
+            raise RuntimeError("No speech recognition backends are available")
+
+        start = time.perf_counter()
+        futures = {}
+        for i, backend in enumerate(self.backends):
+            last = self._last_calls[i]
+            if last is not None and not last.done():
+                logger.warning(f"Recognizer '{backend.name}' is still busy with an earlier request, skipping it")
+                continue
+            future = self._executors[i].submit(backend.recognize, audio)
+            self._last_calls[i] = future
+            futures[future] = (backend, start + backend.timeout)
+
+        best = None
+        errors = []
+        pending = set(futures)
+        while pending:
+            now = time.perf_counter()
+            for future in [f for f in pending if futures[f][1] <= now]:
+                logger.warning(f"Recognizer '{futures[future][0].name}' timed out")
+                pending.discard(future)
+            if not pending:
+                break
+            next_deadline = min(futures[f][1] for f in pending)
+            done, pending = wait(pending, timeout=max(0.0, next_deadline - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                backend = futures[future][0]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.warning(f"Recognizer '{backend.name}' failed: {e}")
+                    errors.append(e)
+                    continue
+                if result is None:
+                    continue
+                result.latency = time.perf_counter() - start
+                if result.confidence >= self.min_confidence:
+                    return result
+                if best is None or result.confidence > best.confidence:
+                    best = result
+
+        if best is None and errors and len(errors) == len(futures):
+            raise RuntimeError("All speech recognition methods failed")
+        return best
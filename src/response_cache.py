@@ -0,0 +1,138 @@
+import os
+import re
+import json
+import math
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = "response_cache.json"
+
+_FILLER_WORDS = {"a", "an", "the", "about", "on", "regarding", "please", "me", "some"}
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+
+
+def normalize_query(query: str) -> str:
+    """Reduce a query to a cache key: lowercase, no punctuation or filler words."""
+    words = _PUNCTUATION_RE.sub(" ", query.lower()).split()
+    return " ".join(word for word in words if word not in _FILLER_WORDS)
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class ResponseCache:
+    """Persistent LRU cache of model answers keyed by normalized query.
+
+    Entries expire after ``ttl`` seconds and the least recently used entry is
+    evicted once ``max_entries`` is reached. If ``embed`` is given, queries
+    that miss the exact key are compared by embedding similarity against the
+    cached ones, so rephrasings of a cached question are answered too.
+    ``clock`` returns the current time in seconds since the epoch.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: float = 7 * 86400, max_entries: int = 500,
+                 embed: Optional[Callable[[str], List[float]]] = None, similarity: float = 0.92,
+                 clock: Callable[[], float] = time.time):
+        self.path = path
+        self.clock = clock
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.embed = embed
+        self.similarity = similarity
+        self.stats = {"hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, dict]" = self._load()
+
+    def _load(self) -> "OrderedDict[str, dict]":
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, "r") as f:
+                    return OrderedDict(json.load(f))
+        except Exception as e:
+            logger.error(f"Error loading response cache: {e}")
+        return OrderedDict()
+
+    def save(self) -> None:
+        """Write the cache to disk atomically."""
+        with self._lock:
+            data = list(self._entries.items())
+        try:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error saving response cache: {e}")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expired(self, entry: dict, now: float) -> bool:
+        return now - entry["created"] > self.ttl
+
+    def _embed(self, query: str) -> Optional[List[float]]:
+        if not self.embed:
+            return None
+        try:
+            return list(self.embed(query))
+        except Exception as e:
+            logger.warning(f"Embedding failed, skipping similarity lookup: {e}")
+            return None
+
+    def get(self, query: str) -> Optional[str]:
+        """Return the cached answer for ``query`` or None."""
+        key = normalize_query(query)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry, now):
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry["response"]
+                del self._entries[key]
+
+        embedding = self._embed(key)
+        if embedding is not None:
+            with self._lock:
+                best_key, best_score = None, self.similarity
+                for other_key, other in self._entries.items():
+                    if other.get("embedding") is None or self._expired(other, now):
+                        continue
+                    score = _cosine(embedding, other["embedding"])
+                    if score >= best_score:
+                        best_key, best_score = other_key, score
+                if best_key is not None:
+                    self._entries.move_to_end(best_key)
+                    self.stats["semantic_hits"] += 1
+                    logger.info(f"Semantic cache hit for '{key}' -> '{best_key}' ({best_score:.3f})")
+                    return self._entries[best_key]["response"]
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, query: str, response: str) -> None:
+        """Cache ``response`` for ``query`` and persist the cache."""
+        key = normalize_query(query)
+        entry = {"response": response, "created": self.clock(), "embedding": self._embed(key)}
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        self.save()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        self.save()
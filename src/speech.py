@@ -1,27 +1,42 @@
 import speech_recognition as sr
-import pyttsx3
 import os
 import webbrowser
 import subprocess
-import requests
 import ctypes
 import logging
-from typing import Optional
-import json
-import google.generativeai as genai
-from pathlib import Path
-import tkinter as tk
-from tkinter import ttk, font
-import ttkbootstrap as ttk
-from PIL import Image, ImageTk
+from typing import Optional, Tuple
 import json
 from datetime import datetime
 import re
-from youtubesearchpython import VideosSearch
-import spotipy
-from spotipy.oauth2 import SpotifyOAuth
 import time
-import psutil
+import queue
+import threading
+import contextvars
+from startup import STARTUP, Deferred, lazy_import
+from telemetry import TRACER, DEFAULT_SPANS_PATH, annotate, record, span, traced
+from crawler import CrawlRoot, ParallelCrawler, DEFAULT_EXCLUDES
+from fuzzy_match import FuzzyMatcher, LaunchHistory, DEFAULT_HISTORY_PATH
+from streaming import stream_sentences
+from conversation import ConversationManager
+from response_cache import ResponseCache, DEFAULT_CACHE_PATH
+from spotify_state import SpotifyState
+from playback import PlaybackService, split_play_request
+from process_watcher import ProcessWatcher, normalize_name
+from tts_cache import PhraseCache, DEFAULT_CACHE_DIR
+from message_store import MessageJournal, DEFAULT_JOURNAL_PATH, LEGACY_HISTORY_PATH
+from history_index import HistoryIndex, DEFAULT_HISTORY_INDEX_PATH
+from file_index import DEFAULT_INDEX_PATH
+from tts_worker import SpeechWorker, PRIORITY_NORMAL, PRIORITY_URGENT
+from pipeline import CommandPipeline
+from audio_input import AudioSource, MicrophoneSource, StreamListener
+from wake_word import WakeWordDetector, WakeWordGate
+from recognizers import RecognizerRace
+from intents import CommandRouter
+from backends import Backends, gemini_client
+
+# Heavy third-party clients are only imported once they are first used
+genai = lazy_import("google.generativeai")
+spotipy = lazy_import("spotipy")
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -33,59 +48,173 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-genai.configure(api_key="api_key")
-
-# Spotify API credentials
-CLIENT_ID = "client-id"  # Replace with your Spotify app's Client ID
-CLIENT_SECRET = "client-secret"  # Replace with your Spotify app's Client Secret
-REDIRECT_URI = "http://localhost:8888/callback/"  # Redirect URI you set in your Spotify app
-
-
-
-# Gemini configuration
-GENERATION_CONFIG = {
-    "temperature": 0,
-    "top_p": 0.95,
-    "top_k": 64,
-    "max_output_tokens": 8192,
-}
-
-SAFETY_SETTINGS = [
-    {
-        "category": "HARM_CATEGORY_HARASSMENT",
-        "threshold": "BLOCK_NONE",
-    },
-    {
-        "category": "HARM_CATEGORY_HATE_SPEECH",
-        "threshold": "BLOCK_MEDIUM_AND_ABOVE",
-    },
-    {
-        "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-        "threshold": "BLOCK_MEDIUM_AND_ABOVE",
-    },
-    {
-        "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-        "threshold": "BLOCK_MEDIUM_AND_ABOVE",
-    },
-]
+
+def load_config(path: str = "assistant_config.json") -> dict:
+    """Read an assistant configuration file; a missing or broken file gives an empty config."""
+    try:
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                return json.load(f)
+        return {}
+    except Exception as e:
+        logger.error(f"Error loading config: {e}")
+        return {}
+
+
+# While set, speak() appends to this list instead of talking, see run_command
+_captured_speech: contextvars.ContextVar = contextvars.ContextVar("captured_speech", default=None)
+
+
+class CommandResult:
+    """What handling one command did, for callers that can't hear the answer."""
+
+    __slots__ = ("command", "intent", "slots", "keep_running", "error", "spoken", "seconds")
+
+    def __init__(self, command: str):
+        self.command = command
+        self.intent: Optional[str] = None
+        self.slots: dict = {}
+        self.keep_running = True
+        self.error: Optional[str] = None
+        self.spoken: list = []
+        self.seconds = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "command": self.command,
+            "intent": self.intent,
+            "slots": self.slots,
+            "ok": self.error is None,
+            "error": self.error,
+            "exit": not self.keep_running,
+            "spoken": self.spoken,
+            "ms": round(self.seconds * 1000, 3),
+        }
+
 
 class VoiceAssistant:
-    def __init__(self):
-        """Initialize the voice assistant with necessary components."""
-        self.recognizer = sr.Recognizer()
-        self.tts_engine = self._initialize_tts()
-        self.chat_model = self._initialize_chat_model()
+    def __init__(self, audio_source: Optional[AudioSource] = None, backends: Optional[Backends] = None,
+                 config: Optional[dict] = None, config_file: str = "assistant_config.json"):
+        """Initialize the voice assistant with necessary components.
+
+        ``backends`` defaults to the providers named in the config, which is
+        read from ``config_file`` unless given.
+        """
+        self.audio_source = audio_source
+        self.listener = None
+        self.config_file = config_file
+        self.config = config if config is not None else self._load_config()
+        # Caches, history and spans go here; the working directory by default
+        self.data_dir = self.config.get('data_dir', "")
+        if self.data_dir:
+            os.makedirs(self.data_dir, exist_ok=True)
+            TRACER.path = self.data_path(DEFAULT_SPANS_PATH)
+        self.backends = backends or Backends.from_config(self.config)
+        self.clock = self.backends.clock
+        self._chat_model = Deferred("chat model", self.backends.llm)
+        # The TTS engine and phrase cache live on the speech worker's thread
+        self.speech = SpeechWorker(self.backends.tts, phrase_cache_factory=self._initialize_phrase_cache)
+        self.admin_passphrase = self.config.get('admin_passphrase', '')
         self.search_directories = self._get_search_directories()
-        self.config_file = "assistant_config.json"
-        self.admin_passphrase = self._load_admin_passphrase()
-        self.spotify = self._initialize_spotify()
+        self.folder_directories = self._get_folder_directories()
+        self.file_index = self.backends.file_search(self.search_directories + self.folder_directories,
+                                                    db_path=self.data_path(DEFAULT_INDEX_PATH))
+        self.file_index.build_async()
+        self.matcher = FuzzyMatcher(self.file_index, history=LaunchHistory(
+            self.data_path(DEFAULT_HISTORY_PATH), clock=self.clock.time
+        ))
+        # Owned here rather than by the window so recall also works headless
+        self.journal = MessageJournal(
+            self.data_path(DEFAULT_JOURNAL_PATH), legacy_path=self.data_path(LEGACY_HISTORY_PATH)
+        )
+        self.history = HistoryIndex(self.data_path(DEFAULT_HISTORY_INDEX_PATH))
+        self.journal.listeners.append(self.history.add_many)
+        self.history.sync_async(self.journal)
+        self._conversation = Deferred("conversation", lambda: ConversationManager(
+            self.chat_model,
+            max_tokens=self.config.get('context_tokens', 4000)
+        ))
+        self._response_cache = Deferred("response cache", self._initialize_response_cache)
+        self.wake_gate = self._initialize_wake_gate()
+        self.recognizer_race = RecognizerRace(
+            self.backends.recognizers(),
+            min_confidence=self.config.get('min_confidence', 0.7)
+        )
+        self.processes = ProcessWatcher(interval=self.config.get('process_poll_seconds', 2.0))
+        self.processes.listeners.append(self._on_processes_changed)
+        self._spotify = Deferred("spotify", self._initialize_spotify)
+        # The watcher answers from memory, so there is nothing to gain from caching its answer
+        self._spotify_state = Deferred("spotify state", lambda: SpotifyState(
+            self.spotify,
+            process_running=self.is_spotify_running,
+            process_ttl=0
+        ) if self.spotify else None)
+        self._playback = Deferred("playback", lambda: PlaybackService(
+            self.spotify,
+            self.spotify_state,
+            coalesce_window=self.config.get('spotify_coalesce_ms', 250) / 1000
+        ) if self.spotify else None)
         self.is_admin_mode = False
         self.spotify_running = False
         self.gui = None
+        self.pipeline = None
+        self.router = self._build_router()
+
+    @property
+    def chat_model(self):
+        return self._chat_model.get()
+
+    @property
+    def conversation(self) -> ConversationManager:
+        return self._conversation.get()
+
+    @property
+    def response_cache(self) -> ResponseCache:
+        return self._response_cache.get()
+
+    @property
+    def spotify(self):
+        return self._spotify.get()
+
+    @property
+    def spotify_state(self) -> Optional[SpotifyState]:
+        return self._spotify_state.get()
+
+    @property
+    def playback(self) -> Optional[PlaybackService]:
+        return self._playback.get()
+
+    def warm_up(self) -> None:
+        """Initialize the deferred integrations in the background."""
+        if not self.config.get('warm_up', True):
+            return
+        self.processes.start()
+        for deferred in (self._conversation, self._response_cache, self._playback):
+            deferred.warm_async()
+
+    def data_path(self, name: str) -> str:
+        """Where the assistant keeps the data file ``name``."""
+        return os.path.join(self.data_dir, name)
 
     def set_gui(self, gui):
         self.gui = gui
 
+    def add_message(self, text: str, is_user: bool, searchable: bool = True) -> None:
+        """Record a message in the chat history and show it in the window, if any."""
+        message = {"text": text, "is_user": is_user, "timestamp": self.clock.now().isoformat()}
+        if not searchable:
+            message["searchable"] = False
+        self.journal.append(message)
+        if self.gui:
+            self.gui.display_message(message)
+
+    def close(self) -> None:
+        """Write out and close the chat history and the phrase cache's use counts."""
+        self.journal.close()
+        self.history.close()
+        if self.speech.phrase_cache is not None:
+            self.speech.phrase_cache.save()
+
     def get_confirmation(self) -> bool:
         """Get confirmation from the user."""
         self.speak("Please say yes or no clearly")
@@ -112,24 +241,17 @@ class VoiceAssistant:
             self.speak("I didn't understand your response. Please try again.")
             return False
 
-    def _load_admin_passphrase(self) -> str:
-        """Load admin passphrase from config file or create new one."""
-        try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r') as f:
-                    config = json.load(f)
-                    return config.get('admin_passphrase', '')
-            return ''
-        except Exception as e:
-            logger.error(f"Error loading admin passphrase: {e}")
-            return ''
+    def _load_config(self) -> dict:
+        """Load the assistant configuration file."""
+        return load_config(self.config_file)
 
     def save_admin_passphrase(self, passphrase: str) -> None:
         """Save admin passphrase to config file."""
         try:
-            config = {'admin_passphrase': passphrase}
+            self.config['admin_passphrase'] = passphrase
             with open(self.config_file, 'w') as f:
-                json.dump(config, f)
+                json.dump(self.config, f)
+            self.admin_passphrase = passphrase
             logger.info("Admin passphrase saved successfully")
         except Exception as e:
             logger.error(f"Error saving admin passphrase: {e}")
@@ -185,52 +307,48 @@ class VoiceAssistant:
         return is_authenticated
 
 
-    def _initialize_tts(self) -> pyttsx3.Engine:
-        """Initialize and configure text-to-speech engine."""
-        try:
-            engine = pyttsx3.init()
-            voices = engine.getProperty('voices')
-            if voices:
-                engine.setProperty('voice', voices[1].id)  # Female voice
-            engine.setProperty('rate', 150)
-            engine.setProperty('volume', 1)
-            return engine
-        except Exception as e:
-            logger.error(f"Failed to initialize TTS engine: {e}")
-            raise
-
-    def _initialize_chat_model(self):
-        """Initialize the Gemini chat model."""
-        return genai.GenerativeModel(
-            model_name="gemini-1.5-pro",
-            safety_settings=SAFETY_SETTINGS,
-            generation_config=GENERATION_CONFIG,
-            system_instruction="""
-            Give detailed information about the mentioned topic in 5 sentences 
-            """
-        )
-
     def _get_search_directories(self) -> list:
         """Get list of directories to search for applications."""
-        username = os.getlogin()
-        return [
-            Path("C:/Program Files"),
-            Path("C:/Program Files (x86)"),
-            Path("C:/Windows/System32"),
-            Path("C:/Users/Public/Desktop"),
-            Path(f"C:/Users/{username}/AppData/Roaming/Microsoft/Windows/Start Menu/Programs"),
-            Path("D:/"),
-            Path("E:/")
-        ]
-
-    def speak(self, text: str) -> None:
-        """Convert text to speech."""
+        configured = self.config.get('search_roots', {}).get('applications')
+        if not configured:
+            try:
+                username = os.getlogin()
+            except OSError:
+                username = os.environ.get('USERNAME', '')
+            configured = [
+                "C:/Program Files",
+                "C:/Program Files (x86)",
+                "C:/Windows/System32",
+                "C:/Users/Public/Desktop",
+                f"C:/Users/{username}/AppData/Roaming/Microsoft/Windows/Start Menu/Programs",
+            ]
+        return self._crawl_roots(configured)
+
+    def _get_folder_directories(self) -> list:
+        """Get list of directories to search for folders."""
+        configured = self.config.get('search_roots', {}).get('folders') or ["D:/", "E:/"]
+        return self._crawl_roots(configured)
+
+    def _crawl_roots(self, configured: list) -> list:
+        exclude = list(DEFAULT_EXCLUDES) + self.config.get('search_exclude', [])
+        max_depth = self.config.get('search_max_depth')
+        return [CrawlRoot.from_config(value, exclude=exclude, max_depth=max_depth) for value in configured]
+
+    def speak(self, text: str, priority: int = PRIORITY_NORMAL, searchable: bool = True) -> None:
+        """Queue text on the speech worker and return without waiting for it.
+
+        ``searchable=False`` keeps the message out of the history index.
+        """
+        captured = _captured_speech.get()
+        if captured is not None:
+            captured.append(text)
+            return
         try:
             logger.info(f"Speaking: {text}")
-            if self.gui:
-                self.gui.add_message(text, is_user = False)
-            self.tts_engine.say(text)
-            self.tts_engine.runAndWait()
+            self.add_message(text, is_user=False, searchable=searchable)
+            if self.wake_gate:
+                self.wake_gate.touch()
+            self.speech.say(text, priority)
         except Exception as e:
             logger.error(f"TTS error: {e}")
             print(f"Failed to speak: {text}")
@@ -240,158 +358,170 @@ class VoiceAssistant:
         Enhanced listening function with optimized voice recognition settings.
         Returns the recognized text in lowercase or empty string if recognition fails.
         """
-        with sr.Microphone() as source:
-            try:
-                if self.gui:
-                    self.gui.set_listening_state(True)
-                    
-                logger.info("Listening for user input...")
-                
-                # Configure recognizer for better performance
-                self.recognizer.dynamic_energy_threshold = True
-                self.recognizer.energy_threshold = 300  # Adjust based on your environment
-                self.recognizer.dynamic_energy_adjustment_ratio = 1.5
-                self.recognizer.pause_threshold = 0.8  # Shorter pause to detect end of speech
-                
-                # Adjust for ambient noise with longer duration for better calibration
-                self.recognizer.adjust_for_ambient_noise(source, duration=1.5)
-                
-                print("Speak now...")
-                
-                # Listen with generous timeout settings
-                audio = self.recognizer.listen(
-                    source, 
-                    timeout=8,  # Maximum wait for speech to start
-                    phrase_time_limit=7  # Maximum duration of speech
+        if _captured_speech.get() is not None:
+            # A text command has no one at the microphone to answer follow-up questions
+            logger.info("Not listening while handling a text command")
+            return ""
+
+        if self.pipeline and self.pipeline.running:
+            # The pipeline owns the microphone, take its next recognized utterance
+            return self.pipeline.next_command(timeout=15)
+
+        audio = self.capture_audio()
+        if audio is None:
+            return ""
+        return self.recognize(audio)
+
+    @traced("listen.capture")
+    def capture_audio(self) -> Optional[sr.AudioData]:
+        """Record one utterance from the audio source, or return None if nothing was said."""
+        barge_in = self.config.get('barge_in', False)
+        if not barge_in:
+            # Don't pick up the assistant's own voice, but don't hang on a stuck engine either
+            if not self.speech.wait_idle(10):
+                logger.warning("Speech still playing after 10s, listening anyway")
+        STARTUP.mark("first listen")
+        STARTUP.log_once()
+        try:
+            if self.gui:
+                self.gui.set_listening_state(True)
+
+            logger.info("Listening for user input...")
+            print("Speak now...")
+
+            # Unless the user may talk over the assistant, drop whatever was
+            # captured while it was speaking
+            audio = self._get_listener().listen(
+                timeout=8,  # Maximum wait for speech to start
+                phrase_time_limit=7,  # Maximum duration of speech
+                discard_pending=not barge_in
+            )
+            if audio is None:
+                logger.info("Audio source has ended")
+                return None
+
+            if self.wake_gate and not self.wake_gate.accept(audio.frame_data, audio.sample_rate):
+                logger.info(f"Utterance dropped before recognition {self.wake_gate.stats}")
+                return None
+
+            logger.info("Audio captured")
+            return audio
+
+        except sr.WaitTimeoutError:
+            logger.warning("Timeout: No speech detected")
+            return None
+
+        except Exception as e:
+            logger.error(f"Error capturing audio: {e}")
+            return None
+
+        finally:
+            if self.gui:
+                self.gui.set_listening_state(False)
+
+    def _initialize_wake_gate(self) -> Optional[WakeWordGate]:
+        """Create the offline speech/wake word front end from the config."""
+        settings = self.config.get('wake_word', {})
+        if not settings.get('enabled', True):
+            return None
+        detector = None
+        if settings.get('templates'):
+            detector = WakeWordDetector(settings['templates'], threshold=settings.get('threshold'))
+        return WakeWordGate(detector, session_seconds=settings.get('session_seconds', 20))
+
+    def _get_listener(self) -> StreamListener:
+        """Open the long-lived capture stream on first use."""
+        if self.listener is None:
+            with span("listen.open_stream"):
+                self.listener = StreamListener(
+                    self.audio_source or MicrophoneSource(),
+                    pause_threshold=0.8  # Shorter pause to detect end of speech
                 )
+                self.listener.start()
+        return self.listener
+
+    @property
+    def audio_ended(self) -> bool:
+        """True once a finite audio source (e.g. WAV files) has been played out."""
+        return self.listener is not None and self.listener.ended
+
+    @traced("listen.recognize")
+    def recognize(self, audio: sr.AudioData) -> str:
+        """Turn captured audio into a lowercase command, or an empty string on failure."""
+        try:
+            logger.info("Recognizing speech...")
+
+            # Race the configured recognition services, first confident result wins
+            result = self.recognizer_race.recognize(audio)
+            if result is None:
+                raise sr.UnknownValueError()
+            command = result.text
+            annotate(backend=result.backend, confidence=result.confidence)
+            logger.info(f"Recognized using {result.backend} in {result.latency:.2f}s: '{command}'")
+            
+            self.add_message(command, is_user=True)
                 
-                logger.info("Audio captured, recognizing speech...")
-                
-                # Try multiple recognition services for better reliability
-                try:
-                    # Primary recognition service
-                    command = self.recognizer.recognize_google(audio, language='en-US')
-                    logger.info(f"Successfully recognized: '{command}'")
-                except sr.RequestError:
-                    # Fallback to offline recognizer if network issues
-                    try:
-                        # Requires pocketsphinx to be installed
-                        command = self.recognizer.recognize_sphinx(audio)
-                        logger.info(f"Recognized using fallback (Sphinx): '{command}'")
-                    except:
-                        raise Exception("All speech recognition methods failed")
-                
-                # Update GUI if it exists
-                if self.gui:
-                    self.gui.add_message(command, is_user=True)
-                    self.gui.set_listening_state(False)
-                    
-                # Clean and normalize response
-                command = command.lower().strip()
-                logger.info(f"Final processed command: '{command}'")
-                return command
-                
-            except sr.WaitTimeoutError:
-                logger.warning("Timeout: No speech detected")
-                if self.gui: 
-                    self.gui.set_listening_state(False)
-                return ""
-                
-            except sr.UnknownValueError:
-                logger.warning("Speech was unintelligible")
-                if self.gui:
-                    self.gui.set_listening_state(False)
-                return ""
-                
-            except Exception as e:
-                logger.error(f"Error in speech recognition: {e}")
-                if self.gui:
-                    self.gui.set_listening_state(False)
-                return ""
+            # Clean and normalize response
+            command = command.lower().strip()
+            logger.info(f"Final processed command: '{command}'")
+            return command
+            
+        except sr.UnknownValueError:
+            logger.warning("Speech was unintelligible")
+            return ""
+            
+        except Exception as e:
+            logger.error(f"Error in speech recognition: {e}")
+            return ""
 
+    @traced("search.app")
     def search_app(self, app_name: str) -> Optional[str]:
-        """Search for application in common directories."""
+        """Search for application in the file index."""
         app_aliases = {
             "word": "winword",
             "excel": "excel",
             "powerpoint": "powerpnt"
         }
-        
-        search_name = app_aliases.get(app_name.lower(), app_name)
-        
-        for directory in self.search_directories:
-            if not directory.exists():
-                continue
-                
-            try:
-                for path in directory.rglob("*"):
-                    if path.is_file() and search_name.lower() in path.name.lower() and path.suffix.lower() in ('.exe', '.lnk'):
-                        return str(path)
-            except Exception as e:
-                logger.error(f"Error searching in {directory}: {e}")
-        
-        return None
-
-    def search_app(self, app_name: str) -> Optional[Path]:
-        """Search for application in common directories."""
-        if app_name == "word":
-            app_name = "winword"
-        elif app_name == "excel":
-            app_name = "excel"
-        elif app_name == "powerpoint":
-            app_name = "powerpnt"
-        
-        
-        search_dirs = [
-            "C:/Program Files",
-            "C:/Program Files (x86)",
-            "C:/Windows/System32",
-            "C:/Users/Public/Desktop",
-            f"C:/Users/{os.getlogin()}/AppData/Roaming/Microsoft/Windows/Start Menu/Programs"
-        ]
-        
-        for directory in search_dirs:
-            if not os.path.exists(directory):
-                continue
-                
-            try:
-                for root, _, files in os.walk(directory):
-                    for file in files:
-                        if app_name.lower() in file.lower() and file.endswith(('.exe', '.lnk')):
-                            return os.path.join(root, file)
-            except PermissionError:
-                logger.warning(f"Permission denied accessing {directory}")
-            except Exception as e:
-                logger.error(f"Error searching in {directory}: {e}")
-        
-        return None
 
-    def search_folder(self, folder_name: str) -> Optional[Path]:
-        """Search for a folder in specified drives.
-        Returns the path if found, None otherwise."""
-
-        search_dirs = ["D:\\", "E:\\"]
-
-        try:
-            for directory in search_dirs:
-                if not os.path.exists(directory):
-                    logger.warning(f"Drive {directory} is not accessible")
-                    continue
-
-                logger.info(f"Searching in {directory}")
-                for root, dirs, _ in os.walk(directory):
-                    for dir_name in dirs:
-                        if folder_name.lower() in dir_name.lower():
-                            full_path = os.path.join(root, dir_name)
-                            logger.info(f"Found folder: {full_path}")
-                            return str(full_path)
-
-        except PermissionError:
-            logger.warning("Permission denied while accessing some directories")
-        except Exception as e:
-            logger.error(f"Error searching folders: {e}")
+        search_name = app_aliases.get(app_name.lower(), app_name).lower()
+        annotate(source="index" if self.file_index.wait_ready(0) else "crawl")
+        if self.file_index.wait_ready(0):
+            matches = self.matcher.top(
+                search_name,
+                roots=self.search_directories,
+                is_dir=False,
+                suffixes=('.exe', '.lnk')
+            )
+            logger.info(f"Application candidates for '{search_name}': {matches}")
+            return matches[0].path if matches else None
+
+        # The index is still being built, crawl the roots directly instead
+        logger.info("File index is not ready, crawling application directories")
+        result = ParallelCrawler(self.search_directories).find_first(
+            lambda entry: not entry.is_dir
+            and search_name in entry.name.lower()
+            and entry.name.lower().endswith(('.exe', '.lnk'))
+        )
+        return result.path if result else None
 
-        return None
+    @traced("search.folder")
+    def search_folder(self, folder_name: str) -> Optional[str]:
+        """Search for a folder in the file index.
+        Returns the path if found, None otherwise."""
+        folder_name = folder_name.lower()
+        annotate(source="index" if self.file_index.wait_ready(0) else "crawl")
+        if self.file_index.wait_ready(0):
+            path = self.matcher.best(folder_name, roots=self.folder_directories, is_dir=True)
+        else:
+            logger.info("File index is not ready, crawling folder directories")
+            result = ParallelCrawler(self.folder_directories).find_first(
+                lambda entry: entry.is_dir and folder_name in entry.name.lower()
+            )
+            path = result.path if result else None
+
+        if path:
+            logger.info(f"Found folder: {path}")
+        return path
 
     def open_folder(self, folder_name: str) -> None:
         """
@@ -405,6 +535,7 @@ class VoiceAssistant:
             if path:
                 self.speak(f"Opening folder {folder_name}")
                 os.startfile(path)
+                self.matcher.record_launch(path)
             else:
                 self.speak(f"Could not find folder {folder_name}")
         except Exception as e:
@@ -425,6 +556,7 @@ class VoiceAssistant:
                 os.startfile(path)
             else:
                 subprocess.run([path], check=True)
+            self.matcher.record_launch(path)
         except PermissionError:
             if not ctypes.windll.shell32.IsUserAnAdmin():
                 try:
@@ -450,197 +582,373 @@ class VoiceAssistant:
             logger.error(f"Web search error: {e}")
             self.speak("Sorry, I couldn't perform the web search.")
 
+    @traced("get_info")
     def get_info(self, query: str) -> None:
-        """Get information from Gemini."""
+        """Get information from Gemini, answering repeated questions from the cache."""
         try:
-            chat_session = self.chat_model.start_chat()
-            response = chat_session.send_message(query)
-            
-            if response.text:
-                print(f'Assistant: {response.text}\n')
-                self.speak(response.text)
+            cacheable = not self.conversation.is_follow_up(query)
+            if cacheable:
+                cached = self.response_cache.get(query)
+                annotate(cached=bool(cached))
+                if cached:
+                    logger.info(f"Answering '{query}' from cache {self.response_cache.stats}")
+                    self.conversation.record_exchange(query, cached)
+                    print(f'Assistant: {cached}\n')
+                    self.speak(cached)
+                    return
+
+            complete = True
+            if self.config.get('stream_responses', True):
+                text, complete = self._speak_streamed(self.conversation.send(query, stream=True))
             else:
-                self.speak("Sorry, I couldn't generate a response.")
+                with span("model.response"):
+                    response = self.conversation.send(query)
+                    text = response.text
+                if text:
+                    print(f'Assistant: {text}\n')
+                    self.speak(text)
+                else:
+                    self.speak("Sorry, I couldn't generate a response.")
+
+            # A stream cut short would otherwise be served again for the whole TTL
+            if text and cacheable and complete:
+                self.response_cache.put(query, text)
         except Exception as e:
             logger.error(f"Error getting information: {e}")
             self.speak("Sorry, I encountered an error while getting that information.")
 
-    
+    def _speak_streamed(self, response) -> Tuple[str, bool]:
+        """Speak a streamed response sentence by sentence as it is generated.
+
+        The stream is drained on a background thread so that generation keeps
+        going while earlier sentences are being spoken. Returns the text that
+        was spoken and whether the stream finished without an error.
+        """
+        sentences = queue.Queue()
+        errors = []
+
+        def produce():
+            try:
+                for sentence in stream_sentences(response):
+                    sentences.put(sentence)
+            except Exception as e:
+                logger.error(f"Error streaming response: {e}")
+                errors.append(e)
+            finally:
+                sentences.put(None)
+
+        threading.Thread(target=produce, daemon=True, name="gemini-stream").start()
+
+        start = time.perf_counter()
+        spoken = []
+        while True:
+            sentence = sentences.get()
+            if sentence is None:
+                break
+            if not spoken:
+                record("model.first_sentence", time.perf_counter() - start)
+            print(f'Assistant: {sentence}')
+            self.speak(sentence)
+            spoken.append(sentence)
+        record("model.stream", time.perf_counter() - start, sentences=len(spoken))
+        if not spoken:
+            self.speak("Sorry, I couldn't generate a response.")
+        return " ".join(spoken), not errors
+
+    def _initialize_response_cache(self) -> ResponseCache:
+        """Create the response cache, with the embedding tier if enabled in the config."""
+        embed = None
+        if self.config.get('semantic_cache', False):
+            def embed(text):
+                gemini_client.get()
+                return genai.embed_content(model="models/text-embedding-004", content=text)["embedding"]
+        return ResponseCache(
+            self.data_path(DEFAULT_CACHE_PATH),
+            ttl=self.config.get('cache_ttl_hours', 168) * 3600,
+            max_entries=self.config.get('cache_max_entries', 500),
+            embed=embed,
+            clock=self.clock.time
+        )
+
+    def _initialize_phrase_cache(self, engine) -> Optional[PhraseCache]:
+        """Create the pre-rendered phrase cache for pyttsx3 engines unless disabled in the config."""
+        options = self.config.get('tts_cache', {})
+        if not options.get('enabled', True):
+            return None
+        if type(engine).__module__.split(".")[0] != "pyttsx3":
+            # Other engines (e.g. the offline fake) are cheap or can't render to files
+            logger.info(f"Phrase cache disabled for the {type(engine).__name__} TTS engine")
+            return None
+        return PhraseCache(
+            engine,
+            directory=self.data_path(DEFAULT_CACHE_DIR),
+            max_bytes=int(options.get('max_mb', 50) * 1024 * 1024),
+            min_uses=options.get('min_uses', 2)
+        )
+
     def _initialize_spotify(self):
         try:
-            return spotipy.Spotify(auth_manager=SpotifyOAuth(
-                client_id=CLIENT_ID,
-                client_secret=CLIENT_SECRET,
-                redirect_uri=REDIRECT_URI,
-                scope="user-modify-playback-state user-read-playback-state"
-            ))
+            return self.backends.music()
         except Exception as e:
             logger.error(f"Spotify initialization error: {e}")
             return None
 
     def is_spotify_running(self):
-        return "Spotify.exe" in (p.name() for p in psutil.process_iter())
-
-
-    def pause_music(self):
-        try:
-            devices = self.spotify.devices()
-            if not devices['devices']:
-                self.speak("No active Spotify devices found")
-                return False
-                
-            self.spotify.pause_playback(device_id=devices['devices'][0]['id'])
+        return self.processes.is_running("spotify")
+
+    def _on_processes_changed(self, started: dict, exited: dict) -> None:
+        # Devices come and go with the desktop client
+        if normalize_name("spotify") in set(started.values()) | set(exited.values()):
+            state = self._spotify_state.peek()
+            if state is not None:
+                state.invalidate()
+
+    def _ensure_spotify_device(self) -> bool:
+        """Make sure a Spotify device is available, launching the client if needed."""
+        state = self.spotify_state
+        if state.device_id():
             return True
-        except spotipy.exceptions.SpotifyException as e:
-            logger.error(f"Spotify API error: {e}")
-            return False
+        if not state.client_running():
+            self.open_application("spotify")
+        # Wait for the client to register a device instead of sleeping a fixed time
+        if state.wait_for_device(timeout=15):
+            return True
+        self.speak("No Spotify devices found")
+        return False
+
+    def _report_playback(self, future, confirmation: Optional[str] = None) -> bool:
+        """Speak the outcome of a finished playback command; True if it succeeded."""
+        error = future.exception()
+        if error is None:
+            if confirmation:
+                self.speak(confirmation)
+            return True
+        if isinstance(error, LookupError):
+            self.speak("No tracks found for your query")
+        else:
+            logger.error(f"Spotify API error: {error}")
+            self.speak("Error controlling Spotify playback")
+        return False
 
-  
+    def _control_playback(self, action: str, *args, confirmation: Optional[str] = None) -> bool:
+        """Submit a playback command without waiting for the API calls.
 
-    def play_music(self, query=None):
+        ``confirmation`` is spoken once the command has succeeded; a failure
+        is reported instead. Both come from the playback thread, so callers
+        never wait for the coalescing window or for Spotify. They are spoken
+        in the caller's context, so a command run with ``capture_speech``
+        stays silent after its result has been returned.
+        """
         try:
             if not self.spotify:
                 self.speak("Spotify is not configured properly")
                 return False
-
-            devices = self.spotify.devices()
-            if not devices['devices']:
-                if not self.is_spotify_running():
-                    self.open_application("spotify")
-                    time.sleep(3)
-                    devices = self.spotify.devices()
-                    if not devices['devices']:
-                        self.speak("No Spotify devices found")
-                        return False
-
-            device_id = devices['devices'][0]['id']
-
-            if query:
-                results = self.spotify.search(q=query, type='track', limit=1)
-                if not results['tracks']['items']:
-                    self.speak("No tracks found for your query")
-                    return False
-                    
-                track = results['tracks']['items'][0]
-                self.spotify.start_playback(device_id=device_id, uris=[track['uri']])
-            else:
-                self.spotify.start_playback(device_id=device_id)
-            return True
-                    
+            if not self._ensure_spotify_device():
+                return False
+            future = getattr(self.playback, action)(*args)
         except spotipy.exceptions.SpotifyException as e:
             logger.error(f"Spotify API error: {e}")
             self.speak("Error controlling Spotify playback")
             return False
-        
+        context = contextvars.copy_context()
+        future.add_done_callback(lambda f: context.run(self._report_playback, f, confirmation))
+        return True
+
+    def pause_music(self, confirmation: Optional[str] = None):
+        return self._control_playback("pause", confirmation=confirmation)
+
+    def play_music(self, query=None, confirmation: Optional[str] = None):
+        # "play x then y and z" plays the tracks in order with one playback call
+        return self._control_playback("play", split_play_request(query) if query else None,
+                                      confirmation=confirmation)
+
+    def _build_router(self) -> CommandRouter:
+        """Register every voice command with its trigger patterns."""
+        router = CommandRouter(prefix="(?:hello|hey) jarvis")
+        router.register("exit", ["(exit|quit|stop|goodbye)"], self._handle_exit, priority=100)
+        router.register("pause_music", ["pause [the] [music]", "stop [the] music"], self._handle_pause_music, priority=10)
+        router.register("admin_mode", ["* switch to admin mode *"], self._handle_admin_mode, priority=5)
+        router.register("setup_admin", ["* set up [an] admin (passcode|passphrase|password) *"], self._handle_setup_admin, priority=5)
+        router.register("greeting", ["(hello|hey|hi) jarvis"], self._handle_greeting)
+        router.register("capabilities", ["* what can you do *"], self._handle_capabilities)
+        router.register("launch", ["launch {app?}"], self._handle_launch)
+        router.register("open_folder", ["open folder {folder?}"], self._handle_open_folder)
+        router.register("search", ["search [for] {query?}", "* search for {query}"], self._handle_search)
+        router.register("get_info", ["(get|give) information [on|about] {query?}"], self._handle_get_info)
+        router.register("recall", ["what did you (tell|say) [to] me about {query}", "what did you say about {query}"],
+                        self._handle_recall)
+        router.register("follow_up", ["tell me more {detail?}", "go on", "continue"], self._handle_follow_up)
+        router.register("resume_music", ["(resume|unpause) [the] [music]"], self._handle_resume_music, priority=10)
+        router.register("next_track", ["(next|skip) [the] [song|track]", "play [the] next (song|track)"],
+                        self._handle_next_track, priority=10)
+        router.register("previous_track", ["previous [song|track]", "play [the] previous (song|track)"],
+                        self._handle_previous_track, priority=10)
+        router.register("play_album", ["play [the] album {query}"], self._handle_play_album, priority=5)
+        router.register("queue_music", ["queue [the] album {album}", "queue [up] {query}", "add {query} to [the] queue"],
+                        self._handle_queue_music, priority=5)
+        router.register("play_music", ["play [some] music", "play {query?}"], self._handle_play_music)
+        # Compile up front rather than on the first match, which may come from any headless thread
+        router.compile()
+        return router
 
     def execute_command(self, command: str) -> bool:
-            """Execute voice commands and return False if should exit."""
-            if not command:
-                return True
+        """Execute voice commands and return False if should exit."""
+        return self.run_command(command).keep_running
 
-            try:
-                if any(word in command for word in ["exit", "quit", "stop"]):
-                    self.speak("Goodbye!")
-                    return False
+    def run_command(self, command: str, capture_speech: bool = False) -> CommandResult:
+        """Handle one command and describe what happened.
 
-                if "switch to admin mode" in command:
-                    self.is_admin_mode = self.authenticate_admin()
-                    return True
-                
-                if "set up admin passcode" in command:
-                    if not self.admin_passphrase:
-                        self.setup_admin_passphrase()
-                    else:
-                        self.speak("Admin passphrase already exists. Please authenticate as admin to change it")
-                    return True
-
-                if "hello jarvis" in command:
-                    self.speak("Hello! How can I assist you?")
-                    return True
-
-                if "what can you do" in command:
-                    self.speak("I can perform various tasks, such as searching the web, getting information, opening applications and folders")
-                    return True
-
-                if command.startswith("launch"):
-                    
-                    app_name = command.replace("launch", "").strip()
-                    if not app_name:
-                        self.speak("Please specify the application to open.")
-                        return True
-                        
-                    if not self.is_admin_mode:
-                        self.speak("This command requires admin access. Please switch to admin mode first")
-                        return True
-                        
-                    self.open_application(app_name)
-                    return True
-
-                if "open folder" in command:
-                    folder_name = command.replace("open folder", "").strip()
-                    if not folder_name:
-                        self.speak("Please specify the folder to open.")
-                        return True
-                        
-                    if not self.is_admin_mode:
-                        self.speak("This command requires admin access. Please switch to admin mode first")
-                        return True
-                        
-                    self.open_folder(folder_name)
-                    return True
-
-                if "search" in command:
-                    query = command.replace("search for", "").replace("search", "").strip()
-                    if query:
-                        self.search_web(query)
-                    else:
-                        self.speak("Please specify what to search for.")
-                    return True
+        With ``capture_speech`` nothing is said aloud or shown in the GUI:
+        what the handler speaks on this thread is collected in the result's
+        ``spoken`` list, and prompts for a spoken reply get none.
+        """
+        result = CommandResult(command)
+        if not command:
+            return result
 
-                if command.startswith(("get information", "give information")):
-                    query = command.replace("get information", "").replace("give information on", "").strip()
-                    if query:
-                        self.get_info(query)
+        token = _captured_speech.set(result.spoken) if capture_speech else None
+        start = time.perf_counter()
+        try:
+            with span("command") as command_span:
+                with span("command.match"):
+                    match = self.router.match(command)
+                result.intent = match.intent.name if match else "unknown"
+                command_span.set(intent=result.intent)
+                with span("command.handler", intent=result.intent):
+                    if match is None:
+                        outcome = self._handle_unknown(command)
                     else:
-                        self.speak("Please specify what information you need.")
-                    return True
-
-                if "music" in command or "play" in command or "pause" in command:
-                    if not self.spotify:
-                        self.speak("Spotify is not configured")
-                        return True
-                        
-                    if "pause" in command or "stop music" in command:
-                        if self.pause_music():
-                            self.speak("Music paused")
-                        return True
-                        
-                        
-                    if "play" in command:
-                        query = command.replace("play", "").strip()
-                        if self.play_music(query):
-                            self.speak(f"Playing {query if query else 'music'}")
-                        return True
-
-                # Rest of your existing command handling code...
-                    return True
-                                    
-                self.speak("I'm not sure how to help with that.")
-                return True
+                        result.slots = dict(match.slots)
+                        logger.info(f"Dispatching '{command}' to {result.intent} {match.slots}")
+                        outcome = match.intent.handler(**match.slots)
+            result.keep_running = outcome is not False
 
-            except Exception as e:
-                logger.error(f"Error executing command: {e}")
-                self.speak("Sorry, I encountered an error.")
-                return True
+        except Exception as e:
+            logger.error(f"Error executing command: {e}")
+            result.error = str(e) or type(e).__name__
+            self.speak("Sorry, I encountered an error.")
+        finally:
+            result.seconds = time.perf_counter() - start
+            if token is not None:
+                _captured_speech.reset(token)
+        return result
+
+    def _handle_exit(self) -> bool:
+        # Don't finish a long answer after being told to stop
+        self.speech.cancel()
+        self.speak("Goodbye!", PRIORITY_URGENT)
+        return False
+
+    def _handle_admin_mode(self) -> None:
+        self.is_admin_mode = self.authenticate_admin()
+
+    def _handle_setup_admin(self) -> None:
+        if not self.admin_passphrase:
+            self.setup_admin_passphrase()
+        else:
+            self.speak("Admin passphrase already exists. Please authenticate as admin to change it")
+
+    def _handle_greeting(self) -> None:
+        self.speak("Hello! How can I assist you?")
+
+    def _handle_capabilities(self) -> None:
+        self.speak("I can perform various tasks, such as searching the web, getting information, opening applications and folders")
+
+    def _handle_launch(self, app: str = "") -> None:
+        if not app:
+            self.speak("Please specify the application to open.")
+        elif not self.is_admin_mode:
+            self.speak("This command requires admin access. Please switch to admin mode first")
+        else:
+            self.open_application(app)
+
+    def _handle_open_folder(self, folder: str = "") -> None:
+        if not folder:
+            self.speak("Please specify the folder to open.")
+        elif not self.is_admin_mode:
+            self.speak("This command requires admin access. Please switch to admin mode first")
+        else:
+            self.open_folder(folder)
+
+    def _handle_search(self, query: str = "") -> None:
+        if query:
+            self.search_web(query)
+        else:
+            self.speak("Please specify what to search for.")
+
+    def _handle_get_info(self, query: str = "") -> None:
+        if query:
+            self.get_info(query)
+        else:
+            self.speak("Please specify what information you need.")
+
+    def _handle_recall(self, query: str) -> None:
+        hits = self.history.search(query, limit=1, is_user=False)
+        if not hits:
+            self.speak(f"I don't remember telling you anything about {query}")
+            return
+        try:
+            when = datetime.fromisoformat(hits[0].timestamp).strftime("%B %d")
+        except ValueError:
+            when = "earlier"
+        # Not indexed, or the next recall could find the quote instead of the answer
+        self.speak(f"On {when} I told you: {hits[0].text}", searchable=False)
+
+    def _handle_follow_up(self, detail: str = "") -> None:
+        self.get_info(f"tell me more {detail}".strip())
+
+    def _handle_pause_music(self) -> None:
+        if not self.spotify:
+            self.speak("Spotify is not configured")
+        else:
+            self.pause_music(confirmation="Music paused")
+
+    def _handle_play_music(self, query: str = "") -> None:
+        if not self.spotify:
+            self.speak("Spotify is not configured")
+        else:
+            self.play_music(query, confirmation=f"Playing {query if query else 'music'}")
+
+    def _handle_resume_music(self) -> None:
+        self._control_playback("resume", confirmation="Resuming music")
+
+    def _handle_next_track(self) -> None:
+        self._control_playback("next")
+
+    def _handle_previous_track(self) -> None:
+        self._control_playback("previous")
+
+    def _handle_play_album(self, query: str) -> None:
+        self._control_playback("play_album", query, confirmation=f"Playing the album {query}")
+
+    def _handle_queue_music(self, query: str = "", album: str = "") -> None:
+        if album:
+            self._control_playback("queue", [album], True, confirmation=f"Queued the album {album}")
+        else:
+            self._control_playback("queue", split_play_request(query), confirmation=f"Queued {query}")
+
+    def _handle_unknown(self, command: str) -> None:
+        self.speak("I'm not sure how to help with that.")
 
     def run(self) -> None:
         """Main loop of the voice assistant."""
+        if not self.gui:
+            # With a GUI, warm-up starts once the window is shown
+            self.warm_up()
+        if self.config.get('pipeline', True):
+            self.pipeline = CommandPipeline(self, barge_in=self.config.get('barge_in', False))
+            self.pipeline.start()
+            self.speak("Hello, this is Jarvis your voice assistant. How can I help you?")
+            self.pipeline.wait()
+            return
+
         self.speak("Hello, this is Jarvis your voice assistant. How can I help you?")
         
-        while True:
+        while not self.audio_ended:
             command = self.listen()
             if not self.execute_command(command):
                 break
+        self.speech.wait_idle(10)
 
 
 def main():
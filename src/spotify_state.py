@@ -0,0 +1,105 @@
+import time
+import logging
+import threading
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SpotifyState:
+    """Cached view of the user's Spotify devices and client process.
+
+    The device list is fetched at most once per ``device_ttl`` seconds and
+    dropped whenever a playback call fails, so a playback command normally
+    costs only the call itself. ``wait_for_device`` replaces fixed sleeps
+    after launching the client: it polls with exponential backoff until a
+    device shows up.
+    """
+
+    def __init__(self, client, process_running: Optional[Callable[[], bool]] = None,
+                 device_ttl: float = 30.0, process_ttl: float = 5.0):
+        self.client = client
+        self.device_ttl = device_ttl
+        self.process_ttl = process_ttl
+        self.api_calls = 0
+        self._process_running = process_running
+        self._devices: Optional[List[dict]] = None
+        self._devices_at = 0.0
+        self._running: Optional[bool] = None
+        self._running_at = 0.0
+        self._lock = threading.Lock()
+
+    def devices(self, refresh: bool = False) -> List[dict]:
+        with self._lock:
+            fresh = self._devices is not None and time.monotonic() - self._devices_at < self.device_ttl
+            if fresh and not refresh:
+                return self._devices
+        self.api_calls += 1
+        devices = self.client.devices().get('devices', [])
+        with self._lock:
+            self._devices = devices
+            self._devices_at = time.monotonic()
+        return devices
+
+    def device_id(self, refresh: bool = False) -> Optional[str]:
+        """The active device, or the first available one if none is active."""
+        devices = self.devices(refresh)
+        if not devices:
+            return None
+        active = next((device for device in devices if device.get('is_active')), devices[0])
+        return active['id']
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._devices = None
+            self._running = None
+
+    def client_running(self) -> bool:
+        """Whether the Spotify desktop client is running, cached for ``process_ttl`` seconds."""
+        if self._process_running is None:
+            return False
+        with self._lock:
+            if self._running is not None and time.monotonic() - self._running_at < self.process_ttl:
+                return self._running
+        running = self._process_running()
+        with self._lock:
+            self._running = running
+            self._running_at = time.monotonic()
+        return running
+
+    def wait_for_device(self, timeout: float = 15.0, initial_delay: float = 0.25, factor: float = 2.0,
+                        max_delay: float = 2.0, stop: Optional[threading.Event] = None) -> Optional[str]:
+        """Poll for a device with exponential backoff; None if none appeared in time."""
+        deadline = time.monotonic() + timeout
+        delay = initial_delay
+        while True:
+            device_id = self.device_id(refresh=True)
+            if device_id:
+                return device_id
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            wait = min(delay, remaining)
+            if stop is not None:
+                if stop.wait(wait):
+                    return None
+            else:
+                time.sleep(wait)
+            delay = min(delay * factor, max_delay)
+
+    def run(self, operation: Callable[[str], object], device_id: Optional[str] = None):
+        """Call ``operation(device_id)``, retrying once on a fresh device list if the device is gone."""
+        device_id = device_id or self.device_id()
+        try:
+            self.api_calls += 1
+            return operation(device_id)
+        except Exception as e:
+            self.invalidate()
+            if getattr(e, 'http_status', None) != 404:
+                raise
+            logger.info("Spotify device went away, refreshing the device list")
+            device_id = self.device_id(refresh=True)
+            if device_id is None:
+                raise
+            self.api_calls += 1
+            return operation(device_id)
@@ -0,0 +1,139 @@
+import time
+import logging
+import importlib
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+from telemetry import TRACER
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class StartupTimer:
+    """Records how long each part of startup took.
+
+    ``mark`` notes a milestone (e.g. "window shown") as the time since the
+    timer was created; ``phase`` and ``record`` note how long a piece of
+    work took, whether it ran on the startup path or in the background.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.milestones: List[Tuple[str, float]] = []
+        self.durations: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._reported = False
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def mark(self, name: str) -> None:
+        with self._lock:
+            if name not in dict(self.milestones):
+                self.milestones.append((name, self.elapsed()))
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.durations[name] = seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def report(self) -> str:
+        with self._lock:
+            milestones = ", ".join(f"{name} at {seconds:.2f}s" for name, seconds in self.milestones)
+            durations = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.durations.items())
+        return f"Startup: {milestones or 'no milestones'}; initialization: {durations or 'none yet'}"
+
+    def log_once(self) -> None:
+        """Log the report the first time this is called."""
+        if not self._reported:
+            self._reported = True
+            logger.info(self.report())
+            for name, seconds in self.milestones:
+                TRACER.record(f"startup.{name.replace(' ', '_')}", seconds)
+
+
+# Shared by every module so the report covers the whole process
+STARTUP = StartupTimer()
+
+
+class LazyModule:
+    """A module that is imported the first time one of its attributes is used."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    with STARTUP.phase(f"import {self._name}"):
+                        self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attribute: str):
+        return getattr(self.load(), attribute)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+class Deferred(Generic[T]):
+    """A value built on first use, or ahead of time by ``warm_async``.
+
+    ``get`` runs ``factory`` at most once, even when called from several
+    threads, and re-raises its exception on every call if it failed.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self.name = name
+        self._factory = factory
+        self._value: Optional[T] = None
+        self._error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self.ready = threading.Event()
+
+    def get(self) -> T:
+        if not self.ready.is_set():
+            with self._lock:
+                if not self.ready.is_set():
+                    try:
+                        with STARTUP.phase(self.name):
+                            self._value = self._factory()
+                    except Exception as e:
+                        self._error = e
+                    self.ready.set()
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+    def peek(self) -> Optional[T]:
+        """The value if it has been built successfully, without building it."""
+        return self._value if self.ready.is_set() else None
+
+    def warm(self) -> None:
+        try:
+            self.get()
+        except Exception as e:
+            logger.error(f"Background initialization of {self.name} failed: {e}")
+
+    def warm_async(self) -> threading.Thread:
+        thread = threading.Thread(target=self.warm, daemon=True, name=f"warm-{self.name}")
+        thread.start()
+        return thread
@@ -0,0 +1,64 @@
+import re
+import logging
+from typing import Iterable, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+# Sentence end: terminal punctuation (optionally closed by a quote or bracket)
+# followed by whitespace. The whitespace must already have arrived, so a
+# chunk ending in "3." is not split before we know whether "5" follows.
+_BOUNDARY_RE = re.compile(r"[.!?]+[\"')\]]*\s+")
+
+_ABBREVIATIONS = {
+    "mr.", "mrs.", "ms.", "dr.", "prof.", "sr.", "jr.", "st.", "vs.", "etc.",
+    "e.g.", "i.e.", "approx.", "no.", "fig.", "inc.", "ltd.", "u.s.",
+}
+
+
+class SentenceSplitter:
+    """Incrementally split streamed text into sentences.
+
+    Text is fed in arbitrary chunks; complete sentences are returned as soon
+    as their boundary has been seen. Sentences shorter than ``min_length``
+    are held back and joined with the next one so that TTS is not handed
+    tiny fragments.
+    """
+
+    def __init__(self, min_length: int = 20):
+        self.min_length = min_length
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in _BOUNDARY_RE.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()].strip()
+            last_word = candidate.rsplit(None, 1)[-1].lower() if candidate else ""
+            if last_word in _ABBREVIATIONS or len(candidate) < self.min_length:
+                continue
+            sentences.append(candidate)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        """Return whatever text is left once the stream has ended."""
+        remainder = self._buffer.strip()
+        self._buffer = ""
+        return [remainder] if remainder else []
+
+
+def stream_sentences(chunks: Iterable, min_length: int = 20) -> Iterator[str]:
+    """Yield sentences from a streamed Gemini response (or anything yielding ``.text`` chunks)."""
+    splitter = SentenceSplitter(min_length=min_length)
+    for chunk in chunks:
+        try:
+            text = chunk.text
+        except ValueError as e:
+            # Raised by the SDK for chunks without text, e.g. blocked by safety settings
+            logger.warning(f"Skipping response chunk without text: {e}")
+            continue
+        if text:
+            yield from splitter.feed(text)
+    yield from splitter.flush()
@@ -0,0 +1,213 @@
+import os
+import json
+import functools
+import math
+import time
+import queue
+import logging
+import threading
+import contextvars
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPANS_PATH = "latency_spans.jsonl"
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+class Span:
+    """A timed operation; attributes can be added while it is open.
+
+    Clearing ``export`` keeps the span in the in-memory statistics but out
+    of the exported file, e.g. for frequent background work.
+    """
+
+    __slots__ = ("name", "parent", "start", "duration", "attrs", "export")
+
+    def __init__(self, name: str, parent: Optional[str], attrs: dict):
+        self.name = name
+        self.parent = parent
+        self.start = time.time()
+        self.duration = 0.0
+        self.attrs = attrs
+        self.export = True
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+
+class Tracer:
+    """Collects latency spans, keeps recent samples and exports JSON lines.
+
+    Each finished span is kept in a per-name window of the last
+    ``window`` durations, from which ``summary`` computes percentiles, and
+    queued for a background thread that appends it to ``path``. The file
+    is rotated to ``path + ".1"`` once it grows past ``max_bytes``.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_SPANS_PATH, window: int = 1000,
+                 flush_interval: float = 1.0, max_bytes: int = 10 * 1024 * 1024):
+        self.path = path
+        self.window = window
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.window))
+        self._counts: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._pending: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        parent = _current_span.get()
+        span = Span(name, parent.name if parent else None, attrs)
+        token = _current_span.set(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.attrs["error"] = type(e).__name__
+            raise
+        finally:
+            span.duration = time.perf_counter() - start
+            _current_span.reset(token)
+            self._finish(span)
+
+    def record(self, name: str, seconds: float, **attrs) -> None:
+        """Record a duration measured elsewhere."""
+        parent = _current_span.get()
+        span = Span(name, parent.name if parent else None, attrs)
+        span.start -= seconds
+        span.duration = seconds
+        self._finish(span)
+
+    def _finish(self, span: Span) -> None:
+        with self._lock:
+            self._samples[span.name].append(span.duration)
+            self._counts[span.name] += 1
+        if self.path and span.export:
+            self._pending.put(span)
+            if self._writer is None:
+                self._start_writer()
+
+    def _start_writer(self) -> None:
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, daemon=True, name="telemetry")
+                self._writer.start()
+
+    def _write_loop(self) -> None:
+        while True:
+            batch = [self._pending.get()]
+            time.sleep(self.flush_interval)
+            while True:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch: List[Span]) -> None:
+        lines = []
+        for span in batch:
+            record = {"name": span.name, "start": round(span.start, 6), "ms": round(span.duration * 1000, 3)}
+            if span.parent:
+                record["parent"] = span.parent
+            if span.attrs:
+                record["attrs"] = span.attrs
+            lines.append(json.dumps(record, default=str) + "\n")
+        try:
+            if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                os.replace(self.path, self.path + ".1")
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+        except OSError as e:
+            logger.error(f"Error writing latency spans: {e}")
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return sorted(self._samples)
+
+    def samples(self, name: str) -> List[float]:
+        with self._lock:
+            return list(self._samples.get(name, ()))
+
+    def summary(self) -> Dict[str, dict]:
+        """Count and p50/p95/p99/max in milliseconds for every span name."""
+        with self._lock:
+            snapshot = {name: (sorted(values), self._counts[name]) for name, values in self._samples.items()}
+        return {
+            name: {
+                "count": count,
+                "p50": percentile(values, 0.50) * 1000,
+                "p95": percentile(values, 0.95) * 1000,
+                "p99": percentile(values, 0.99) * 1000,
+                "max": values[-1] * 1000 if values else 0.0,
+            }
+            for name, (values, count) in sorted(snapshot.items())
+        }
+
+    def histogram(self, name: str, buckets: int = 12) -> List[tuple]:
+        """Counts of recent durations in log-spaced buckets, as (upper_ms, count)."""
+        values = [value * 1000 for value in self.samples(name)]
+        if not values:
+            return []
+        low = max(min(values), 0.01)
+        high = max(max(values), low * 1.01)
+        ratio = (high / low) ** (1 / buckets)
+        edges = [low * ratio ** (i + 1) for i in range(buckets)]
+        counts = [0] * buckets
+        for value in values:
+            index = 0 if value <= low else min(buckets - 1, int(math.log(value / low, ratio)))
+            counts[index] += 1
+        return list(zip(edges, counts))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+# Shared by the assistant and the GUI, which run in the same process
+TRACER = Tracer()
+
+
+def span(name: str, **attrs):
+    return TRACER.span(name, **attrs)
+
+
+def record(name: str, seconds: float, **attrs) -> None:
+    TRACER.record(name, seconds, **attrs)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def annotate(**attrs) -> None:
+    """Add attributes to the innermost open span, if any."""
+    current = _current_span.get()
+    if current is not None:
+        current.set(**attrs)
+
+
+def traced(name: str):
+    """Decorator timing every call of a function as a span."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with TRACER.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import wave
+import hashlib
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = "tts_cache"
+
+
+class PhraseCache:
+    """Pre-rendered audio for phrases the assistant says again and again.
+
+    Each short phrase's use count is remembered across runs. Once a phrase
+    has been spoken ``min_uses`` times it is queued for rendering to a WAV
+    file with the engine's ``save_to_file``, keyed by text, voice, rate and
+    volume; the speech worker renders queued phrases while it has nothing
+    to say, and from then on they are played straight from disk instead of
+    being synthesized again. Files are evicted least recently played first once the cache
+    grows past ``max_bytes``. The use counts are written out at most every
+    ``save_interval`` seconds and by ``save()`` at shutdown.
+    """
+
+    CHUNK_FRAMES = 1024
+
+    def __init__(self, engine, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = 50 * 1024 * 1024,
+                 min_uses: int = 2, max_chars: int = 200, max_tracked: int = 2000, save_interval: float = 60.0):
+        self.engine = engine
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.min_uses = min_uses
+        self.max_chars = max_chars
+        self.max_tracked = max_tracked
+        self.save_interval = save_interval
+        self.hits = 0
+        self.misses = 0
+        self._uses: Dict[str, int] = {}
+        # Phrases waiting to be rendered, by key, oldest first
+        self._to_render: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._audio = None
+        self._supported = True
+        os.makedirs(directory, exist_ok=True)
+        self._index_path = os.path.join(directory, "uses.json")
+        try:
+            with open(self._index_path, "r") as f:
+                self._uses = json.load(f)
+        except (OSError, ValueError):
+            self._uses = {}
+
+    def key(self, text: str) -> str:
+        voice = rate = volume = None
+        try:
+            voice = self.engine.getProperty('voice')
+            rate = self.engine.getProperty('rate')
+            volume = self.engine.getProperty('volume')
+        except Exception:
+            pass
+        return hashlib.sha1(f"{voice}|{rate}|{volume}|{text.strip()}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.wav")
+
+    def cacheable(self, text: str) -> bool:
+        return self._supported and 0 < len(text.strip()) <= self.max_chars
+
+    def play(self, text: str, should_stop: Optional[Callable[[], bool]] = None) -> bool:
+        """Play ``text`` from the cache; False if it has not been rendered."""
+        if not self.cacheable(text):
+            return False
+        path = self._path(self.key(text))
+        if not os.path.exists(path):
+            self.misses += 1
+            return False
+        try:
+            self._play_file(path, should_stop)
+        except Exception as e:
+            logger.warning(f"Cached phrase playback failed, falling back to synthesis: {e}")
+            return False
+        self.hits += 1
+        os.utime(path)  # mark as recently used for eviction
+        return True
+
+    def _play_file(self, path: str, should_stop: Optional[Callable[[], bool]]) -> None:
+        import pyaudio
+
+        if self._audio is None:
+            self._audio = pyaudio.PyAudio()
+        with wave.open(path, "rb") as wav:
+            stream = self._audio.open(
+                format=self._audio.get_format_from_width(wav.getsampwidth()),
+                channels=wav.getnchannels(),
+                rate=wav.getframerate(),
+                output=True
+            )
+            try:
+                data = wav.readframes(self.CHUNK_FRAMES)
+                while data:
+                    if should_stop and should_stop():
+                        break
+                    stream.write(data)
+                    data = wav.readframes(self.CHUNK_FRAMES)
+            finally:
+                stream.stop_stream()
+                stream.close()
+
+    @property
+    def pending(self) -> int:
+        """Phrases queued for rendering."""
+        return len(self._to_render)
+
+    def note_spoken(self, text: str) -> None:
+        """Count a synthesized utterance and queue it for rendering once it is frequent enough."""
+        if not self.cacheable(text):
+            return
+        key = self.key(text)
+        with self._lock:
+            self._uses[key] = self._uses.get(key, 0) + 1
+            uses = self._uses[key]
+            if len(self._uses) > self.max_tracked:
+                # Forget the phrases used least often
+                for stale in sorted(self._uses, key=self._uses.get)[:len(self._uses) - self.max_tracked]:
+                    del self._uses[stale]
+            self._dirty = True
+            if time.monotonic() - self._saved_at >= self.save_interval:
+                self._save_uses()
+            if uses >= self.min_uses and not os.path.exists(self._path(key)):
+                self._to_render.setdefault(key, text)
+
+    def render_pending(self) -> Optional[str]:
+        """Render the oldest queued phrase and return its file path.
+
+        Must be called from the thread that owns the engine, while it is not
+        speaking.
+        """
+        with self._lock:
+            if not self._to_render:
+                return None
+            key = next(iter(self._to_render))
+            text = self._to_render.pop(key)
+        if not self._supported or os.path.exists(self._path(key)):
+            return None
+        return self.render(text, key)
+
+    def render(self, text: str, key: Optional[str] = None) -> Optional[str]:
+        """Synthesize ``text`` to the cache directory and return the file path."""
+        key = key or self.key(text)
+        path = self._path(key)
+        tmp_path = path + ".tmp.wav"
+        try:
+            self.engine.save_to_file(text, tmp_path)
+            self.engine.runAndWait()
+            # Some drivers (e.g. macOS) write AIFF; only WAV can be played back here
+            with wave.open(tmp_path, "rb") as wav:
+                if wav.getnframes() == 0:
+                    raise wave.Error("empty rendering")
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not render phrase to the TTS cache, disabling it: {e}")
+            self._supported = False
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+        self._evict()
+        return path
+
+    def save(self) -> None:
+        """Write out use counts that changed since the last save."""
+        with self._lock:
+            if self._dirty:
+                self._save_uses()
+
+    def _save_uses(self) -> None:
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        tmp_path = self._index_path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self._uses, f)
+            os.replace(tmp_path, self._index_path)
+        except OSError as e:
+            logger.error(f"Error saving TTS cache index: {e}")
+
+    def _evict(self) -> None:
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".wav") and not entry.name.endswith(".tmp.wav"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".wav"):
+                os.remove(entry.path)
@@ -0,0 +1,225 @@
+import time
+import queue
+import logging
+import itertools
+import threading
+from typing import Callable, Optional
+
+from startup import STARTUP
+from telemetry import record, span
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_URGENT = 0
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20
+
+# Quiet time before the worker renders queued phrases for the phrase cache
+RENDER_IDLE_DELAY = 0.5
+
+
+class Utterance:
+    """A piece of text queued for speech."""
+
+    __slots__ = ("text", "priority", "generation", "on_start", "on_end", "done", "completed", "queued_at")
+
+    def __init__(self, text: str, priority: int, generation: int,
+                 on_start: Optional[Callable] = None, on_end: Optional[Callable] = None):
+        self.text = text
+        self.priority = priority
+        self.generation = generation
+        self.on_start = on_start
+        self.on_end = on_end
+        self.done = threading.Event()
+        self.completed = False
+        self.queued_at = time.perf_counter()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.done.wait(timeout)
+
+    def __repr__(self):
+        return f"Utterance({self.text!r}, priority={self.priority})"
+
+
+class SpeechWorker:
+    """A thread that owns the TTS engine and speaks queued utterances.
+
+    The engine is created on the worker thread (SAPI requires it to be used
+    from the thread that created it) and every call to it happens there, so
+    callers only enqueue text and carry on. Utterances are spoken lowest
+    priority value first, in order of submission within a priority.
+
+    ``cancel`` stops the utterance being spoken and drops everything queued
+    before the call: it bumps a generation counter, queued utterances from
+    an older generation are skipped, and the engine is stopped from its own
+    word callback, the only place pyttsx3 allows it. ``on_start`` and
+    ``on_end(utterance, completed)`` are called on the worker thread.
+    Phrases the phrase cache wants rendered are rendered one at a time
+    once nothing has been queued for ``RENDER_IDLE_DELAY`` seconds, so
+    rendering never delays an utterance already waiting.
+    """
+
+    def __init__(self, engine_factory: Callable, phrase_cache_factory: Optional[Callable] = None,
+                 on_start: Optional[Callable] = None, on_end: Optional[Callable] = None):
+        self.engine = None
+        self.phrase_cache = None
+        self.on_start = on_start
+        self.on_end = on_end
+        self.idle = threading.Event()
+        self.idle.set()
+        self.spoken = 0
+        self.cancelled = 0
+        self._engine_factory = engine_factory
+        self._phrase_cache_factory = phrase_cache_factory
+        self._queue: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._generation = 0
+        self._current: Optional[Utterance] = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        # Set once the engine has been created (or failed to be); utterances
+        # queued before then are spoken as soon as it is up
+        self.ready = threading.Event()
+        self.error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, daemon=True, name="tts-worker")
+        self._thread.start()
+
+    @property
+    def speaking(self) -> bool:
+        return not self.idle.is_set()
+
+    def say(self, text: str, priority: int = PRIORITY_NORMAL, on_start: Optional[Callable] = None,
+            on_end: Optional[Callable] = None) -> Utterance:
+        """Queue ``text`` and return immediately."""
+        with self._lock:
+            utterance = Utterance(text, priority, self._generation, on_start, on_end)
+            if self.error is not None:
+                # No engine to speak with; don't leave callers waiting on it
+                utterance.done.set()
+                return utterance
+            self.idle.clear()
+            self._queue.put((priority, next(self._order), utterance))
+        return utterance
+
+    def say_and_wait(self, text: str, priority: int = PRIORITY_NORMAL, timeout: Optional[float] = None) -> bool:
+        """Speak ``text`` and block until it has finished; True if it was not cancelled."""
+        utterance = self.say(text, priority)
+        utterance.wait(timeout)
+        return utterance.completed
+
+    def cancel(self) -> None:
+        """Stop the current utterance and drop everything queued so far."""
+        with self._lock:
+            self._generation += 1
+        logger.info("Cancelling speech")
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        return self.idle.wait(timeout)
+
+    def stop(self, drain_timeout: Optional[float] = None) -> None:
+        """Stop the worker, optionally letting queued speech finish first."""
+        if drain_timeout:
+            self.wait_idle(drain_timeout)
+        self._stopped.set()
+        self.cancel()
+        self._queue.put((-1, next(self._order), None))
+        self._thread.join(timeout=2)
+
+    def _is_cancelled(self) -> bool:
+        current = self._current
+        return current is not None and current.generation != self._generation
+
+    def _run(self) -> None:
+        try:
+            with STARTUP.phase("tts engine"):
+                self.engine = self._engine_factory()
+                if self._phrase_cache_factory:
+                    self.phrase_cache = self._phrase_cache_factory(self.engine)
+        except Exception as e:
+            logger.error(f"Failed to start the TTS engine, speech is disabled: {e}")
+            with self._lock:
+                # say() stops queueing from here on; release whoever waits on what it already queued
+                self.error = e
+                self._drain()
+                self.idle.set()
+            self.ready.set()
+            return
+        try:
+            self.engine.connect('started-word', self._on_word)
+        except Exception as e:
+            logger.warning(f"TTS engine does not support word callbacks, speech can only be cancelled between utterances: {e}")
+        self.ready.set()
+
+        while not self._stopped.is_set():
+            cache = self.phrase_cache
+            try:
+                _, _, utterance = self._queue.get(timeout=RENDER_IDLE_DELAY if cache and cache.pending else None)
+            except queue.Empty:
+                cache.render_pending()
+                continue
+            if utterance is None:
+                break
+            if utterance.generation == self._generation:
+                self._speak(utterance)
+            else:
+                self._finish(utterance, False)
+            with self._lock:
+                if self._queue.empty():
+                    self.idle.set()
+
+    def _drain(self) -> None:
+        """Finish every queued utterance as not spoken."""
+        while True:
+            try:
+                _, _, utterance = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if utterance is not None:
+                self._finish(utterance, False)
+
+    def _speak(self, utterance: Utterance) -> None:
+        self._current = utterance
+        for callback in (self.on_start, utterance.on_start):
+            if callback:
+                self._call(callback, utterance)
+        record("speak.queue_wait", time.perf_counter() - utterance.queued_at)
+        with span("speak", chars=len(utterance.text)) as speak_span:
+            try:
+                cache = self.phrase_cache
+                if cache and cache.play(utterance.text, self._is_cancelled):
+                    speak_span.set(source="cache")
+                else:
+                    speak_span.set(source="engine")
+                    self.engine.say(utterance.text)
+                    self.engine.runAndWait()
+                    if cache and not self._is_cancelled():
+                        cache.note_spoken(utterance.text)
+            except Exception as e:
+                logger.error(f"TTS error: {e}")
+            completed = not self._is_cancelled()
+            speak_span.set(completed=completed)
+        self._current = None
+        self._finish(utterance, completed)
+
+    def _finish(self, utterance: Utterance, completed: bool) -> None:
+        utterance.completed = completed
+        if completed:
+            self.spoken += 1
+        else:
+            self.cancelled += 1
+        for callback in (self.on_end, utterance.on_end):
+            if callback:
+                self._call(callback, utterance, completed)
+        utterance.done.set()
+
+    @staticmethod
+    def _call(callback: Callable, *args) -> None:
+        try:
+            callback(*args)
+        except Exception as e:
+            logger.error(f"Error in speech callback: {e}")
+
+    def _on_word(self, name, location, length) -> None:
+        # Runs inside the engine's loop, which is the only safe place to stop it
+        if self._is_cancelled():
+            self.engine.stop()
@@ -0,0 +1,231 @@
+import time
+import wave
+import logging
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FRAME_SECONDS = 0.025
+HOP_SECONDS = 0.010
+N_BANDS = 20
+N_CEPSTRA = 12
+
+
+def pcm_to_float(frame_data: bytes) -> np.ndarray:
+    """Convert signed 16-bit PCM to floats in [-1, 1]."""
+    return np.frombuffer(frame_data, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def frame_signal(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """Split a signal into overlapping, Hann-windowed frames (one per row)."""
+    frame_len = int(sample_rate * FRAME_SECONDS)
+    hop = int(sample_rate * HOP_SECONDS)
+    if len(samples) < frame_len:
+        samples = np.pad(samples, (0, frame_len - len(samples)))
+    count = 1 + (len(samples) - frame_len) // hop
+    strides = (samples.strides[0] * hop, samples.strides[0])
+    frames = np.lib.stride_tricks.as_strided(samples, shape=(count, frame_len), strides=strides)
+    return frames * np.hanning(frame_len).astype(np.float32)
+
+
+def _band_edges(n_fft_bins: int, sample_rate: int) -> np.ndarray:
+    # Log-spaced bands between 100 Hz and 4 kHz, where most speech energy is
+    nyquist = sample_rate / 2
+    edges_hz = np.geomspace(100, min(4000, nyquist), N_BANDS + 1)
+    return np.clip((edges_hz / nyquist * (n_fft_bins - 1)).astype(int), 0, n_fft_bins - 1)
+
+
+def _dct_matrix(n_inputs: int, n_outputs: int) -> np.ndarray:
+    k = np.arange(n_outputs)
+    n = np.arange(n_inputs)[:, None]
+    return np.cos(np.pi / n_inputs * (n + 0.5) * k)
+
+
+class FrameFeatures:
+    """Per-frame features of a signal: log energy, spectral flatness and cepstra."""
+
+    def __init__(self, samples: np.ndarray, sample_rate: int):
+        frames = frame_signal(samples, sample_rate)
+        spectrum = np.abs(np.fft.rfft(frames, axis=1)) ** 2 + 1e-10
+        self.log_energy = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+        self.flatness = np.exp(np.mean(np.log(spectrum), axis=1)) / np.mean(spectrum, axis=1)
+        edges = _band_edges(spectrum.shape[1], sample_rate)
+        cumulative = np.cumsum(spectrum, axis=1)
+        bands = cumulative[:, edges[1:]] - cumulative[:, edges[:-1]] + 1e-10
+        # Limit each frame to 60 dB of dynamic range so near-empty bands do not dominate
+        bands = np.maximum(bands, bands.max(axis=1, keepdims=True) * 1e-6)
+        # Cepstra of the log band energies describe the spectral shape
+        # independently of loudness (the zeroth coefficient is dropped)
+        self.cepstra = np.log(bands) @ _dct_matrix(N_BANDS, N_CEPSTRA + 1)[:, 1:]
+
+    def __len__(self):
+        return len(self.log_energy)
+
+
+class VoiceActivityDetector:
+    """Decide whether an utterance contains speech.
+
+    A frame counts as voiced if it is ``margin_db`` above the utterance's
+    noise floor (its quietest frames) and its spectrum is peaky rather than
+    flat like hiss or hum. The utterance is speech if it has at least
+    ``min_speech`` seconds of voiced frames.
+    """
+
+    def __init__(self, margin_db: float = 12.0, max_flatness: float = 0.35, min_speech: float = 0.25):
+        self.margin_db = margin_db
+        self.max_flatness = max_flatness
+        self.min_speech = min_speech
+
+    def voiced_frames(self, features: FrameFeatures) -> np.ndarray:
+        floor = np.percentile(features.log_energy, 10)
+        return (features.log_energy > floor + self.margin_db) & (features.flatness < self.max_flatness)
+
+    def is_speech(self, features: FrameFeatures) -> bool:
+        return np.count_nonzero(self.voiced_frames(features)) * HOP_SECONDS >= self.min_speech
+
+
+def _normalize(bands: np.ndarray) -> np.ndarray:
+    # Mean normalization removes the microphone/channel colouring
+    return bands - bands.mean(axis=0, keepdims=True)
+
+
+def dtw_distance(template: np.ndarray, query: np.ndarray) -> float:
+    """Subsequence DTW: cost of the best alignment of ``template`` to a prefix of ``query``.
+
+    The template must be matched from its first frame to its last, but may
+    end anywhere in the query, so trailing words after the wake phrase do not
+    count against it. The cost is normalized by the template length.
+    """
+    n, m = len(template), len(query)
+    cost = np.sqrt(((template[:, None, :] - query[None, :, :]) ** 2).sum(axis=2))
+    acc = np.full((n + 1, m + 1), np.inf, dtype=np.float64)
+    acc[0, 0] = 0.0
+    for i in range(1, n + 1):
+        row = cost[i - 1]
+        prev = acc[i - 1]
+        current = acc[i]
+        # Vertical/diagonal moves come from the previous row
+        best_prev = np.minimum(prev[1:], prev[:-1])
+        current[1:] = row + best_prev
+        # Horizontal moves are a running minimum along the row
+        for j in range(2, m + 1):
+            candidate = current[j - 1] + row[j - 1]
+            if candidate < current[j]:
+                current[j] = candidate
+    return float(acc[n, 1:].min() / n)
+
+
+class WakeWordDetector:
+    """Template-matching wake word spotter.
+
+    Templates are recordings of the wake phrase. An utterance matches when
+    its voiced opening aligns with any template (by DTW over band-energy
+    cepstra) with a normalized cost under ``threshold``. Without an explicit
+    threshold and with two or more templates, the threshold is calibrated
+    from how far the templates are from each other.
+    """
+
+    DEFAULT_THRESHOLD = 25.0
+
+    def __init__(self, templates: Iterable[str] = (), threshold: Optional[float] = None,
+                 vad: Optional[VoiceActivityDetector] = None):
+        self.vad = vad or VoiceActivityDetector()
+        self.templates: List[np.ndarray] = []
+        for path in templates:
+            try:
+                self.add_template(path)
+            except Exception as e:
+                logger.error(f"Error loading wake word template {path}: {e}")
+        self.threshold = threshold if threshold is not None else self._calibrate()
+
+    def _calibrate(self, margin: float = 1.3) -> float:
+        if len(self.templates) < 2:
+            return self.DEFAULT_THRESHOLD
+        distances = [
+            dtw_distance(a, b)
+            for i, a in enumerate(self.templates)
+            for j, b in enumerate(self.templates) if i != j
+        ]
+        threshold = margin * max(distances)
+        logger.info(f"Wake word threshold calibrated to {threshold:.2f}")
+        return threshold
+
+    def add_template(self, path: str) -> None:
+        with wave.open(path, "rb") as wav:
+            samples = pcm_to_float(wav.readframes(wav.getnframes()))
+            if wav.getnchannels() > 1:
+                samples = samples[::wav.getnchannels()]
+            features = FrameFeatures(samples, wav.getframerate())
+        self.templates.append(_normalize(self._trim(features)))
+
+    def _trim(self, features: FrameFeatures) -> np.ndarray:
+        """Drop leading and trailing silence so matching starts at the first voiced frame."""
+        voiced = np.flatnonzero(self.vad.voiced_frames(features))
+        if not len(voiced):
+            return features.cepstra
+        return features.cepstra[voiced[0]:voiced[-1] + 1]
+
+    def distance(self, features: FrameFeatures) -> float:
+        if not self.templates:
+            return float("inf")
+        voiced = np.flatnonzero(self.vad.voiced_frames(features))
+        start = voiced[0] if len(voiced) else 0
+        distances = []
+        for template in self.templates:
+            # Only the opening of the utterance can hold the wake phrase
+            window = features.cepstra[start:start + int(len(template) * 1.5)]
+            if len(window) < len(template) // 2:
+                continue
+            distances.append(dtw_distance(template, _normalize(window)))
+        return min(distances, default=float("inf"))
+
+    def matches(self, features: FrameFeatures) -> bool:
+        distance = self.distance(features)
+        logger.debug(f"Wake word distance {distance:.2f} (threshold {self.threshold})")
+        return distance <= self.threshold
+
+
+class WakeWordGate:
+    """Offline front end deciding which utterances are sent to recognition.
+
+    Utterances without speech are always dropped. If wake word templates are
+    configured, an utterance must also start with the wake phrase unless a
+    session is active: every accepted utterance and every assistant reply
+    keeps the session open for ``session_seconds``, so follow-ups and
+    confirmations do not need the wake phrase again.
+    """
+
+    def __init__(self, detector: Optional[WakeWordDetector] = None, session_seconds: float = 20,
+                 vad: Optional[VoiceActivityDetector] = None):
+        self.vad = vad or VoiceActivityDetector()
+        self.detector = detector
+        self.session_seconds = session_seconds
+        self.stats = {"accepted": 0, "no_speech": 0, "no_wake_word": 0}
+        self._session_until = 0.0
+
+    @property
+    def requires_wake_word(self) -> bool:
+        return self.detector is not None and bool(self.detector.templates)
+
+    @property
+    def session_active(self) -> bool:
+        return time.monotonic() < self._session_until
+
+    def touch(self) -> None:
+        """Keep the session open, e.g. after the assistant has spoken."""
+        if not self.requires_wake_word or self.session_active:
+            self._session_until = time.monotonic() + self.session_seconds
+
+    def accept(self, frame_data: bytes, sample_rate: int) -> bool:
+        features = FrameFeatures(pcm_to_float(frame_data), sample_rate)
+        if not self.vad.is_speech(features):
+            self.stats["no_speech"] += 1
+            return False
+        if self.requires_wake_word and not self.session_active and not self.detector.matches(features):
+            self.stats["no_wake_word"] += 1
+            return False
+        self.stats["accepted"] += 1
+        self._session_until = time.monotonic() + self.session_seconds
+        return True
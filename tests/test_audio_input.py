@@ -0,0 +1,64 @@
+import random
+import wave
+from array import array
+
+from audio_input import NoiseEstimator, StreamListener, WavFileSource
+
+RATE = 16000
+
+
+def write_wav(path, segments, seed=0):
+    """Write ``(seconds, amplitude)`` segments of noise as a mono 16-bit WAV."""
+    rng = random.Random(seed)
+    samples = array("h")
+    for seconds, amplitude in segments:
+        samples.extend(int(rng.uniform(-1, 1) * amplitude) for _ in range(int(seconds * RATE)))
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(RATE)
+        wav.writeframes(samples.tobytes())
+    return str(path)
+
+
+def test_listener_splits_utterances_and_reports_the_end(tmp_path):
+    path = write_wav(tmp_path / "two.wav", [(1.0, 50), (0.8, 8000), (1.2, 50), (0.5, 8000), (0.2, 50)])
+    listener = StreamListener(WavFileSource(path, gap=1.0), pause_threshold=0.5)
+    try:
+        first = listener.listen()
+        second = listener.listen()
+        assert listener.listen() is None
+        assert listener.ended
+    finally:
+        listener.stop()
+
+    for audio, spoken in ((first, 0.8), (second, 0.5)):
+        assert audio.sample_rate == RATE
+        duration = len(audio.frame_data) / (RATE * 2)
+        # The utterance plus up to pre_roll before it and pause_threshold after it
+        assert spoken <= duration <= spoken + 0.3 + 0.5 + 0.1
+
+
+def test_listener_calibrates_from_the_stream_while_idle(tmp_path):
+    path = write_wav(tmp_path / "quiet.wav", [(1.0, 400), (0.6, 8000), (0.5, 400)])
+    listener = StreamListener(WavFileSource(path, gap=0.5), pause_threshold=0.4)
+    try:
+        assert listener.listen() is not None
+        threshold = listener.noise.threshold
+    finally:
+        listener.stop()
+    # Noise of amplitude 400 has an RMS of about 230; speech of amplitude 8000 about 4600
+    assert 230 < threshold < 1000
+
+
+def test_noise_estimator_ignores_speech_but_follows_a_louder_background():
+    noise = NoiseEstimator(window=100)
+    for _ in range(60):
+        noise.update(100)
+    for _ in range(40):
+        noise.update(5000)
+    assert noise.threshold < 500
+
+    for _ in range(100):
+        noise.update(800)
+    assert 800 < noise.threshold < 2000
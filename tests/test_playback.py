@@ -0,0 +1,117 @@
+import threading
+
+import pytest
+import spotipy
+
+from fake_backends import FakeSpotifyServer
+from playback import PlaybackService, pooled_session, split_play_request
+from spotify_state import SpotifyState
+
+
+class GatedState(SpotifyState):
+    """SpotifyState whose device lookup waits while ``gate`` is closed, holding up the running batch."""
+
+    def __init__(self, client):
+        super().__init__(client)
+        self.gate = threading.Event()
+        self.gate.set()
+        self.waiting = threading.Event()
+
+    def device_id(self, refresh: bool = False):
+        if not self.gate.is_set():
+            self.waiting.set()
+            self.gate.wait(5)
+        return super().device_id(refresh)
+
+
+@pytest.fixture
+def server():
+    server = FakeSpotifyServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def service(server):
+    client = spotipy.Spotify(auth="fake-token", requests_session=pooled_session())
+    client.prefix = server.prefix
+    service = PlaybackService(client, GatedState(client), coalesce_window=0.05)
+    service.state.device_id()
+    server.reset_log()
+    yield service
+    service.close()
+
+
+def hold(service):
+    """Start a batch that waits on the gate, so the commands sent next queue up behind it."""
+    service.state.gate.clear()
+    future = service.pause()
+    assert service.state.waiting.wait(5)
+    return future
+
+
+def calls(server):
+    return [path for method, path in server.requests if method != "GET" or path != "/v1/me/player/devices"]
+
+
+def test_split_play_request():
+    assert split_play_request("bohemian rhapsody then hotel california, stairway to heaven and hey jude") == [
+        "bohemian rhapsody", "hotel california", "stairway to heaven", "hey jude"]
+
+
+def test_play_searches_every_track_and_starts_them_together(service, server):
+    names = service.play(["yesterday", "let it be", "help"]).result(5)
+    assert names == ["yesterday", "let it be", "help"]
+    assert calls(server).count("/v1/search") == 3
+    assert calls(server).count("/v1/me/player/play") == 1
+    assert len(server.player["uris"]) == 3
+
+
+def test_burst_of_commands_is_coalesced_into_one_batch(service, server):
+    first = hold(service)
+    burst = [service.next(), service.next(), service.previous(), service.pause(), service.resume()]
+    batches = service.batches
+    service.state.gate.set()
+    first.result(5)
+    for future in burst:
+        assert future.result(5) is None
+
+    assert service.batches == batches + 1
+    # Two nexts and a previous make one skip, and only the final resume is sent
+    assert calls(server) == ["/v1/me/player/pause", "/v1/me/player/next", "/v1/me/player/play"]
+    assert server.player["is_playing"]
+
+
+def test_play_supersedes_earlier_commands_in_the_batch(service, server):
+    first = hold(service)
+    stale = service.play(["old song"])
+    skip = service.next()
+    latest = service.play(["new song"])
+    service.state.gate.set()
+    first.result(5)
+
+    assert stale.result(5) is None
+    assert skip.result(5) is None
+    assert latest.result(5) == ["new song"]
+    assert "/v1/me/player/next" not in calls(server)
+    assert calls(server).count("/v1/search") == 1
+
+
+def test_failed_step_only_fails_its_own_commands(service, server):
+    first = hold(service)
+    missing = service.queue([""])
+    play = service.play(["hey jude"])
+    queued = service.queue(["let it be"])
+    skips = [service.next(), service.next()]
+    service.state.gate.set()
+    first.result(5)
+
+    with pytest.raises(LookupError):
+        missing.result(5)
+    assert play.result(5) == ["hey jude"]
+    assert queued.result(5) == ["let it be"]
+    for future in skips:
+        assert future.result(5) is None
+    assert server.player["index"] == 2
+    assert len(server.player["queue"]) == 1
+
@@ -0,0 +1,64 @@
+from fake_backends import FakeChatModel, FakeChunk
+from streaming import SentenceSplitter, stream_sentences
+
+REPLY = ("The Eiffel Tower is in Paris. It was finished in 1889 for the World's Fair. "
+         "Dr. Smith says it is 330 metres tall, i.e. very tall! Want to know more?")
+
+
+def test_splitter_returns_sentences_once_their_boundary_arrives():
+    splitter = SentenceSplitter()
+    assert splitter.feed("The Eiffel Tower is in Paris.") == []
+    assert splitter.feed(" It was finished") == ["The Eiffel Tower is in Paris."]
+    assert splitter.flush() == ["It was finished"]
+    assert splitter.flush() == []
+
+
+def test_splitter_waits_for_whitespace_after_punctuation():
+    splitter = SentenceSplitter()
+    assert splitter.feed("It is roughly 3.") == []
+    assert splitter.feed("5 kilometres from the river. Next") == ["It is roughly 3.5 kilometres from the river."]
+
+
+def test_splitter_keeps_abbreviations_and_short_sentences_together():
+    splitter = SentenceSplitter(min_length=20)
+    assert splitter.feed("Yes. Dr. Smith built it in 1889. ") == ["Yes. Dr. Smith built it in 1889."]
+
+
+def test_stream_sentences_matches_the_whole_reply_for_any_chunk_size():
+    for chunk_size in (1, 3, 7, 40, len(REPLY)):
+        model = FakeChatModel(default_reply=REPLY, chunk_size=chunk_size)
+        response = model.start_chat().send_message("tell me about the eiffel tower", stream=True)
+        sentences = list(stream_sentences(response))
+        assert sentences == [
+            "The Eiffel Tower is in Paris.",
+            "It was finished in 1889 for the World's Fair.",
+            "Dr. Smith says it is 330 metres tall, i.e. very tall!",
+            "Want to know more?",
+        ], chunk_size
+        assert " ".join(sentences) == REPLY
+
+
+def test_stream_sentences_yields_before_the_stream_ends():
+    model = FakeChatModel(default_reply=REPLY, chunk_size=10)
+    response = iter(model.start_chat().send_message("hi", stream=True))
+    read = []
+
+    def chunks():
+        for chunk in response:
+            read.append(chunk)
+            yield chunk
+
+    first = next(stream_sentences(chunks()))
+    assert first == "The Eiffel Tower is in Paris."
+    assert len(read) < len(REPLY) // 10
+
+
+class BlockedChunk:
+    @property
+    def text(self):
+        raise ValueError("response was blocked")
+
+
+def test_stream_sentences_skips_chunks_without_text():
+    chunks = [FakeChunk("Hello there, how are you? "), BlockedChunk(), FakeChunk(""), FakeChunk("I am fine")]
+    assert list(stream_sentences(chunks)) == ["Hello there, how are you?", "I am fine"]